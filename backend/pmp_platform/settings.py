@@ -7,6 +7,18 @@ load_dotenv()
 
 # Gemini API设置
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+GEMINI_CACHE_ENABLED = os.getenv('GEMINI_CACHE_ENABLED', 'true').lower() != 'false'  # 关闭后每次都请求API
+GEMINI_CHUNK_TOKENS = 3000  # 每个分片的输入token预算，按题号边界切分
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', 4))  # 单个文档的并发请求数
+GEMINI_MODEL_URL = os.getenv('GEMINI_MODEL_URL', 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash')
+GEMINI_MAX_OUTPUT_TOKENS = 8192  # 单次请求的最大输出token数
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv('GEMINI_REQUESTS_PER_MINUTE', 10))  # 进程内所有请求共享的限流额度
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv('GEMINI_TOKENS_PER_MINUTE', 250000))
+GEMINI_MAX_RETRIES = 5  # 429/5xx和网络错误的最大重试次数
+GEMINI_BACKOFF_BASE = 1.0  # 指数退避的基础等待秒数
+GEMINI_BACKOFF_MAX = 30.0  # 单次退避的最长等待秒数
+GEMINI_REQUEST_TIMEOUT = 60  # 单次请求超时（秒）
+GEMINI_STREAMING = os.getenv('GEMINI_STREAMING', 'true').lower() != 'false'  # 导入时使用流式生成，题目边生成边保存
 import os
 from pathlib import Path
 
@@ -124,4 +136,42 @@ REST_FRAMEWORK = {
 
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB 
\ No newline at end of file
+DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+
+# Ingestion settings
+INGESTION_WORKERS = int(os.getenv('INGESTION_WORKERS', 2))  # 后台解析的最大并发任务数
+INGESTION_EAGER = False  # 为True时在请求内同步执行导入任务（测试用）
+INGESTION_JOB_LEASE_SECONDS = 600  # 运行中任务超过该时间没有心跳则视为中断
+INGESTION_MAX_ATTEMPTS = 3  # 单个任务最多执行次数
+QUESTION_BULK_BATCH_SIZE = 500  # 批量插入题目时每条INSERT的行数
+INGESTION_FLUSH_INTERVAL = 1.0  # 边解析边保存时两次写库的最短间隔（秒），首题立即写入
+INGESTION_EVENTS_INTERVAL = 1.0  # 进度事件流的轮询间隔（秒）
+INGESTION_EVENTS_TIMEOUT = 25  # 单个事件流连接的最长时间（秒），超时后由浏览器自动重连；每个连接占用一个同步worker，不宜调大
+INGESTION_UPLOAD_TEMP_DIR = None  # 导入上传文件的临时目录，默认为MEDIA_ROOT/.uploads（需与MEDIA_ROOT在同一文件系统）
+
+# Grading settings
+ANSWER_KEY_CACHE_TTL = 300  # 编译后的答案键在进程内缓存的最长时间（秒）；其他进程修改题目后最迟在此时间后生效
+ANSWER_WRITE_BEHIND = os.getenv('ANSWER_WRITE_BEHIND', 'False').lower() == 'true'  # 答题记录先进入进程内缓冲区，由后台线程批量写入
+ANSWER_BUFFER_MAX_SIZE = 500  # 写后缓冲区达到该条数时立即写入
+ANSWER_BUFFER_FLUSH_INTERVAL = 0.5  # 写后缓冲区两次写入的最长间隔（秒）
+ANSWER_BUFFER_MAX_RETRIES = 5  # 写入连续失败该次数后不再重试，记录转存到下面的文件
+ANSWER_BUFFER_REJECTED_FILE = BASE_DIR / 'archives' / 'rejected_answers.jsonl'  # 无法写入的答题记录（JSONL，追加写入）
+
+# Answer retention settings
+ANSWER_RETENTION_DAYS = int(os.getenv('ANSWER_RETENTION_DAYS', 0))  # 答题记录原始行的保留天数，更早的由 compact_answers 命令压缩为每日汇总；0表示不压缩
+ANSWER_ARCHIVE_ENABLED = True  # 压缩时把删除的原始答题记录写入gzip压缩的JSONL归档文件
+ANSWER_ARCHIVE_DIR = BASE_DIR / 'archives' / 'answers'
+ANSWER_COMPACTION_CHUNK_SIZE = 2000  # 压缩时每个事务处理的记录数（事务越小，阻塞其他写入的时间越短）
+
+# PDF extraction settings
+PDF_EXTRACT_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', os.cpu_count() or 1))  # 提取进程数，1表示串行
+PDF_EXTRACT_MIN_PARALLEL_PAGES = 32  # 页数达到该值才使用进程池
+PDF_EXTRACT_MIN_PAGES_PER_TASK = 4  # 每个子任务最少处理的页数
+PDF_TEXT_CACHE_ENABLED = True  # 按文件内容缓存提取结果，重复上传相同PDF时跳过提取
+PDF_TEXT_CACHE_DIR = BASE_DIR / 'cache' / 'pdf_text'
+PDF_TEXT_CACHE_MAX_BYTES = 200 * 1024 * 1024  # 200MB，超出后按LRU淘汰
+
+# Gemini response cache settings
+GEMINI_CACHE_DIR = BASE_DIR / 'cache' / 'gemini'
+GEMINI_CACHE_MAX_BYTES = 100 * 1024 * 1024  # 100MB，超出后按LRU淘汰
+GEMINI_CACHE_TTL = 7 * 24 * 3600  # 缓存有效期（秒）
@@ -0,0 +1,191 @@
+import atexit
+import json
+import os
+import threading
+import time
+from typing import List
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import IntegrityError, close_old_connections, transaction
+from django.dispatch import receiver
+
+from .bulk_writes import insert_many
+from .models import UserAnswer
+from .statistics import record_user_answers
+
+
+class UserAnswerBuffer:
+    """答题记录的写后缓冲：判分后立即返回，记录由后台线程按数量或时间批量写入
+
+    缓冲区达到 max_size 条或距上次写入超过 flush_interval 秒时写入一批；
+    进程正常退出时（atexit）写入剩余记录。进程被强制杀死时缓冲区中的记录会丢失，
+    最多为 flush_interval 秒内的提交。
+
+    违反约束（例如题目在合并集合时已删除）的批次二分拆开写入，单独写入仍失败的记录转存到
+    rejected_file，不阻塞其后的记录；其他错误时整批放回缓冲区重试，连续失败 max_retries 次
+    （或退出前的最后一次写入失败）后同样转存。
+    """
+
+    def __init__(self, max_size: int, flush_interval: float, max_retries: int = 5,
+                 rejected_file: str = None):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.rejected_file = rejected_file
+        self.rejected_count = 0
+        self._failures = 0  # 连续写入失败的次数
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # 保证同一时刻只有一个线程在写库
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def add(self, user_answers: List[UserAnswer]):
+        """加入一批待写入的答题记录，必要时唤醒后台线程"""
+        if not user_answers:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._start()
+            self._pending.extend(user_answers)
+            full = len(self._pending) >= self.max_size
+        if full:
+            self._wakeup.set()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self, final: bool = False) -> int:
+        """把缓冲区中的全部记录写入数据库，返回写入条数（final 表示退出前的最后一次写入，失败时不再重试）"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            written = 0
+            parts = [batch]  # 待写入的批次（栈顶是最早的记录）
+            while parts:
+                part = parts.pop()
+                try:
+                    with transaction.atomic():
+                        insert_many(part)
+                        record_user_answers(part)
+                except IntegrityError as e:
+                    if len(part) == 1:
+                        self._reject(part, str(e))
+                    else:
+                        middle = len(part) // 2
+                        parts.extend([part[middle:], part[:middle]])
+                except Exception as e:
+                    remaining = part + [answer for rest in reversed(parts) for answer in rest]
+                    self._failures += 1
+                    if final or self._failures >= self.max_retries:
+                        print(f"写入 {len(remaining)} 条答题记录连续失败 {self._failures} 次，不再重试: {str(e)}")
+                        self._failures = 0
+                        self._reject(remaining, str(e))
+                    else:
+                        print(f"写入 {len(remaining)} 条答题记录失败，稍后重试: {str(e)}")
+                        with self._lock:
+                            self._pending[:0] = remaining
+                    return written
+                else:
+                    written += len(part)
+            self._failures = 0
+            return written
+
+    def _reject(self, user_answers: List[UserAnswer], error: str):
+        """转存无法写入的答题记录（追加到 rejected_file，未配置时只打印）"""
+        self.rejected_count += len(user_answers)
+        print(f"{len(user_answers)} 条答题记录无法写入: {error}")
+        if not self.rejected_file:
+            return
+        os.makedirs(os.path.dirname(self.rejected_file), exist_ok=True)
+        with open(self.rejected_file, 'a', encoding='utf-8') as rejected_file:
+            for answer in user_answers:
+                rejected_file.write(json.dumps({
+                    'question_id': answer.question_id,
+                    'user_answers': answer.user_answers,
+                    'is_correct': answer.is_correct,
+                    'points': answer.points,
+                    'submitted_at': answer.submitted_at.isoformat(),
+                    'error': error,
+                }, ensure_ascii=False) + '\n')
+
+    def shutdown(self):
+        """停止后台线程并写入剩余记录"""
+        self._stopped.set()
+        self._wakeup.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._stopped.clear()
+        self.flush(final=True)
+
+    def _start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='answer-write-behind', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        try:
+            while not self._stopped.is_set():
+                self._wakeup.wait(max(0.0, self.flush_interval - (time.monotonic() - last_flush)))
+                self._wakeup.clear()
+                if self._stopped.is_set():
+                    break
+                if (self.pending_count() >= self.max_size
+                        or time.monotonic() - last_flush >= self.flush_interval):
+                    self.flush()
+                    last_flush = time.monotonic()
+                    close_old_connections()
+        finally:
+            close_old_connections()
+
+
+_answer_buffer = None
+_answer_buffer_lock = threading.Lock()
+
+
+def get_answer_buffer() -> UserAnswerBuffer:
+    """获取进程内共享的答题记录缓冲区（首次使用时注册退出时的写入）"""
+    global _answer_buffer
+    with _answer_buffer_lock:
+        if _answer_buffer is None:
+            _answer_buffer = UserAnswerBuffer(
+                settings.ANSWER_BUFFER_MAX_SIZE, settings.ANSWER_BUFFER_FLUSH_INTERVAL,
+                settings.ANSWER_BUFFER_MAX_RETRIES, str(settings.ANSWER_BUFFER_REJECTED_FILE)
+            )
+            atexit.register(_answer_buffer.shutdown)
+        return _answer_buffer
+
+
+def reset_answer_buffer():
+    """写入并丢弃当前缓冲区，下次使用时按当前配置重新创建"""
+    global _answer_buffer
+    with _answer_buffer_lock:
+        answer_buffer, _answer_buffer = _answer_buffer, None
+    if answer_buffer is not None:
+        atexit.unregister(answer_buffer.shutdown)
+        answer_buffer.shutdown()
+
+
+@receiver(setting_changed)
+def _reset_answer_buffer_on_setting_change(setting, **kwargs):
+    # 缓冲区在创建时读取容量和写入间隔（测试中用override_settings修改）
+    if setting.startswith('ANSWER_BUFFER_'):
+        reset_answer_buffer()
+
+
+def save_user_answers(user_answers: List[UserAnswer]):
+    """保存判分后的答题记录并累加题目统计：写后缓冲开启时放入缓冲区，否则在一个事务中批量插入"""
+    if settings.ANSWER_WRITE_BEHIND:
+        get_answer_buffer().add(user_answers)
+        return
+    with transaction.atomic():
+        insert_many(user_answers)
+        record_user_answers(user_answers)
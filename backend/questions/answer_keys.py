@@ -0,0 +1,169 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Question, QuestionSet
+from .option_masks import INVALID_OPTION, MASK_DTYPE, MAX_OPTIONS, encode_answers, mask_options, option_mask
+
+
+class CompiledAnswerKey:
+    """编译后的题目集合答案键：按题号排序的题目ID和正确答案位掩码，以及集合的判分策略"""
+
+    def __init__(self, question_set_id: int, rows: List[Tuple[int, int, List[str], str]],
+                 scoring_policy: str = 'strict'):
+        rows = sorted(rows, key=lambda row: (row[1], row[0]))
+        self.question_set_id = question_set_id
+        self.scoring_policy = scoring_policy
+        self.question_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.question_numbers = np.array([row[1] for row in rows], dtype=np.int64)
+        self.masks = encode_answers(row[2] for row in rows)
+        self.correct_answers = [row[2] for row in rows]
+        self.explanations = [row[3] for row in rows]
+        self.positions = {question_id: position for position, question_id in enumerate(self.question_ids.tolist())}
+        self.number_positions = {
+            number: position for position, number in enumerate(self.question_numbers.tolist())
+        }
+        self.compiled_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.masks)
+
+    def encode_sheet(self, answers_by_number: Dict[int, Iterable[str]]) -> np.ndarray:
+        """把一份按题号作答的答卷编码成与答案键对齐的位掩码数组，未作答的题目为0"""
+        sheet = np.zeros(len(self), dtype=MASK_DTYPE)
+        for number, options in answers_by_number.items():
+            position = self.number_positions.get(int(number))
+            if position is not None:
+                sheet[position] = option_mask(options)
+        return sheet
+
+
+ANSWER_KEY_FIELDS = ('question_set__scoring_policy', 'id', 'question_number', 'correct_answers', 'explanation')
+
+
+def compile_answer_key(question_set_id: int) -> CompiledAnswerKey:
+    """从数据库读取题目集合的全部题目并编译答案键（一次查询）"""
+    rows = list(Question.objects.filter(question_set_id=question_set_id).values_list(*ANSWER_KEY_FIELDS))
+    scoring_policy = rows[0][0] if rows else 'strict'
+    return CompiledAnswerKey(question_set_id, [row[1:] for row in rows], scoring_policy)
+
+
+class AnswerKeyCache:
+    """进程内的答案键缓存，同时维护题目ID到所属答案键的索引
+
+    本进程内修改题目时通过信号失效；其他进程的修改最迟在 ANSWER_KEY_CACHE_TTL 秒后生效。
+    """
+
+    def __init__(self):
+        self._keys = {}  # 题目集合ID -> CompiledAnswerKey
+        self._question_sets = {}  # 题目ID -> 题目集合ID
+        self._invalidations = 0  # 失效次数；编译期间发生过失效时编译结果不写入缓存
+        self._lock = threading.Lock()
+
+    def get(self, question_set_id: int) -> CompiledAnswerKey:
+        """获取题目集合的答案键，未缓存或已过期时重新编译"""
+        with self._lock:
+            key = self._keys.get(question_set_id)
+            invalidations = self._invalidations
+        if key is None or self._expired(key):
+            key = compile_answer_key(question_set_id)
+            self._store([key], invalidations)
+        return key
+
+    def locate(self, question_ids: Iterable[int]) -> Dict[int, Tuple[CompiledAnswerKey, int]]:
+        """查找题目所在的答案键和位置：题目ID -> (答案键, 位置)，不存在的题目不出现在结果中
+
+        未缓存的题目用一次查询取出其所属集合的全部题目并编译。
+        """
+        question_ids = set(question_ids)
+        located = {}
+        missing = set()
+        with self._lock:
+            invalidations = self._invalidations
+            for question_id in question_ids:
+                key = self._keys.get(self._question_sets.get(question_id))
+                if key is None or self._expired(key):
+                    missing.add(question_id)
+                else:
+                    located[question_id] = (key, key.positions[question_id])
+
+        if missing:
+            keys = self._compile_sets_of(missing)
+            self._store(keys, invalidations)
+            for key in keys:
+                for question_id in missing & key.positions.keys():
+                    located[question_id] = (key, key.positions[question_id])
+        return located
+
+    def invalidate(self, question_set_id: int):
+        with self._lock:
+            self._invalidations += 1
+            key = self._keys.pop(question_set_id, None)
+            if key is not None:
+                for question_id in key.positions:
+                    if self._question_sets.get(question_id) == question_set_id:
+                        del self._question_sets[question_id]
+
+    def clear(self):
+        with self._lock:
+            self._invalidations += 1
+            self._keys.clear()
+            self._question_sets.clear()
+
+    def _compile_sets_of(self, question_ids) -> List[CompiledAnswerKey]:
+        """编译给定题目所属的全部题目集合（子查询，一次往返）"""
+        rows = Question.objects.filter(
+            question_set__in=Question.objects.filter(id__in=question_ids).values('question_set')
+        ).values_list('question_set_id', *ANSWER_KEY_FIELDS)
+        grouped = {}
+        policies = {}
+        for question_set_id, scoring_policy, *row in rows:
+            grouped.setdefault(question_set_id, []).append(row)
+            policies[question_set_id] = scoring_policy
+        return [
+            CompiledAnswerKey(question_set_id, rows, policies[question_set_id])
+            for question_set_id, rows in grouped.items()
+        ]
+
+    def _store(self, keys: List[CompiledAnswerKey], invalidations: int):
+        """缓存编译结果；编译开始后发生过失效时不缓存（结果可能已过时，仅用于本次判分）"""
+        with self._lock:
+            if invalidations != self._invalidations:
+                return
+            for key in keys:
+                self._keys[key.question_set_id] = key
+                for question_id in key.positions:
+                    self._question_sets[question_id] = key.question_set_id
+
+    def _expired(self, key: CompiledAnswerKey) -> bool:
+        return time.monotonic() - key.compiled_at > settings.ANSWER_KEY_CACHE_TTL
+
+
+answer_keys = AnswerKeyCache()
+
+
+def get_answer_key(question_set_id: int) -> CompiledAnswerKey:
+    """获取题目集合的编译答案键（进程内缓存）"""
+    return answer_keys.get(question_set_id)
+
+
+def invalidate_answer_key(question_set_id: int):
+    """题目集合的题目变化后丢弃缓存的答案键（批量写入不触发信号，需要显式调用）"""
+    answer_keys.invalidate(question_set_id)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def _invalidate_on_question_change(sender, instance, **kwargs):
+    invalidate_answer_key(instance.question_set_id)
+
+
+@receiver(post_save, sender=QuestionSet)
+@receiver(post_delete, sender=QuestionSet)
+def _invalidate_on_question_set_change(sender, instance, **kwargs):
+    invalidate_answer_key(instance.id)
@@ -0,0 +1,179 @@
+import csv
+import json
+import re
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .option_masks import INVALID_OPTION, MASK_DTYPE, option_mask
+from .scoring import score_points
+
+# 本模块在判卷子进程中导入，只依赖numpy，不导入Django模型（Windows下子进程以spawn方式启动）
+
+# 一个单元格中的选项："AB"、"A,B"、"A B"、"A;B" 都表示选了A和B
+OPTION_SEPARATORS = re.compile(r'[\s,;，、]+')
+
+
+class SheetKey:
+    """发送给判卷子进程的答案键：题号、正确答案位掩码和判分策略（可以被pickle）"""
+
+    def __init__(self, question_numbers: List[int], masks: np.ndarray, scoring_policy: str,
+                 csv_columns: Optional[Dict[int, int]] = None):
+        self.question_numbers = question_numbers
+        self.number_positions = {number: position for position, number in enumerate(question_numbers)}
+        self.masks = np.asarray(masks, dtype=MASK_DTYPE)
+        self.scoring_policy = scoring_policy
+        self.csv_columns = csv_columns  # CSV列下标 -> 题目位置；JSONL输入时为None
+        if csv_columns is not None:
+            self.csv_column_indexes = list(csv_columns)
+            self.csv_positions = np.array(list(csv_columns.values()), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.masks)
+
+
+def parse_options(value) -> List[str]:
+    """把单元格或JSON中的作答解析成选项列表"""
+    if isinstance(value, (list, tuple)):
+        return [str(option).strip().upper() for option in value]
+    if value is None:
+        return []
+    text = str(value).strip().upper()
+    if not text:
+        return []
+    if OPTION_SEPARATORS.search(text):
+        return [option for option in OPTION_SEPARATORS.split(text) if option]
+    return list(text)
+
+
+@lru_cache(maxsize=4096)
+def _cached_mask(value) -> int:
+    return option_mask(parse_options(value))
+
+
+def answer_mask(value) -> int:
+    """单元格或JSON作答对应的位掩码；不同的作答写法很少，按原值缓存"""
+    if isinstance(value, list):
+        value = tuple(value)
+    try:
+        return _cached_mask(value)
+    except TypeError:  # 不可哈希的值（例如JSON对象）
+        return option_mask(parse_options(value))
+
+
+def _encode_json_sheet(key: SheetKey, line: str) -> Tuple[str, np.ndarray]:
+    """JSONL中的一份答卷：{"student": "...", "answers": {"1": ["A", "B"], "2": "C"}}"""
+    record = json.loads(line)
+    if not isinstance(record, dict) or not isinstance(record.get('answers'), dict):
+        raise ValueError('每行必须是包含answers对象的JSON')
+    sheet = np.zeros(len(key), dtype=MASK_DTYPE)
+    for number, value in record['answers'].items():
+        position = key.number_positions.get(int(number))
+        if position is None:
+            raise ValueError(f'题号 {number} 不在题目集合中')
+        sheet[position] = answer_mask(value)
+    return str(record.get('student', '')), sheet
+
+
+def _encode_csv_sheet(key: SheetKey, row: List[str]) -> Tuple[str, np.ndarray]:
+    """CSV中的一份答卷：第一列为学生标识，其余列为表头对应题号的作答"""
+    sheet = np.zeros(len(key), dtype=MASK_DTYPE)
+    if len(row) <= key.csv_column_indexes[-1]:
+        row = row + [''] * (key.csv_column_indexes[-1] + 1 - len(row))  # 行尾未作答的题目可以省略
+    sheet[key.csv_positions] = [answer_mask(row[column]) for column in key.csv_column_indexes]
+    return row[0], sheet
+
+
+_worker_key = None
+
+
+def init_worker(key: SheetKey):
+    """子进程初始化：答案键只传输一次"""
+    global _worker_key
+    _worker_key = key
+
+
+def grade_chunk(records: List[Tuple[int, object]], key: Optional[SheetKey] = None) -> Dict:
+    """给一批答卷判分（在子进程中执行）
+
+    records 为（行号，JSONL原始行或CSV行）列表。所有格式正确的答卷编码成一个二维位掩码数组，
+    一次比较并按判分策略计算得分；格式错误的答卷单独返回错误，不影响同批其他答卷。
+    """
+    key = key or _worker_key
+    encode = _encode_csv_sheet if key.csv_columns is not None else _encode_json_sheet
+    line_numbers, students, sheets, errors = [], [], [], []
+    for line_number, record in records:
+        try:
+            student, sheet = encode(key, record)
+        except (ValueError, TypeError) as e:
+            errors.append((line_number, str(e)))
+            continue
+        line_numbers.append(line_number)
+        students.append(student)
+        sheets.append(sheet)
+
+    sheets = np.stack(sheets) if sheets else np.zeros((0, len(key)), dtype=MASK_DTYPE)
+    correct = sheets == key.masks
+    points = score_points(key.scoring_policy, key.masks, sheets)
+    invalid = (key.masks & INVALID_OPTION) != 0
+    points[:, invalid] = correct[:, invalid]  # 答案键含无法编码的选项时只按位掩码是否相等计分
+    return {
+        'line_numbers': line_numbers,
+        'students': students,
+        'sheets': sheets,
+        'correct': correct,
+        'points': points,
+        'errors': errors,
+    }
+
+
+def iter_records(source, file_format: str) -> Tuple[Optional[List[str]], Iterator[Tuple[int, object]]]:
+    """逐行读取已打开的输入文件，返回（CSV表头，（行号，记录）迭代器）；JSONL没有表头"""
+    if file_format == 'csv':
+        reader = csv.reader(source)
+        header = next(reader, None)
+        rows = ((reader.line_num, row) for row in reader if any(cell.strip() for cell in row))
+        return header, rows
+
+    lines = ((line_number, line) for line_number, line in enumerate(source, start=1) if line.strip())
+    return None, lines
+
+
+def iter_chunks(records: Iterator, chunk_size: int) -> Iterator[List]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def grade_stream(key: SheetKey, records: Iterator, chunk_size: int, workers: int) -> Iterator[Dict]:
+    """按输入顺序逐批产出判分结果
+
+    workers > 1 时分发到进程池；同时在途的批次不超过进程数的2倍，
+    输入文件无论多大，内存中只保留有限的几批答卷。
+    """
+    chunks = iter_chunks(records, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            yield grade_chunk(chunk, key)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(key,)) as pool:
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append(pool.submit(grade_chunk, chunk))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
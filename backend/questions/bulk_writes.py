@@ -0,0 +1,32 @@
+from typing import List
+
+from django.db import connection, models
+from django.db.models.constants import OnConflict
+
+
+def insert_many(objs: List[models.Model], ignore_conflicts: bool = False):
+    """用一条 executemany 语句插入一批同一模型的对象（不回填主键）
+
+    bulk_create 受数据库参数个数的限制（SQLite 每条语句最多999个参数），每批只能插入
+    999 / 列数 行，语句数随行数增长；executemany 只准备一次语句，语句数与行数无关。
+    """
+    if not objs:
+        return
+    meta = type(objs[0])._meta
+    # 自增主键由数据库分配；非自增的主键（例如一对一外键作主键）照常插入
+    fields = [field for field in meta.concrete_fields if field is not meta.auto_field]
+    quote_name = connection.ops.quote_name
+    on_conflict = OnConflict.IGNORE if ignore_conflicts else None
+    sql = '{} {} ({}) VALUES ({}) {}'.format(
+        connection.ops.insert_statement(on_conflict=on_conflict),
+        quote_name(meta.db_table),
+        ', '.join(quote_name(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+        connection.ops.on_conflict_suffix_sql(fields, on_conflict, None, None)
+    ).rstrip()
+    params = [
+        [field.get_db_prep_save(field.pre_save(obj, True), connection) for field in fields]
+        for obj in objs
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
@@ -0,0 +1,69 @@
+import re
+from typing import List, Dict
+
+
+# 题号开头的行视为题目边界，例如 "12. " 或 "12、"
+QUESTION_BOUNDARY = re.compile(r'^[ \t]*\d+[\.、]', re.MULTILINE)
+CJK_CHAR = re.compile(r'[　-〿一-鿿＀-￯]')
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数：中日韩字符约1个token，其余字符约4个字符1个token"""
+    cjk_count = len(CJK_CHAR.findall(text))
+    return cjk_count + (len(text) - cjk_count + 3) // 4
+
+
+def split_question_blocks(text: str) -> List[str]:
+    """按题号边界把文本切分成题目块，第一个题号之前的内容单独成块"""
+    starts = [match.start() for match in QUESTION_BOUNDARY.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    starts.append(len(text))
+    return [text[start:end] for start, end in zip(starts, starts[1:]) if text[start:end].strip()]
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """把题目块按token预算合并成若干分片，题目不会被拆到两个分片中"""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for block in split_question_blocks(text):
+        block_tokens = estimate_tokens(block)
+        if current and current_tokens + block_tokens > max_tokens:
+            chunks.append(''.join(current))
+            current, current_tokens = [], 0
+        current.append(block)
+        current_tokens += block_tokens
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+
+def question_completeness(question: Dict) -> tuple:
+    """题目信息的完整程度：选项数、答案数、解析长度、题干长度"""
+    return (
+        len(question.get('options') or {}),
+        len(question.get('correct_answers') or []),
+        len(question.get('explanation') or ''),
+        len(question.get('question_text') or ''),
+    )
+
+
+def merge_chunk_results(results: List[List[Dict]]) -> List[Dict]:
+    """合并各分片的解析结果，按题号去重（保留信息最完整的一条）并按题号排序"""
+    merged = {}
+    unnumbered = []
+    for questions in results:
+        for question in questions or []:
+            if not isinstance(question, dict):
+                continue
+            try:
+                number = int(question.get('question_number'))
+            except (TypeError, ValueError):
+                unnumbered.append(question)
+                continue
+            question['question_number'] = number
+            existing = merged.get(number)
+            if existing is None or question_completeness(question) > question_completeness(existing):
+                merged[number] = question
+    return [merged[number] for number in sorted(merged)] + unnumbered
@@ -0,0 +1,185 @@
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+from typing import Dict, Optional
+
+
+class DiskCache:
+    """基于本地磁盘的键值缓存，带容量上限、过期时间和LRU淘汰
+
+    数据以文件形式保存在缓存目录下，条目大小、最近访问时间和命中统计
+    记录在同目录的SQLite索引中，可在多个线程和进程之间共享。
+    """
+
+    def __init__(self, directory, max_bytes: int, ttl: Optional[float] = None):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.index_path = os.path.join(self.directory, 'index.sqlite3')
+        self._initialized = False
+
+    def get(self, key: str, saved_bytes: int = 0) -> Optional[bytes]:
+        """读取缓存；命中时刷新访问时间，并累计节省的字节数"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT expires_at FROM entries WHERE key = ?', (key,)).fetchone()
+            value = None
+            if row is not None and row[0] is not None and row[0] < time.time():
+                # 已过期的条目按未命中处理
+                conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self._remove_file(key)
+                self._incr(conn, 'expired')
+            elif row is not None:
+                try:
+                    with open(self._data_path(key), 'rb') as data_file:
+                        value = data_file.read()
+                except OSError:
+                    conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+            if value is None:
+                self._incr(conn, 'misses')
+                return None
+
+            conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+            self._incr(conn, 'hits')
+            self._incr(conn, 'bytes_saved', saved_bytes)
+            return value
+
+    def set(self, key: str, value: bytes):
+        """写入缓存，超出容量时按最近最少使用淘汰"""
+        if len(value) > self.max_bytes:
+            return
+
+        data_path = self._data_path(key)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        # 每次写入使用唯一的临时文件，多个线程或进程同时写入同一个键时互不干扰
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(data_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as data_file:
+                data_file.write(value)
+            os.replace(temp_path, data_path)
+        except BaseException:
+            self._remove_path(temp_path)
+            raise
+
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (key, size, last_access, expires_at) VALUES (?, ?, ?, ?)',
+                (key, len(value), now, expires_at)
+            )
+            self._evict(conn)
+
+    def delete(self, key: str):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+        self._remove_file(key)
+
+    def clear(self):
+        """清空缓存条目和统计数据"""
+        with self._connect() as conn:
+            keys = [row[0] for row in conn.execute('SELECT key FROM entries')]
+            conn.execute('DELETE FROM entries')
+            conn.execute('DELETE FROM stats')
+        for key in keys:
+            self._remove_file(key)
+
+    def stats(self) -> Dict:
+        """返回条目数、占用空间、命中率等统计"""
+        with self._connect() as conn:
+            entries, total_size = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+            ).fetchone()
+            counters = dict(conn.execute('SELECT name, value FROM stats'))
+
+        hits = counters.get('hits', 0)
+        misses = counters.get('misses', 0)
+        lookups = hits + misses
+        return {
+            'entries': entries,
+            'total_size': total_size,
+            'max_bytes': self.max_bytes,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'bytes_saved': counters.get('bytes_saved', 0),
+            'evictions': counters.get('evictions', 0),
+            'expired': counters.get('expired', 0),
+        }
+
+    def _evict(self, conn):
+        total_size = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+
+        evicted = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY last_access'):
+            if total_size <= self.max_bytes:
+                break
+            evicted.append(key)
+            total_size -= size
+        conn.executemany('DELETE FROM entries WHERE key = ?', [(key,) for key in evicted])
+        self._incr(conn, 'evictions', len(evicted))
+        for key in evicted:
+            self._remove_file(key)
+
+    def _incr(self, conn, name: str, amount: int = 1):
+        if amount:
+            conn.execute(
+                'INSERT INTO stats (name, value) VALUES (?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+                (name, amount)
+            )
+
+    def _data_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _remove_file(self, key: str):
+        self._remove_path(self._data_path(key))
+
+    @staticmethod
+    def _remove_path(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        if not self._initialized:
+            # 在写事务中检查和建表，多个线程或进程同时初始化时不会重复添加列
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, size INTEGER NOT NULL, last_access REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(entries)')]
+            if 'expires_at' not in columns:
+                conn.execute('ALTER TABLE entries ADD COLUMN expires_at REAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            conn.commit()
+            self._initialized = True
+        return _Transaction(conn)
+
+
+class _Transaction:
+    """在with块结束时提交并关闭SQLite连接"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        with closing(self.conn):
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        return False
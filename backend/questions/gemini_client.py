@@ -0,0 +1,169 @@
+import json
+import random
+import threading
+import time
+from contextlib import closing
+from typing import TYPE_CHECKING, Dict, Iterator, Optional
+
+from django.conf import settings
+
+if TYPE_CHECKING:
+    import requests
+
+
+# 可重试的HTTP状态码：限流和服务端临时错误
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class GeminiAPIError(Exception):
+    """Gemini API返回非200响应"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TokenBucket:
+    """令牌桶限流器：按每分钟速率持续补充令牌，令牌不足时阻塞等待"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1):
+        """取出指定数量的令牌（超过桶容量时按容量计算）"""
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimiter:
+    """同时限制每分钟请求数和每分钟token数"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def acquire(self, tokens: int):
+        self.requests.acquire(1)
+        self.tokens.acquire(tokens)
+
+
+class GeminiClient:
+    """复用连接池的Gemini HTTP客户端，带指数退避重试和客户端限流"""
+
+    def __init__(self, api_key: str, limiter: RateLimiter, pool_size: int = 10,
+                 max_retries: int = 5, backoff_base: float = 1.0, backoff_max: float = 30.0,
+                 timeout: float = 60):
+        self.api_key = api_key
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        # requests在创建客户端（第一次调用API）时才导入
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+    def backoff(self, attempt: int) -> float:
+        """指数退避（full jitter）：在 [0, base * 2^attempt] 内随机等待"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def post(self, url: str, payload: Dict, estimated_tokens: int = 0, **kwargs) -> 'requests.Response':
+        """发送请求；遇到可重试状态码或网络错误时退避重试，返回200响应"""
+        import requests
+
+        attempt = 0
+        while True:
+            self.limiter.acquire(estimated_tokens)
+            try:
+                response = self.session.post(
+                    url,
+                    params={'key': self.api_key},
+                    json=payload,
+                    timeout=self.timeout,
+                    **kwargs
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self.backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code == 200:
+                return response
+
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                retry_after = self._retry_after(response)
+                response.close()
+                time.sleep(retry_after if retry_after is not None else self.backoff(attempt))
+                attempt += 1
+                continue
+
+            error_msg = f"API请求失败: {response.status_code}"
+            if response.text:
+                error_msg += f" - {response.text}"
+            raise GeminiAPIError(response.status_code, error_msg)
+
+    def generate_content(self, url: str, payload: Dict, estimated_tokens: int = 0) -> Dict:
+        return self.post(url, payload, estimated_tokens).json()
+
+    def stream_generate_content(self, url: str, payload: Dict, estimated_tokens: int = 0) -> Iterator[Dict]:
+        """流式生成（streamGenerateContent?alt=sse）：逐个产出SSE事件中的响应片段
+
+        只有建立连接和收到响应头之前的错误会退避重试，读取过程中断时直接抛出。
+        """
+        response = self.post(url, payload, estimated_tokens, stream=True)
+        with closing(response):
+            for line in response.iter_lines():
+                # 事件流没有声明字符集，按UTF-8自行解码
+                line = line.decode('utf-8')
+                if line.startswith('data:'):
+                    yield json.loads(line[5:])
+
+    def _retry_after(self, response) -> Optional[float]:
+        value = response.headers.get('Retry-After')
+        try:
+            return min(float(value), self.backoff_max) if value is not None else None
+        except ValueError:
+            return None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_gemini_client() -> GeminiClient:
+    """获取进程内共享的Gemini客户端，所有解析器实例共用连接池和限流器"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GeminiClient(
+                api_key=settings.GEMINI_API_KEY,
+                limiter=RateLimiter(settings.GEMINI_REQUESTS_PER_MINUTE, settings.GEMINI_TOKENS_PER_MINUTE),
+                pool_size=settings.GEMINI_MAX_CONCURRENCY * settings.INGESTION_WORKERS,
+                max_retries=settings.GEMINI_MAX_RETRIES,
+                backoff_base=settings.GEMINI_BACKOFF_BASE,
+                backoff_max=settings.GEMINI_BACKOFF_MAX,
+                timeout=settings.GEMINI_REQUEST_TIMEOUT
+            )
+        return _client
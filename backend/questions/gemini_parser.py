@@ -1,56 +1,93 @@
-import re
 import json
 import os
-import requests
-import PyPDF2
-import pdfplumber
-from typing import List, Dict, Tuple
+import hashlib
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Dict, Tuple, Optional
 from django.conf import settings
+from .chunking import estimate_tokens, split_into_chunks, merge_chunk_results
+from .disk_cache import DiskCache
+from .gemini_client import get_gemini_client
+from .json_recovery import recover_json_objects, StreamingObjectDecoder
+from .pdf_extraction import extract_text
+from .question_lexer import parse_question_text, parse_answer_text
+from .response_extractor import build_questions_from_text
+
+
+_response_cache = None
+
+
+def get_response_cache() -> DiskCache:
+    """获取Gemini响应缓存"""
+    global _response_cache
+    if _response_cache is None or _response_cache.directory != str(settings.GEMINI_CACHE_DIR):
+        _response_cache = DiskCache(
+            settings.GEMINI_CACHE_DIR,
+            settings.GEMINI_CACHE_MAX_BYTES,
+            ttl=settings.GEMINI_CACHE_TTL
+        )
+    return _response_cache
 
 
 class GeminiPDFParser:
     """使用HTTP请求直接调用Gemini API的PDF解析工具类"""
     
-    def __init__(self):
+    def __init__(self, use_cache: Optional[bool] = None):
         # 从环境变量获取API密钥
         self.api_key = os.getenv('GEMINI_API_KEY')
         if not self.api_key:
             raise ValueError("请设置GEMINI_API_KEY环境变量")
         
         # Gemini API配置
-        self.api_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
-        self.headers = {
-            "Content-Type": "application/json",
+        self.api_url = f"{settings.GEMINI_MODEL_URL}:generateContent"
+        self.stream_url = f"{settings.GEMINI_MODEL_URL}:streamGenerateContent?alt=sse"
+        self.generation_config = {
+            "temperature": 0.1,
+            "topP": 0.8,
+            "topK": 40,
+            "maxOutputTokens": settings.GEMINI_MAX_OUTPUT_TOKENS,
         }
         
-        # 备用正则表达式解析器
-        self.question_pattern = re.compile(r'(\d+)[\.、]\s*(.+)')
-        self.option_pattern = re.compile(r'([A-D])[\.、]\s*(.+)')
-        self.answer_pattern = re.compile(r'答案[：:]\s*([A-D]+)')
-        self.explanation_pattern = re.compile(r'解析[：:]\s*(.+)')
+        # 响应缓存：use_cache=False 时绕过缓存直接请求API
+        self.use_cache = settings.GEMINI_CACHE_ENABLED if use_cache is None else use_cache
     
-    def extract_text_from_pdf(self, pdf_file) -> str:
-        """从PDF文件中提取文本"""
-        try:
-            # 尝试使用pdfplumber（更好的文本提取）
-            with pdfplumber.open(pdf_file) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    text += page.extract_text() or ""
-                return text
-        except Exception as e:
-            # 备用方案：使用PyPDF2
-            try:
-                pdf_reader = PyPDF2.PdfReader(pdf_file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
-                return text
-            except Exception as e2:
-                raise Exception(f"无法解析PDF文件: {str(e2)}")
+    def extract_text_from_pdf(self, pdf_file, digest: Optional[str] = None) -> str:
+        """从PDF文件中提取文本（按页并行提取，单页失败时回退到PyPDF2）
+
+        digest 为上传时已计算的SHA-256，提供时不再读取文件计算缓存键。
+        """
+        return extract_text(pdf_file, digest=digest)
+    
+    def cache_key(self, prompt: str) -> str:
+        """缓存键：模型地址、生成参数和提示词的哈希"""
+        payload = json.dumps({
+            'api_url': self.api_url,
+            'generationConfig': self.generation_config,
+            'prompt': prompt,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def call_gemini_api(self, prompt: str, use_cache: Optional[bool] = None) -> str:
+        """调用Gemini API；相同的模型、参数和提示词优先读取响应缓存"""
+        if use_cache is None:
+            use_cache = self.use_cache
+        if not use_cache:
+            return self._request_gemini_api(prompt)
+        
+        cache = get_response_cache()
+        key = self.cache_key(prompt)
+        cached = cache.get(key, saved_bytes=len(prompt.encode('utf-8')))
+        if cached is not None:
+            return cached.decode('utf-8')
+        
+        response_text = self._request_gemini_api(prompt)
+        cache.set(key, response_text.encode('utf-8'))
+        return response_text
     
-    def call_gemini_api(self, prompt: str) -> str:
+    def _request_gemini_api(self, prompt: str) -> str:
         """直接调用Gemini API"""
+        import requests
+
         try:
             # 构建请求数据
             data = {
@@ -63,38 +100,25 @@ class GeminiPDFParser:
                         ]
                     }
                 ],
-                "generationConfig": {
-                    "temperature": 0.1,
-                    "topP": 0.8,
-                    "topK": 40,
-                    "maxOutputTokens": 2048,
-                }
+                "generationConfig": self.generation_config
             }
             
-            # 发送请求
-            response = requests.post(
-                f"{self.api_url}?key={self.api_key}",
-                headers=self.headers,
-                json=data,
-                timeout=30
+            # 通过共享客户端发送请求（连接复用、限流、退避重试）
+            result = get_gemini_client().generate_content(
+                self.api_url,
+                data,
+                estimated_tokens=estimate_tokens(prompt)
             )
             
             # 检查响应
-            if response.status_code == 200:
-                result = response.json()
-                if 'candidates' in result and len(result['candidates']) > 0:
-                    content = result['candidates'][0]['content']
-                    if 'parts' in content and len(content['parts']) > 0:
-                        return content['parts'][0]['text']
-                    else:
-                        raise Exception("API响应格式异常：缺少parts")
+            if 'candidates' in result and len(result['candidates']) > 0:
+                content = result['candidates'][0]['content']
+                if 'parts' in content and len(content['parts']) > 0:
+                    return content['parts'][0]['text']
                 else:
-                    raise Exception("API响应格式异常：缺少candidates")
+                    raise Exception("API响应格式异常：缺少parts")
             else:
-                error_msg = f"API请求失败: {response.status_code}"
-                if response.text:
-                    error_msg += f" - {response.text}"
-                raise Exception(error_msg)
+                raise Exception("API响应格式异常：缺少candidates")
                 
         except requests.exceptions.Timeout:
             raise Exception("API请求超时")
@@ -103,16 +127,67 @@ class GeminiPDFParser:
         except Exception as e:
             raise Exception(f"API调用失败: {str(e)}")
     
-    def parse_with_gemini(self, text: str) -> List[Dict]:
-        """使用Gemini API解析题目文本"""
+    def stream_gemini_api(self, prompt: str, use_cache: Optional[bool] = None) -> Iterator[str]:
+        """流式调用Gemini API，逐段产出生成的文本；命中缓存时一次产出完整响应"""
+        if use_cache is None:
+            use_cache = self.use_cache
+        if not use_cache:
+            yield from self._stream_gemini_api(prompt)
+            return
+        
+        cache = get_response_cache()
+        key = self.cache_key(prompt)
+        cached = cache.get(key, saved_bytes=len(prompt.encode('utf-8')))
+        if cached is not None:
+            yield cached.decode('utf-8')
+            return
+        
+        fragments = []
+        for fragment in self._stream_gemini_api(prompt):
+            fragments.append(fragment)
+            yield fragment
+        # 流完整结束后才写入缓存，与非流式请求共用同一个缓存键
+        cache.set(key, ''.join(fragments).encode('utf-8'))
+    
+    def _stream_gemini_api(self, prompt: str) -> Iterator[str]:
+        """直接调用Gemini流式接口"""
+        import requests
+
+        data = {
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": self.generation_config
+        }
         try:
-            # 限制文本长度 - 减少到更安全的长度
-            if len(text) > 15000:  # 减少到15000字符
-                text = text[:15000]
-                print("警告：文本过长，已截断到15000字符")
-            
-            # 构建更明确的提示
-            prompt = f"""
+            events = get_gemini_client().stream_generate_content(
+                self.stream_url,
+                data,
+                estimated_tokens=estimate_tokens(prompt)
+            )
+            for event in events:
+                for candidate in event.get('candidates', []):
+                    for part in candidate.get('content', {}).get('parts', []):
+                        if part.get('text'):
+                            yield part['text']
+        except requests.exceptions.Timeout:
+            raise Exception("API请求超时")
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"网络请求错误: {str(e)}")
+        except Exception as e:
+            raise Exception(f"API调用失败: {str(e)}")
+    
+    def stream_response(self, prompt: str, on_question: Callable[[Dict], None]) -> str:
+        """流式接收响应，每个题目对象一完整就交给 on_question，返回完整响应文本"""
+        decoder = StreamingObjectDecoder()
+        fragments = []
+        for fragment in self.stream_gemini_api(prompt):
+            fragments.append(fragment)
+            for question in decoder.feed(fragment):
+                on_question(question)
+        return ''.join(fragments)
+    
+    def build_prompt(self, text: str) -> str:
+        """构建题目解析提示词"""
+        return f"""
 请解析以下题目文本，返回JSON格式的题目列表。
 
 要求：
@@ -135,235 +210,124 @@ class GeminiPDFParser:
   }}
 ]
 """
+    
+    def parse_with_gemini(self, text: str, on_question: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """使用Gemini API解析题目文本：按题号分片后并发请求，再按题号合并去重
+
+        传入 on_question 时，每解析出一道题就在调用线程中回调一次（流式响应边生成边回调），
+        同一题号可能回调多次，以最后返回的合并结果为准。
+        """
+        chunks = split_into_chunks(text, settings.GEMINI_CHUNK_TOKENS)
+        if on_question is None and len(chunks) <= 1:
+            return self.parse_chunk_with_gemini(text)
+        
+        print(f"文本已切分为 {len(chunks)} 个分片，并发数: {settings.GEMINI_MAX_CONCURRENCY}")
+        with ThreadPoolExecutor(max_workers=settings.GEMINI_MAX_CONCURRENCY) as executor:
+            if on_question is None:
+                results = list(executor.map(self.parse_chunk_with_gemini, chunks))
+            else:
+                results = self._parse_chunks_with_callback(executor, chunks, on_question)
+        
+        questions = merge_chunk_results(results)
+        print(f"合并后共 {len(questions)} 道题目")
+        return questions
+    
+    def _parse_chunks_with_callback(self, executor, chunks: List[str], on_question) -> List[List[Dict]]:
+        """分片在线程池中解析，题目经队列转交调用线程回调（数据库写入不跨线程）"""
+        finished = object()
+        events = queue.Queue()
+        
+        def parse_chunk(chunk):
+            try:
+                return self.parse_chunk_with_gemini(chunk, on_question=events.put)
+            finally:
+                events.put(finished)
+        
+        futures = [executor.submit(parse_chunk, chunk) for chunk in chunks]
+        remaining = len(futures)
+        while remaining:
+            event = events.get()
+            if event is finished:
+                remaining -= 1
+            else:
+                on_question(event)
+        return [future.result() for future in futures]
+    
+    def parse_chunk_with_gemini(self, text: str, on_question: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """解析单个分片；API失败或响应无效时该分片使用正则解析
+
+        传入 on_question 且开启流式生成时，题目对象在响应生成过程中逐个回调；
+        分片结束后再对最终结果逐个回调一次。
+        """
+        try:
+            prompt = self.build_prompt(text)
             
             print(f"正在调用Gemini API，文本长度: {len(text)}")
             
             # 调用API
-            ai_response = self.call_gemini_api(prompt)
+            if on_question is not None and settings.GEMINI_STREAMING:
+                ai_response = self.stream_response(prompt, on_question)
+            else:
+                ai_response = self.call_gemini_api(prompt)
             
-            print(f"Gemini API完整响应: {ai_response}")
+            print(f"Gemini API响应长度: {len(ai_response)}")
             
             # 改进的JSON提取逻辑
             json_data = self.extract_json_from_response(ai_response)
             
             if json_data:
                 print(f"成功解析 {len(json_data)} 道题目")
-                return json_data
+                questions = json_data
             else:
                 print("未找到有效的JSON格式，使用备用解析")
-                return self.parse_with_regex(text)
+                questions = self.parse_with_regex(text)
                 
         except Exception as e:
             print(f"Gemini解析失败: {str(e)}")
-            return self.parse_with_regex(text)
+            questions = self.parse_with_regex(text)
+        
+        if on_question is not None:
+            for question in questions:
+                on_question(question)
+        return questions
 
     def extract_json_from_response(self, response_text: str) -> List[Dict]:
         """从API响应中提取JSON数据"""
+        # 方法1：直接尝试解析整个响应
         try:
-            # 方法1：直接尝试解析整个响应
-            try:
-                data = json.loads(response_text.strip())
-                if isinstance(data, list):
-                    return data
-            except:
-                pass
-            
-            # 方法2：查找JSON数组
-            json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-            if json_match:
-                try:
-                    data = json.loads(json_match.group())
-                    if isinstance(data, list):
-                        return data
-                except:
-                    pass
-            
-            # 方法3：查找JSON对象数组的其他模式
-            patterns = [
-                r'\[\s*\{.*\}\s*\]',  # 标准数组
-                r'\{.*\}.*\{.*\}',    # 多个对象
-                r'question_number.*question_text',  # 包含关键字段
-            ]
-            
-            for pattern in patterns:
-                matches = re.findall(pattern, response_text, re.DOTALL)
-                for match in matches:
-                    try:
-                        # 尝试修复常见的JSON格式问题
-                        fixed_json = self.fix_json_format(match)
-                        data = json.loads(fixed_json)
-                        if isinstance(data, list):
-                            return data
-                    except:
-                        continue
-            
-            # 方法4：手动构建JSON（如果响应包含结构化信息）
-            return self.build_json_from_text(response_text)
-            
-        except Exception as e:
-            print(f"JSON提取失败: {e}")
-            return None
-
-    def fix_json_format(self, text: str) -> str:
-        """修复常见的JSON格式问题"""
-        # 移除可能的markdown标记
-        text = re.sub(r'```json\s*', '', text)
-        text = re.sub(r'```\s*$', '', text)
+            data = json.loads(response_text.strip())
+            if isinstance(data, list):
+                return data
+        except ValueError:
+            pass
         
-        # 修复单引号
-        text = text.replace("'", '"')
+        # 方法2：单遍扫描，逐个解码题目对象，跳过无法解析的对象
+        questions, rejected = recover_json_objects(response_text)
+        if rejected:
+            print(f"跳过 {len(rejected)} 个无法解析的JSON对象:")
+            for item in rejected:
+                print(f"  位置 {item.start}-{item.end}: {item.error}")
+        if questions:
+            return questions
         
-        # 修复没有引号的键
-        text = re.sub(r'(\w+):', r'"\1":', text)
-        
-        return text
+        # 方法3：手动构建JSON（如果响应包含结构化信息）
+        return self.build_json_from_text(response_text)
 
     def build_json_from_text(self, text: str) -> List[Dict]:
         """从文本中手动构建JSON（备用方案）"""
-        questions = []
-        
-        # 查找题目编号
-        question_matches = re.findall(r'(\d+)[\.、]\s*(.+)', text)
-        
-        for i, (number, content) in enumerate(question_matches):
-            question = {
-                'question_number': int(number),
-                'question_text': content.strip(),
-                'options': {},
-                'question_type': 'single',
-                'correct_answers': [],
-                'explanation': ''
-            }
-            
-            # 查找选项
-            options_text = text[text.find(content):text.find(content) + 500]  # 在题目附近查找
-            option_matches = re.findall(r'([A-D])[\.、]\s*(.+)', options_text)
-            for opt_key, opt_text in option_matches:
-                question['options'][opt_key] = opt_text.strip()
-            
-            # 查找答案
-            answer_match = re.search(rf'{number}[^A-D]*答案[：:]\s*([A-D]+)', text)
-            if answer_match:
-                question['correct_answers'] = list(answer_match.group(1))
-                if len(question['correct_answers']) > 1:
-                    question['question_type'] = 'multiple'
-            
-            questions.append(question)
-        
-        return questions
+        return build_questions_from_text(text)
     
     def parse_with_regex(self, text: str) -> List[Dict]:
         """使用正则表达式解析题目文本（备用方案）"""
-        questions = []
-        lines = text.split('\n')
-        current_question = None
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # 检查是否是题目开始
-            question_match = self.question_pattern.match(line)
-            if question_match:
-                # 保存前一个题目
-                if current_question:
-                    questions.append(current_question)
-                
-                # 开始新题目
-                question_number = int(question_match.group(1))
-                question_text = question_match.group(2)
-                
-                current_question = {
-                    'question_number': question_number,
-                    'question_text': question_text,
-                    'options': {},
-                    'question_type': 'single',
-                    'correct_answers': [],
-                    'explanation': ''
-                }
-                continue
-            
-            # 检查是否是选项
-            option_match = self.option_pattern.match(line)
-            if option_match and current_question:
-                option_key = option_match.group(1)
-                option_text = option_match.group(2)
-                current_question['options'][option_key] = option_text
-                continue
-            
-            # 检查是否是答案
-            answer_match = self.answer_pattern.search(line)
-            if answer_match and current_question:
-                answers = answer_match.group(1)
-                current_question['correct_answers'] = list(answers)
-                if len(answers) > 1:
-                    current_question['question_type'] = 'multiple'
-                continue
-            
-            # 检查是否是解析
-            explanation_match = self.explanation_pattern.search(line)
-            if explanation_match and current_question:
-                current_question['explanation'] = explanation_match.group(1)
-                continue
-            
-            # 处理延续内容
-            if current_question:
-                if not current_question['options']:
-                    current_question['question_text'] += ' ' + line
-                elif current_question['explanation']:
-                    current_question['explanation'] += ' ' + line
-        
-        # 添加最后一个题目
-        if current_question:
-            questions.append(current_question)
-        
-        return questions
+        return parse_question_text(text)
     
-    def parse_questions(self, text: str) -> List[Dict]:
+    def parse_questions(self, text: str, on_question: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
         """解析题目文本（优先使用Gemini）"""
-        return self.parse_with_gemini(text)
+        return self.parse_with_gemini(text, on_question)
     
     def parse_answers(self, text: str) -> Dict[int, Dict]:
         """解析答案解析文本"""
-        answers = {}
-        lines = text.split('\n')
-        current_answer = None
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # 检查是否是答案开始
-            answer_match = self.answer_pattern.search(line)
-            if answer_match:
-                # 尝试从行中找到题号
-                number_match = re.search(r'(\d+)[\.、]', line)
-                if number_match:
-                    question_number = int(number_match.group(1))
-                    answers_text = answer_match.group(1)
-                    
-                    current_answer = {
-                        'question_number': question_number,
-                        'correct_answers': list(answers_text),
-                        'explanation': ''
-                    }
-                    continue
-            
-            # 检查是否是解析
-            explanation_match = self.explanation_pattern.search(line)
-            if explanation_match and current_answer:
-                current_answer['explanation'] = explanation_match.group(1)
-                answers[current_answer['question_number']] = current_answer
-                current_answer = None
-                continue
-            
-            # 处理延续内容
-            if current_answer and current_answer['explanation']:
-                current_answer['explanation'] += ' ' + line
-        
-        return answers
+        return parse_answer_text(text)
     
     def merge_questions_and_answers(self, questions: List[Dict], answers: Dict[int, Dict]) -> List[Dict]:
         """合并题目和答案信息"""
@@ -0,0 +1,298 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+
+from .answer_buffer import save_user_answers
+from .answer_keys import (
+    INVALID_OPTION, MASK_DTYPE, CompiledAnswerKey, answer_keys, encode_answers, get_answer_key, mask_options,
+    option_mask
+)
+from .leaderboard import record_attempt_score
+from .models import ExamAttempt, QuestionSet, UserAnswer
+from .scoring import POINTS_DTYPE, score_points
+from .statistics import record_exam_attempt
+
+# 考试记录中逐题结果的存储格式（小端序，与运行平台无关）
+ATTEMPT_ID_DTYPE = np.dtype('<i8')
+ATTEMPT_NUMBER_DTYPE = np.dtype('<i4')
+ATTEMPT_MASK_DTYPE = np.dtype('<u2')
+
+
+def is_answer_correct(correct_answers: List[str], user_answers: List[str]) -> bool:
+    """判断答案是否正确：所选选项与正确答案完全一致（不计顺序和重复）"""
+    return set(correct_answers) == set(user_answers)
+
+
+def _question_id(value):
+    """把请求中的题目ID转换成整数；缺失时返回None"""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"题目ID格式错误: {value}")
+
+
+def _user_answers(value) -> List[str]:
+    if not isinstance(value, list) or not all(isinstance(option, str) for option in value):
+        raise ValueError(f"user_answers必须是选项字符串列表: {value}")
+    return value
+
+
+def grade_sheets(key: CompiledAnswerKey, sheets) -> np.ndarray:
+    """用数组运算批量判卷
+
+    sheets 为与答案键对齐的位掩码数组：单份答卷形状为 (题目数,)，多份答卷为 (答卷数, 题目数)，
+    未作答的题目为0。返回同形状的布尔数组，表示每道题是否答对。
+    """
+    sheets = np.asarray(sheets, dtype=MASK_DTYPE)
+    if sheets.shape[-1] != len(key):
+        raise ValueError(f"答卷题目数 {sheets.shape[-1]} 与答案键题目数 {len(key)} 不一致")
+    return sheets == key.masks
+
+
+def score_sheets(key: CompiledAnswerKey, sheets) -> np.ndarray:
+    """每份答卷答对的题目数"""
+    return np.count_nonzero(grade_sheets(key, sheets), axis=-1)
+
+
+def _grade_located(found: List[Tuple[CompiledAnswerKey, int]], submitted: List[List[str]]):
+    """按答案键中的位置给一组答案判分，返回（是否正确列表，得分列表）
+
+    found[i] 为第 i 个答案对应的（答案键, 位置）。所有答案的位掩码一次比较，
+    得分按各答案键的判分策略分组计算。
+    """
+    key_masks = np.fromiter((key.masks[position] for key, position in found), dtype=MASK_DTYPE, count=len(found))
+    sheet_masks = encode_answers(submitted)
+    correct = sheet_masks == key_masks
+    points = np.zeros(len(found), dtype=POINTS_DTYPE)
+    policies = np.array([key.scoring_policy for key, _ in found], dtype=object)
+    for policy in set(policies.tolist()):
+        selected = policies == policy
+        points[selected] = score_points(policy, key_masks[selected], sheet_masks[selected])
+
+    correct, points = correct.tolist(), points.tolist()
+    for slot in np.flatnonzero(key_masks & INVALID_OPTION).tolist():
+        # 正确答案中含有无法编码的选项时按原始字符串比较
+        key, position = found[slot]
+        correct[slot] = is_answer_correct(key.correct_answers[position], submitted[slot])
+        points[slot] = float(correct[slot])
+    return correct, points
+
+
+def grade_batch(answers_data: List[Dict]) -> List[Dict]:
+    """批量判分并保存答题记录
+
+    题目的正确答案从进程内缓存的编译答案键中读取（未缓存时一次查询编译），
+    用位掩码数组一次比较所有答案并按题目所在集合的判分策略计算得分，所有答题记录在一个事务中批量插入
+    （开启 ANSWER_WRITE_BEHIND 时放入写后缓冲区，由后台线程批量写入）。
+    返回的结果与请求中的答案一一对应；题目不存在的答案只返回错误，不保存记录。
+    请求格式错误时在访问数据库之前抛出 ValueError，不会写入任何记录。
+    """
+    if not isinstance(answers_data, list) or not all(isinstance(item, dict) for item in answers_data):
+        raise ValueError("answers必须是答案对象列表")
+
+    question_ids = [_question_id(answer_data.get('question_id')) for answer_data in answers_data]
+    submitted = [_user_answers(answer_data.get('user_answers', [])) for answer_data in answers_data]
+    located = answer_keys.locate(question_id for question_id in question_ids if question_id is not None)
+
+    found = [located.get(question_id) for question_id in question_ids]
+    graded = [index for index, location in enumerate(found) if location is not None]
+    correct, points = _grade_located([found[index] for index in graded], [submitted[index] for index in graded])
+
+    results = [None] * len(answers_data)
+    user_answers_to_save = []
+    for index, is_correct, answer_points in zip(graded, correct, points):
+        key, position = found[index]
+        correct_answers = key.correct_answers[position]
+        user_answers_to_save.append(UserAnswer(
+            question_id=question_ids[index],
+            user_answers=submitted[index],
+            is_correct=is_correct,
+            points=answer_points
+        ))
+        results[index] = {
+            'question_id': answers_data[index].get('question_id'),
+            'is_correct': is_correct,
+            'points': answer_points,
+            'correct_answers': correct_answers,
+            'explanation': key.explanations[position]
+        }
+    for index, result in enumerate(results):
+        if result is None:
+            results[index] = {
+                'question_id': answers_data[index].get('question_id'),
+                'error': '题目不存在'
+            }
+
+    save_user_answers(user_answers_to_save)
+    return results
+
+
+def grade_exam(question_set: QuestionSet, answers_data: List[Dict], student: str = '') -> ExamAttempt:
+    """整套题目一次提交：判分并保存考试记录
+
+    用题目集合（别名集合使用其指向集合）的编译答案键把答卷编码成位掩码数组一次判分，
+    按该集合的判分策略计算总分（与单题判分相同，别名集合使用其指向集合的策略），逐题结果按答案键的题目顺序压缩保存在一条考试记录中；
+    未作答的题目计为答错。题目统计、成绩榜和得分分布在同一事务中更新。
+    请求格式错误、题目不属于该集合或重复作答时抛出 ValueError，不会写入任何记录。
+    """
+    if not isinstance(answers_data, list) or not all(isinstance(item, dict) for item in answers_data):
+        raise ValueError("answers必须是答案对象列表")
+
+    key = get_answer_key(question_set.canonical.id)
+    sheet = np.zeros(len(key), dtype=MASK_DTYPE)
+    submitted = {}
+    for answer_data in answers_data:
+        question_id = _question_id(answer_data.get('question_id'))
+        user_answers = _user_answers(answer_data.get('user_answers', []))
+        position = key.positions.get(question_id)
+        if position is None:
+            raise ValueError(f"题目 {question_id} 不属于题目集合 {question_set.id}")
+        if position in submitted:
+            raise ValueError(f"题目 {question_id} 重复作答")
+        submitted[position] = user_answers
+        sheet[position] = option_mask(user_answers)
+
+    correct = grade_sheets(key, sheet)
+    points = score_points(key.scoring_policy, key.masks, sheet)
+    for position in np.flatnonzero(key.masks & INVALID_OPTION).tolist():
+        # 正确答案中含有无法编码的选项时按原始字符串比较
+        correct[position] = is_answer_correct(key.correct_answers[position], submitted.get(position, []))
+        points[position] = correct[position]
+
+    with transaction.atomic():
+        attempt = ExamAttempt.objects.create(
+            question_set=question_set,
+            student=student,
+            question_ids=key.question_ids.astype(ATTEMPT_ID_DTYPE).tobytes(),
+            question_numbers=key.question_numbers.astype(ATTEMPT_NUMBER_DTYPE).tobytes(),
+            answer_masks=sheet.astype(ATTEMPT_MASK_DTYPE).tobytes(),
+            correct_flags=np.packbits(correct).tobytes(),
+            scoring_policy=key.scoring_policy,
+            score=float(points.sum()),
+            total=len(key)
+        )
+        record_exam_attempt(key.question_ids, sheet, correct, attempt.score)
+        record_attempt_score(attempt)
+    return attempt
+
+
+def decode_attempt_arrays(attempt: ExamAttempt):
+    """解码考试记录中的（题目ID数组，作答位掩码数组，是否答对数组）"""
+    question_ids = np.frombuffer(bytes(attempt.question_ids), dtype=ATTEMPT_ID_DTYPE)
+    masks = np.frombuffer(bytes(attempt.answer_masks), dtype=ATTEMPT_MASK_DTYPE)
+    correct = np.unpackbits(
+        np.frombuffer(bytes(attempt.correct_flags), dtype=np.uint8), count=len(question_ids)
+    ).astype(bool)
+    return question_ids, masks, correct
+
+
+def attempt_results(attempt: ExamAttempt) -> List[Dict]:
+    """解码考试记录中保存的逐题结果（不访问数据库）"""
+    question_ids, masks, correct = decode_attempt_arrays(attempt)
+    question_numbers = np.frombuffer(bytes(attempt.question_numbers), dtype=ATTEMPT_NUMBER_DTYPE)
+    return [
+        {
+            'question_id': question_id,
+            'question_number': question_number,
+            'user_answers': mask_options(mask),
+            'is_correct': is_correct
+        }
+        for question_id, question_number, mask, is_correct in zip(
+            question_ids.tolist(), question_numbers.tolist(), masks.tolist(), correct.tolist()
+        )
+    ]
+
+
+def rescore_user_answers(question_set_ids: Optional[Iterable[int]] = None, chunk_size: int = 5000) -> int:
+    """按当前答案键和判分策略重新计算答题记录的是否正确和得分，返回发生变化的记录数
+
+    按ID顺序每次读取 chunk_size 条记录，整块一次判分，有变化的记录在一个事务中批量更新。
+    question_set_ids 为空时处理全部记录。
+    """
+    answers = UserAnswer.objects.order_by('id')
+    if question_set_ids is not None:
+        answers = answers.filter(question__question_set_id__in=list(question_set_ids))
+
+    changed = 0
+    last_id = 0
+    while True:
+        rows = list(answers.filter(id__gt=last_id).values_list(
+            'id', 'question_id', 'user_answers', 'is_correct', 'points'
+        )[:chunk_size])
+        if not rows:
+            return changed
+        last_id = rows[-1][0]
+        located = answer_keys.locate({row[1] for row in rows})
+        rows = [row for row in rows if row[1] in located]
+        correct, points = _grade_located(
+            [located[row[1]] for row in rows],
+            [row[2] if isinstance(row[2], list) else [] for row in rows]
+        )
+        updates = [
+            UserAnswer(id=row[0], is_correct=is_correct, points=answer_points)
+            for row, is_correct, answer_points in zip(rows, correct, points)
+            if (row[3], row[4]) != (is_correct, answer_points)
+        ]
+        with transaction.atomic():
+            UserAnswer.objects.bulk_update(updates, ['is_correct', 'points'])
+        changed += len(updates)
+
+
+def rescore_exam_attempts(question_set_ids: Optional[Iterable[int]] = None, chunk_size: int = 1000) -> int:
+    """按当前答案键和题目集合的判分策略重新计算考试记录的逐题结果和总分，返回更新的记录数
+
+    按ID顺序每次读取 chunk_size 条记录；题目相同的答卷叠成一个二维位掩码数组一次判分。
+    记录中只保存了选项位掩码，答案键含无法编码的选项时按位掩码比较。
+    """
+    attempts = ExamAttempt.objects.order_by('id')
+    if question_set_ids is not None:
+        # 通过别名集合提交的考试同样按其指向集合的答案键和判分策略重新计算
+        question_set_ids = list(question_set_ids)
+        attempts = attempts.filter(
+            Q(question_set_id__in=question_set_ids) | Q(question_set__alias_of_id__in=question_set_ids)
+        )
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = list(attempts.filter(id__gt=last_id).values_list(
+            'id', 'question_set_id', 'question_set__alias_of_id', 'question_ids', 'answer_masks'
+        )[:chunk_size])
+        if not rows:
+            return updated
+        last_id = rows[-1][0]
+
+        groups = {}
+        for attempt_id, question_set_id, alias_of_id, question_ids, answer_masks in rows:
+            group = (alias_of_id or question_set_id, bytes(question_ids))
+            groups.setdefault(group, []).append((attempt_id, bytes(answer_masks)))
+
+        updates = []
+        for (canonical_id, question_ids), members in groups.items():
+            key = get_answer_key(canonical_id)
+            policy = key.scoring_policy
+            positions = np.array(
+                [key.positions.get(question_id, -1)
+                 for question_id in np.frombuffer(question_ids, dtype=ATTEMPT_ID_DTYPE).tolist()],
+                dtype=np.int64
+            )
+            known = positions >= 0  # 已删除的题目计为答错
+            key_masks = np.zeros(len(positions), dtype=MASK_DTYPE)
+            key_masks[known] = key.masks[positions[known]]
+            sheets = np.stack([np.frombuffer(masks, dtype=ATTEMPT_MASK_DTYPE) for _, masks in members])
+            correct = (sheets == key_masks) & known
+            points = score_points(policy, key_masks, sheets) * known
+            for (attempt_id, _), row_correct, row_points in zip(members, correct, points):
+                updates.append(ExamAttempt(
+                    id=attempt_id,
+                    correct_flags=np.packbits(row_correct).tobytes(),
+                    scoring_policy=policy,
+                    score=float(row_points.sum())
+                ))
+        with transaction.atomic():
+            ExamAttempt.objects.bulk_update(updates, ['correct_flags', 'scoring_policy', 'score'])
+        updated += len(updates)
@@ -0,0 +1,320 @@
+import json
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, Iterator, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import IngestionJob, QuestionSet
+from .parsers import get_parser
+from .persistence import (
+    IncrementalQuestionWriter, content_fingerprint, discard_partial_question_set, discard_stored_files
+)
+
+
+class JobContext:
+    """单个导入任务的执行上下文：记录阶段、进度和耗时"""
+
+    def __init__(self, job: IngestionJob):
+        self.job = job
+        self.started = time.perf_counter()
+
+    def stage(self, name: str, progress: int):
+        return _StageTimer(self, name, progress)
+
+    def record_timing(self, name: str, seconds: float):
+        """记录一项耗时指标（与各阶段耗时一起保存在 stage_timings 中）"""
+        timings = dict(self.job.stage_timings or {})
+        timings[name] = round(seconds, 3)
+        self.save_progress(stage_timings=timings)
+
+    def save_progress(self, **fields):
+        """更新任务进度并刷新心跳"""
+        fields['heartbeat_at'] = timezone.now()
+        for key, value in fields.items():
+            setattr(self.job, key, value)
+        IngestionJob.objects.filter(pk=self.job.pk).update(**fields)
+
+
+class _StageTimer:
+    """阶段计时器，退出时写入各阶段耗时"""
+
+    def __init__(self, context: JobContext, name: str, progress: int):
+        self.context = context
+        self.name = name
+        self.progress = progress
+
+    def __enter__(self):
+        self.context.save_progress(stage=self.name)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        timings = dict(self.context.job.stage_timings or {})
+        timings[self.name] = round(time.perf_counter() - self.started, 3)
+        fields = {'stage_timings': timings}
+        if exc_type is None:
+            fields['progress'] = self.progress
+        self.context.save_progress(**fields)
+        return False
+
+
+def claim_job(job_id: int) -> Optional[IngestionJob]:
+    """原子地领取一个等待中的任务，避免多个worker重复执行"""
+    now = timezone.now()
+    claimed = IngestionJob.objects.filter(pk=job_id, status='pending').update(
+        status='running',
+        started_at=now,
+        heartbeat_at=now,
+        attempts=F('attempts') + 1,
+        error=''
+    )
+    if not claimed:
+        return None
+    return IngestionJob.objects.get(pk=job_id)
+
+
+def run_pipeline(context: JobContext):
+    """执行PDF解析流水线：提取并解析答案 -> 提取题目文本 -> 边解析边保存题目 -> 合并校对
+
+    答案先于题目解析，这样每道题一解析出来就能合并答案并写入题目集合；
+    首题写入的耗时记录为 time_to_first_question。
+    """
+    job = context.job
+    parser = get_parser()
+    # 重试中断的任务：先删除上次执行写入了一部分的集合，不留下孤立的集合
+    discard_partial_question_set(job)
+
+    with context.stage('extract_answers', 10):
+        with job.answers_file.open('rb') as answers_file:
+            answers_text = parser.extract_text_from_pdf(answers_file, digest=job.answers_sha256 or None)
+
+    with context.stage('parse_answers', 20):
+        answers = parser.parse_answers(answers_text)
+
+    with context.stage('extract_questions', 30):
+        with job.questions_file.open('rb') as questions_file:
+            questions_text = parser.extract_text_from_pdf(questions_file, digest=job.questions_sha256 or None)
+
+    first_flush = True
+
+    def on_flush(count):
+        nonlocal first_flush
+        if first_flush:
+            first_flush = False
+            context.record_timing('time_to_first_question', time.perf_counter() - context.started)
+        context.save_progress(questions_count=count)
+
+    writer = IncrementalQuestionWriter.create(
+        job.title,
+        job.questions_file.name,
+        job.answers_file.name,
+        answers=answers,
+        on_flush=on_flush
+    )
+    context.save_progress(question_set=writer.question_set)
+    try:
+        with context.stage('parse_questions', 90):
+            questions = parser.parse_questions(questions_text, on_question=writer.add)
+
+        with context.stage('merge', 95):
+            merged_questions = parser.merge_questions_and_answers(questions, answers)
+
+        with context.stage('save', 100):
+            # 以合并后的最终结果为准补齐和更新题目
+            for question in merged_questions:
+                writer.add(question)
+            writer.finish(content_fingerprint(job.questions_sha256, job.answers_sha256))
+    except Exception:
+        writer.discard()
+        raise
+
+    context.save_progress(questions_count=writer.count)
+
+
+def run_job(job_id: int):
+    """执行单个导入任务"""
+    job = claim_job(job_id)
+    if job is None:
+        return
+
+    context = JobContext(job)
+    try:
+        run_pipeline(context)
+    except Exception as e:
+        print(f"导入任务 {job_id} 失败: {str(e)}")
+        print(f"错误堆栈: {traceback.format_exc()}")
+        # 已写入的题目集合在流水线中删除，这里清理已保存的上传文件
+        discard_stored_files(job.questions_file, job.answers_file)
+        context.save_progress(
+            status='failed', error=str(e), finished_at=timezone.now(),
+            questions_file='', answers_file=''
+        )
+    else:
+        context.save_progress(status='succeeded', finished_at=timezone.now())
+
+
+def _run_job_in_worker(job_id: int):
+    """worker线程入口：每个任务前后清理数据库连接"""
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def recover_unfinished_jobs() -> list:
+    """找回未完成的任务：心跳超时的运行中任务重新排队，超过重试次数的标记失败"""
+    lease = timedelta(seconds=settings.INGESTION_JOB_LEASE_SECONDS)
+    stale = IngestionJob.objects.filter(status='running', heartbeat_at__lt=timezone.now() - lease)
+    for job in stale.filter(attempts__gte=settings.INGESTION_MAX_ATTEMPTS):
+        # 放弃的任务同样清理写入了一部分的集合和已保存的上传文件
+        discard_partial_question_set(job)
+        discard_stored_files(job.questions_file, job.answers_file)
+        IngestionJob.objects.filter(pk=job.pk, status='running').update(
+            status='failed', error='任务多次中断，已放弃', finished_at=timezone.now(),
+            question_set=None, questions_file='', answers_file=''
+        )
+    stale.update(status='pending')
+    return list(
+        IngestionJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True)
+    )
+
+
+class IngestionWorkerPool:
+    """本地导入worker池，以有限并发执行排队的任务"""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = None
+        self._submitted = set()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """启动线程池并接管数据库中未完成的任务"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='ingestion'
+            )
+        self.submit_pending()
+
+    def submit(self, job_id: int):
+        self.start()
+        with self._lock:
+            if job_id in self._submitted:
+                return
+            self._submitted.add(job_id)
+        future = self._executor.submit(_run_job_in_worker, job_id)
+        future.add_done_callback(lambda _: self._forget(job_id))
+
+    def submit_pending(self):
+        """提交所有等待中的任务，返回提交数量"""
+        job_ids = recover_unfinished_jobs()
+        for job_id in job_ids:
+            self.submit(job_id)
+        return len(job_ids)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _forget(self, job_id: int):
+        with self._lock:
+            self._submitted.discard(job_id)
+
+
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> IngestionWorkerPool:
+    """获取进程内共享的worker池"""
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            _worker_pool = IngestionWorkerPool(settings.INGESTION_WORKERS)
+        return _worker_pool
+
+
+def record_duplicate_upload(title: str, question_set: QuestionSet,
+                            questions_sha256: str, answers_sha256: str) -> IngestionJob:
+    """内容与已有题目集合相同的上传：不保存文件、不解析，直接记录一个已完成的任务"""
+    now = timezone.now()
+    return IngestionJob.objects.create(
+        title=title,
+        questions_sha256=questions_sha256,
+        answers_sha256=answers_sha256,
+        question_set=question_set,
+        status='succeeded',
+        stage='deduplicated',
+        progress=100,
+        questions_count=question_set.canonical.questions.count(),
+        started_at=now,
+        finished_at=now
+    )
+
+
+def enqueue_job(job: IngestionJob):
+    """将任务交给worker池；INGESTION_EAGER开启时在当前线程同步执行"""
+    if settings.INGESTION_EAGER:
+        run_job(job.pk)
+        job.refresh_from_db()
+        return
+    transaction.on_commit(lambda: get_worker_pool().submit(job.pk))
+
+
+TERMINAL_STATUSES = ('succeeded', 'failed')
+
+
+def job_event(job: IngestionJob) -> Dict:
+    """任务进度事件的内容"""
+    return {
+        'id': job.id,
+        'status': job.status,
+        'stage': job.stage,
+        'progress': job.progress,
+        'questions_count': job.questions_count,
+        'question_set': job.question_set_id,
+        'error': job.error,
+        'message': f'已解析 {job.questions_count} 道题目',
+    }
+
+
+def iter_job_events(job_id: int) -> Iterator[str]:
+    """以Server-Sent Events格式持续推送任务进度，任务结束或连接超时后停止
+
+    状态变化时推送一条 data 事件；没有变化时定期发送注释行保持连接。
+    在WSGI部署下每个连接会一直占用一个同步worker，所以连接时长由 INGESTION_EVENTS_TIMEOUT
+    限制得很短，依靠 EventSource 自动重连继续接收；需要长连接时应改用 ASGI 等异步服务器。
+    """
+    deadline = time.monotonic() + settings.INGESTION_EVENTS_TIMEOUT
+    last_event = None
+    last_sent = time.monotonic()
+    while True:
+        job = IngestionJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return
+        event = job_event(job)
+        if event != last_event:
+            last_event = event
+            last_sent = time.monotonic()
+            name = 'end' if job.status in TERMINAL_STATUSES else 'progress'
+            yield f"event: {name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        elif time.monotonic() - last_sent >= 15:
+            last_sent = time.monotonic()
+            yield ": keep-alive\n\n"
+
+        if job.status in TERMINAL_STATUSES or time.monotonic() >= deadline:
+            return
+        time.sleep(settings.INGESTION_EVENTS_INTERVAL)
@@ -0,0 +1,239 @@
+import json
+import re
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from typing import Dict, List, Tuple
+
+
+# 结构字符：大括号和字符串起始引号；其余字符一次性跳过
+STRUCTURE = re.compile(r'[{}"]')
+# JSON字符串（含转义），只在对象内部使用
+STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+# 字符串内部：转义序列或结束引号
+STRING_END = re.compile(r'\\.|"', re.DOTALL)
+# 常见的可修复错误：对象或数组结尾前多余的逗号、键名缺少引号
+TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+UNQUOTED_KEY = re.compile(r'([{,]\s*)([A-Za-z_]\w*)(\s*:)')
+# 题目对象的起点，用于在对象损坏时重新同步
+QUESTION_START = re.compile(r'\{\s*"?question_number"?\s*:')
+QUESTION_FIELDS = ('question_number', 'question_text')
+
+Rejected = namedtuple('Rejected', ['start', 'end', 'error'])
+
+
+def _decode(text: str):
+    """解码单个对象：先严格解析，失败后修复多余逗号和无引号键名再试一次"""
+    try:
+        return json.loads(text, strict=False)
+    except ValueError as e:
+        repaired = UNQUOTED_KEY.sub(r'\1"\2"\3', TRAILING_COMMA.sub(r'\1', text))
+        if repaired == text:
+            raise e
+        return json.loads(repaired, strict=False)
+
+
+def _is_question(value) -> bool:
+    return isinstance(value, dict) and any(field in value for field in QUESTION_FIELDS)
+
+
+def _wrapped_questions(value) -> List[Dict]:
+    """从 {"questions": [...]} 之类的外层对象中取出题目列表"""
+    if not isinstance(value, dict):
+        return []
+    questions = []
+    for item in value.values():
+        if isinstance(item, list):
+            questions.extend(entry for entry in item if _is_question(entry))
+    return questions
+
+
+def recover_json_objects(text: str) -> Tuple[List[Dict], List[Rejected]]:
+    """单遍扫描模型输出，逐个解码顶层JSON对象
+
+    只跟踪大括号深度和对象内的字符串，不依赖外层数组是否完整，也不做回溯；
+    每个字符只扫描一次，耗时与响应长度成线性关系。
+    能解码的题目对象全部保留，无法解码的对象记录在 rejected 中（起止位置和原因）。
+    外层包装对象解码失败时，退回到逐个解码其内部的题目对象。
+
+    题目对象的起始位置（{"question_number": ...）预先定位。未转义的引号或缺失的
+    大括号会让一个题目对象吞掉后面的题目起点，此时在该起点处截断坏对象并重新同步。
+    """
+    questions = []
+    rejected = []
+    question_starts = [match.start() for match in QUESTION_START.finditer(text)]
+    depth = 0
+    start = None
+    is_question = False
+    children = []  # 当前顶层对象内、深度为1的子对象位置
+    child_start = None
+    position = 0
+
+    while True:
+        match = STRUCTURE.search(text, position)
+        if match is None:
+            break
+        char = match.group()
+        position = match.end()
+        resync = None
+
+        if char == '"':
+            if depth == 0:
+                continue
+            string = STRING.match(text, match.start())
+            following = _next_start(question_starts, match.start())
+            if string is None or (following is not None and following < string.end()):
+                # 字符串没有闭合或吞掉了下一道题的起点
+                if following is None:
+                    # 之后不会再有完整对象（通常是响应被截断）
+                    break
+                resync = following
+            else:
+                position = string.end()
+        elif char == '{':
+            if depth == 0:
+                start = match.start()
+                is_question = _is_start(question_starts, start)
+                children = []
+            elif _is_start(question_starts, match.start()) and (is_question or depth > 1):
+                # 题目对象中出现了下一道题的起点：前一个对象缺少闭合的大括号
+                resync = match.start()
+            elif depth == 1:
+                child_start = match.start()
+            if resync is None:
+                depth += 1
+        elif depth > 0:
+            depth -= 1
+            if depth == 1:
+                children.append((child_start, position))
+            elif depth == 0:
+                _collect(text, start, position, children, questions, rejected)
+                start = None
+
+        if resync is not None:
+            _collect(text, start, resync, children, questions, rejected, truncated=True)
+            start = None
+            depth = 0
+            position = resync
+
+    if start is not None:
+        # 对象没有闭合：保留其中已完整的题目对象
+        _collect(text, start, len(text), children, questions, rejected, truncated=True)
+
+    return questions, rejected
+
+
+def _next_start(starts: List[int], position: int):
+    index = bisect_right(starts, position)
+    return starts[index] if index < len(starts) else None
+
+
+def _is_start(starts: List[int], position: int) -> bool:
+    index = bisect_left(starts, position)
+    return index < len(starts) and starts[index] == position
+
+
+def _collect(text: str, start: int, end: int, children: List[Tuple[int, int]],
+             questions: List[Dict], rejected: List[Rejected], truncated: bool = False):
+    error = '对象未闭合'
+    if not truncated:
+        try:
+            value = _decode(text[start:end])
+        except ValueError as e:
+            error = str(e)
+        else:
+            if _is_question(value):
+                questions.append(value)
+            else:
+                wrapped = _wrapped_questions(value)
+                if wrapped:
+                    questions.extend(wrapped)
+                else:
+                    rejected.append(Rejected(start, end, '缺少题目字段'))
+            return
+
+    # 整体无法解码时，逐个尝试其中的题目对象（外层包装对象的情况）
+    recovered = []
+    failed = []
+    for child_start, child_end in children:
+        try:
+            value = _decode(text[child_start:child_end])
+        except ValueError as e:
+            failed.append(Rejected(child_start, child_end, str(e)))
+            continue
+        if _is_question(value):
+            recovered.append(value)
+
+    if recovered:
+        questions.extend(recovered)
+        rejected.extend(failed)
+        if truncated:
+            # 最后一个完整子对象之后的内容被截断
+            rejected.append(Rejected(children[-1][1], end, error))
+    else:
+        rejected.append(Rejected(start, end, error))
+
+
+class StreamingObjectDecoder:
+    """增量解码：边接收模型输出边产出已经完整的顶层题目对象
+
+    只保留当前未完成对象的文本，已产出的部分随即丢弃。无法解码的对象直接跳过，
+    由调用方在流结束后对完整响应做一次 recover_json_objects 兜底。
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.position = 0
+        self.depth = 0
+        self.start = None
+        self.in_string = False
+
+    def feed(self, fragment: str) -> List[Dict]:
+        """追加一段输出，返回本次新完成的题目对象"""
+        self.buffer += fragment
+        questions = []
+        while True:
+            if self.in_string:
+                match = STRING_END.search(self.buffer, self.position)
+                if match is None:
+                    # 片段可能以转义符结尾，保留到下一段再处理
+                    self.position = len(self.buffer) - 1 if self.buffer.endswith('\\') else len(self.buffer)
+                    break
+                self.position = match.end()
+                if match.group() == '"':
+                    self.in_string = False
+                continue
+
+            match = STRUCTURE.search(self.buffer, self.position)
+            if match is None:
+                self.position = len(self.buffer)
+                break
+            char = match.group()
+            self.position = match.end()
+            if char == '"':
+                self.in_string = self.depth > 0
+            elif char == '{':
+                if self.depth == 0:
+                    self.start = match.start()
+                self.depth += 1
+            elif self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    questions.extend(self._decode_object(self.buffer[self.start:self.position]))
+                    self.buffer = self.buffer[self.position:]
+                    self.position = 0
+                    self.start = None
+
+        if self.start is None:
+            # 对象之外的文本（数组括号、逗号、说明文字）不需要保留
+            self.buffer = ''
+            self.position = 0
+        return questions
+
+    def _decode_object(self, text: str) -> List[Dict]:
+        try:
+            value = _decode(text)
+        except ValueError:
+            return []
+        if _is_question(value):
+            return [value]
+        return _wrapped_questions(value)
@@ -0,0 +1,164 @@
+import math
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+
+from .models import ExamAttempt, QuestionSet, ScoreEntry, ScoreHistogram
+
+
+def _bucket(score: float) -> int:
+    return max(0, int(math.floor(score + 1e-9)))
+
+
+def _add_to_histogram(histogram: ScoreHistogram, scores: Iterable[float]):
+    counts = list(histogram.bucket_counts)
+    for score in scores:
+        bucket = _bucket(score)
+        if bucket >= len(counts):
+            counts.extend([0] * (bucket + 1 - len(counts)))
+        counts[bucket] += 1
+        histogram.attempts += 1
+        histogram.score_sum += score
+        histogram.score_square_sum += score * score
+    histogram.bucket_counts = counts
+
+
+def _merge_histogram(histogram: ScoreHistogram, other: ScoreHistogram):
+    counts = list(histogram.bucket_counts)
+    if len(other.bucket_counts) > len(counts):
+        counts.extend([0] * (len(other.bucket_counts) - len(counts)))
+    for bucket, count in enumerate(other.bucket_counts):
+        counts[bucket] += count
+    histogram.bucket_counts = counts
+    histogram.attempts += other.attempts
+    histogram.score_sum += other.score_sum
+    histogram.score_square_sum += other.score_square_sum
+
+
+def _locked_histogram(question_set_id: int) -> ScoreHistogram:
+    ScoreHistogram.objects.bulk_create([ScoreHistogram(question_set_id=question_set_id)], ignore_conflicts=True)
+    return ScoreHistogram.objects.select_for_update().get(question_set_id=question_set_id)
+
+
+def score_entry(attempt: ExamAttempt, question_set_id: int) -> ScoreEntry:
+    return ScoreEntry(
+        attempt_id=attempt.id,
+        question_set_id=question_set_id,
+        student=attempt.student,
+        score=attempt.score,
+        total=attempt.total,
+        submitted_at=attempt.submitted_at
+    )
+
+
+def record_attempt_score(attempt: ExamAttempt):
+    """考试记录保存后写入成绩榜并更新得分分布（在保存考试记录的事务中调用）
+
+    与题目统计一样，通过别名集合提交的考试计入其指向集合的成绩榜和得分分布。
+    """
+    question_set_id = attempt.question_set.canonical.id
+    score_entry(attempt, question_set_id).save(force_insert=True)
+    histogram = _locked_histogram(question_set_id)
+    _add_to_histogram(histogram, [attempt.score])
+    histogram.save()
+
+
+def merge_leaderboard(duplicate: QuestionSet, canonical: QuestionSet):
+    """合并题目集合时把重复集合（及其别名）的成绩榜条目和得分分布并入 canonical（在调用方的事务中执行）"""
+    question_set_ids = [duplicate.id, *duplicate.aliases.values_list('id', flat=True)]
+    ScoreEntry.objects.filter(question_set_id__in=question_set_ids).update(question_set=canonical)
+    merged = list(ScoreHistogram.objects.select_for_update().filter(question_set_id__in=question_set_ids))
+    if not merged:
+        return
+    histogram = _locked_histogram(canonical.id)
+    for other in merged:
+        _merge_histogram(histogram, other)
+    histogram.save()
+    ScoreHistogram.objects.filter(question_set_id__in=question_set_ids).delete()
+
+
+def rebuild_leaderboard(question_set_ids: Optional[Iterable[int]] = None, chunk_size: int = 5000) -> int:
+    """从考试记录分块重新生成成绩榜和得分分布，返回处理的考试记录数
+
+    只读取考试记录的总分等字段（不读取逐题结果），在一个事务中替换原有数据。
+    别名集合的考试计入其指向的集合；指定别名集合时重新生成其指向集合的数据。
+    """
+    canonical_ids = dict(QuestionSet.objects.filter(alias_of__isnull=False).values_list('id', 'alias_of_id'))
+    attempts = ExamAttempt.objects.order_by('id')
+    entries = ScoreEntry.objects.all()
+    histograms = ScoreHistogram.objects.all()
+    if question_set_ids is not None:
+        targets = {canonical_ids.get(question_set_id, question_set_id) for question_set_id in question_set_ids}
+        question_set_ids = list(targets) + [
+            alias_id for alias_id, canonical_id in canonical_ids.items() if canonical_id in targets
+        ]
+        attempts = attempts.filter(question_set_id__in=question_set_ids)
+        entries = entries.filter(question_set_id__in=question_set_ids)
+        histograms = histograms.filter(question_set_id__in=question_set_ids)
+
+    rebuilt = {}
+    processed = 0
+    last_id = 0
+    with transaction.atomic():
+        entries.delete()
+        histograms.delete()
+        while True:
+            chunk = list(attempts.filter(id__gt=last_id).only(
+                'id', 'question_set', 'student', 'score', 'total', 'submitted_at'
+            )[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            ScoreEntry.objects.bulk_create([
+                score_entry(attempt, canonical_ids.get(attempt.question_set_id, attempt.question_set_id))
+                for attempt in chunk
+            ], batch_size=500)
+            for attempt in chunk:
+                question_set_id = canonical_ids.get(attempt.question_set_id, attempt.question_set_id)
+                histogram = rebuilt.setdefault(question_set_id, ScoreHistogram(question_set_id=question_set_id))
+                _add_to_histogram(histogram, [attempt.score])
+            processed += len(chunk)
+        ScoreHistogram.objects.bulk_create(rebuilt.values(), batch_size=500)
+    return processed
+
+
+def top_scores(question_set: QuestionSet, limit: int) -> List[Dict]:
+    """得分最高的 limit 次考试（按得分、提交时间排序，使用成绩榜索引；别名集合返回其指向集合的成绩榜）"""
+    rows = ScoreEntry.objects.filter(question_set=question_set.canonical).order_by('-score', 'submitted_at').values(
+        'attempt_id', 'student', 'score', 'total', 'submitted_at'
+    )[:limit]
+    return [{'rank': rank, **row} for rank, row in enumerate(rows, start=1)]
+
+
+def get_histogram(question_set: QuestionSet) -> ScoreHistogram:
+    """题目集合的得分分布（别名集合返回其指向集合的分布；还没有考试记录时返回空分布）"""
+    try:
+        return ScoreHistogram.objects.get(question_set=question_set.canonical)
+    except ScoreHistogram.DoesNotExist:
+        return ScoreHistogram(question_set=question_set.canonical)
+
+
+def histogram_summary(histogram: ScoreHistogram) -> Dict:
+    """得分分布：每个分数段 [n, n+1) 的考试次数、平均分和标准差"""
+    attempts = histogram.attempts
+    mean = histogram.score_sum / attempts if attempts else None
+    stddev = math.sqrt(max(0.0, histogram.score_square_sum / attempts - mean * mean)) if attempts else None
+    return {
+        'attempts': attempts,
+        'mean': round(mean, 4) if mean is not None else None,
+        'stddev': round(stddev, 4) if stddev is not None else None,
+        'buckets': [
+            {'score': bucket, 'count': count} for bucket, count in enumerate(histogram.bucket_counts)
+        ],
+    }
+
+
+def score_percentile(histogram: ScoreHistogram, score: float) -> Optional[float]:
+    """百分位等级：得分低于该分数段的考试占比，加上同一分数段的一半（只读取得分分布）"""
+    if not histogram.attempts:
+        return None
+    bucket = _bucket(score)
+    counts = histogram.bucket_counts
+    below = sum(counts[:bucket])
+    same = counts[bucket] if bucket < len(counts) else 0
+    return round((below + same / 2) / histogram.attempts * 100, 2)
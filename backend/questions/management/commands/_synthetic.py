@@ -0,0 +1,184 @@
+"""
+基准测试工具：合成数据生成和临时数据库
+"""
+import io
+import json
+import os
+import random
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO
+
+from django.db import connection
+
+
+@contextmanager
+def temporary_database():
+    """在临时SQLite文件中创建并迁移一个测试数据库，结束后删除，不影响开发数据"""
+    temp_dir = tempfile.mkdtemp()
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    test_settings['NAME'] = os.path.join(temp_dir, 'benchmark.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        os.rmdir(temp_dir)
+
+
+def build_parsed_questions(count: int, seed: int = 0) -> list:
+    """生成与解析器输出格式一致的题目数据"""
+    rng = random.Random(seed)
+    questions = []
+    for number in range(1, count + 1):
+        answers = sorted(rng.sample('ABCD', rng.choice([1, 1, 1, 2, 3])))
+        questions.append({
+            'question_number': number,
+            'question_text': f'项目经理在第{number}个阶段应当优先采取以下哪项措施？',
+            'options': {key: f'选项{key}：更新项目管理计划并通知相关干系人' for key in 'ABCD'},
+            'question_type': 'multiple' if len(answers) > 1 else 'single',
+            'correct_answers': answers,
+            'explanation': f'第{number}题考查整合管理。',
+        })
+    return questions
+
+
+def build_exam_text(questions: int, seed: int = 0, passage_lines: int = 0) -> str:
+    """生成与题目PDF格式一致的合成题库文本（含题干/解析的延续行）
+
+    passage_lines 大于0时，每道题的题干后附带指定行数的案例材料。
+    """
+    rng = random.Random(seed)
+    lines = []
+    for number in range(1, questions + 1):
+        lines.append(f"{number}. 项目经理在第{number}个阶段应当优先采取以下哪项措施？")
+        if rng.random() < 0.3:
+            lines.append("请结合项目章程和干系人登记册进行判断。")
+        for line_number in range(passage_lines):
+            lines.append(f"案例材料第{line_number + 1}行：项目团队在执行过程中发现进度偏差，发起人要求压缩工期。")
+        for key in 'ABCD':
+            lines.append(f"{key}. 选项{key}：更新项目管理计划并通知相关干系人")
+        answer = ''.join(sorted(rng.sample('ABCD', rng.choice([1, 1, 1, 2, 3]))))
+        lines.append(f"答案：{answer}")
+        lines.append(f"解析：第{number}题考查整合管理，正确答案为{answer}。")
+        # PDF按版面换行，较长的解析会被拆成多行
+        for _ in range(rng.randint(0, 6)):
+            lines.append("本题同时涉及范围管理和沟通管理的知识点，需要结合变更控制流程综合判断。")
+    return '\n'.join(lines) + '\n'
+
+
+def build_answers_text(questions: int, seed: int = 0) -> str:
+    """生成与答案解析PDF格式一致的合成答案文本"""
+    rng = random.Random(seed)
+    lines = []
+    for number in range(1, questions + 1):
+        answer = ''.join(sorted(rng.sample('ABCD', rng.choice([1, 1, 1, 2, 3]))))
+        lines.append(f"{number}. 答案：{answer}")
+        lines.append(f"解析：第{number}题考查整合管理，正确答案为{answer}。")
+    return '\n'.join(lines) + '\n'
+
+
+def build_response_text(questions: int, seed: int = 0) -> str:
+    """生成Gemini返回非JSON纯文本时的合成响应（答案写在选项之前）"""
+    rng = random.Random(seed)
+    lines = ["以下是解析结果："]
+    for number in range(1, questions + 1):
+        answer = ''.join(sorted(rng.sample('ABCD', rng.choice([1, 1, 1, 2, 3]))))
+        lines.append(f"{number}. 关于第{number}个工作包的进度偏差，项目经理首先应当做什么？")
+        lines.append(f"答案：{answer}")
+        for key in 'ABCD':
+            lines.append(f"{key}. 选项{key}：评估偏差原因并更新风险登记册")
+    return '\n'.join(lines) + '\n'
+
+
+def build_json_response(questions: int, bad_every: int = 0, seed: int = 0) -> str:
+    """生成Gemini风格的JSON数组响应；bad_every 大于0时每隔若干题插入一个格式错误的对象"""
+    items = []
+    for question in build_parsed_questions(questions, seed=seed):
+        item = json.dumps(question, ensure_ascii=False)
+        if bad_every and question['question_number'] % bad_every == 0:
+            if question['question_number'] // bad_every % 2:
+                # 模型常见错误：键缺少引号（可修复）
+                item = item.replace('"explanation"', 'explanation', 1)
+            else:
+                # 字符串内未转义的引号（无法修复）
+                item = item.replace('考查', '考查"整合"', 1)
+        items.append(item)
+    return "```json\n[\n" + ",\n".join(items) + "\n]\n```"
+
+
+def _escape_pdf_text(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def build_synthetic_pdf(pages: int, lines_per_page: int = 40) -> bytes:
+    """生成指定页数的文本型PDF（ASCII题目文本，Helvetica字体）"""
+    output = io.BytesIO()
+    write_synthetic_pdf(output, pages, lines_per_page)
+    return output.getvalue()
+
+
+def write_synthetic_pdf(output: BinaryIO, pages: int, lines_per_page: int = 40, padding_bytes: int = 0) -> int:
+    """把合成PDF逐段写入文件对象，返回写入的字节数
+
+    padding_bytes 大于0时附加一个不被页面引用的二进制流对象（模拟扫描图像等大体积内容），
+    分块写出，不在内存中生成完整文件。
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # 页面树在所有页面生成后填充
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    number = 1
+    for _ in range(pages):
+        content_lines = ["BT", "/F1 10 Tf", "12 TL", "40 800 Td"]
+        for line_index in range(lines_per_page):
+            if line_index % 6 == 0:
+                text = f"{number}. Which process group is responsible for question {number}?"
+                number += 1
+            elif line_index % 6 == 5:
+                text = "Answer: A  Explanation: the charter is developed during initiating."
+            else:
+                key = 'ABCD'[line_index % 6 - 1]
+                text = f"{key}. Option {key} for the project management scenario"
+            content_lines.append(f"({_escape_pdf_text(text)}) Tj T*")
+        content_lines.append("ET")
+        stream = '\n'.join(content_lines).encode('latin-1')
+
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+
+    kids = b' '.join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    if padding_bytes:
+        objects.append(None)  # 填充流对象，写出时分块生成
+
+    written = output.write(b"%PDF-1.4\n")
+    offsets = []
+    for index, body in enumerate(objects, start=1):
+        offsets.append(written)
+        written += output.write(b"%d 0 obj\n" % index)
+        if body is None:
+            written += output.write(b"<< /Length %d >>\nstream\n" % padding_bytes)
+            block = bytes(1024 * 1024)
+            for start in range(0, padding_bytes, len(block)):
+                written += output.write(block[:padding_bytes - start])
+            body = b"\nendstream"
+        written += output.write(body + b"\nendobj\n")
+    xref_offset = written
+    written += output.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        written += output.write(b"%010d 00000 n \n" % offset)
+    written += output.write(
+        b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    )
+    return written
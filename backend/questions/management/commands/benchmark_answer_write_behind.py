@@ -0,0 +1,75 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from questions.answer_buffer import get_answer_buffer
+from questions.answer_keys import answer_keys
+from questions.models import UserAnswer
+from questions.persistence import save_question_set
+from questions.views import SubmitAnswerView
+from ._synthetic import build_parsed_questions, temporary_database
+
+
+class Command(BaseCommand):
+    help = '模拟课堂上大量学生同时提交答案，对比同步写库与写后缓冲的提交延迟（使用临时数据库）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=64, help='并发提交的客户端数')
+        parser.add_argument('--submissions', type=int, default=20, help='每个客户端提交的答案数')
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            question_set = save_question_set(
+                '提交基准', 'questions/benchmark.pdf', 'answers/benchmark.pdf', build_parsed_questions(200)
+            )
+            question_ids = list(question_set.questions.values_list('id', flat=True))
+            answer_keys.locate(question_ids)
+
+            for label, write_behind in (('同步写库', False), ('写后缓冲', True)):
+                saved_before = UserAnswer.objects.count()
+                with override_settings(ANSWER_WRITE_BEHIND=write_behind):
+                    elapsed, latencies = self._run_load(question_ids, options['clients'], options['submissions'])
+                    flush_started = time.perf_counter()
+                    get_answer_buffer().shutdown()
+                    flush_time = time.perf_counter() - flush_started
+
+                saved = UserAnswer.objects.count() - saved_before
+                percentiles = statistics.quantiles(latencies, n=100)
+                line = (
+                    f"{label}: {len(latencies)}次提交 {elapsed:.2f}s ({len(latencies) / elapsed:.0f}次/s), "
+                    f"p50 {percentiles[49] * 1000:.1f}ms, p99 {percentiles[98] * 1000:.1f}ms, "
+                    f"最大 {max(latencies) * 1000:.1f}ms, 已写入 {saved} 条"
+                )
+                if write_behind:
+                    line += f"（关闭时写入剩余记录 {flush_time * 1000:.1f}ms）"
+                self.stdout.write(line)
+
+    def _run_load(self, question_ids, clients, submissions):
+        factory = APIRequestFactory()
+        view = SubmitAnswerView.as_view()
+
+        def client(index):
+            latencies = []
+            try:
+                for submission in range(submissions):
+                    question_id = question_ids[(index * submissions + submission) % len(question_ids)]
+                    request = factory.post(
+                        '/api/submit-answer/', {'question_id': question_id, 'user_answers': ['A']}, format='json'
+                    )
+                    started = time.perf_counter()
+                    response = view(request)
+                    latencies.append(time.perf_counter() - started)
+                    assert response.status_code == 201, response.data
+            finally:
+                connections.close_all()
+            return latencies
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            results = list(executor.map(client, range(clients)))
+        return time.perf_counter() - started, [latency for latencies in results for latency in latencies]
@@ -0,0 +1,73 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from questions.grading import grade_batch
+from questions.models import Question, UserAnswer
+from questions.persistence import save_question_set
+from ._synthetic import build_parsed_questions, temporary_database
+
+
+def legacy_grade_batch(answers_data):
+    """原有的逐条判分方式：每个答案一次查询、一次INSERT和一次提交"""
+    results = []
+    for answer_data in answers_data:
+        question_id = answer_data.get('question_id')
+        user_answers = answer_data.get('user_answers', [])
+        try:
+            question = Question.objects.get(id=question_id)
+            is_correct = set(question.correct_answers) == set(user_answers)
+            UserAnswer.objects.create(question=question, user_answers=user_answers, is_correct=is_correct)
+            results.append({
+                'question_id': question_id,
+                'is_correct': is_correct,
+                'correct_answers': question.correct_answers,
+                'explanation': question.explanation
+            })
+        except Question.DoesNotExist:
+            results.append({'question_id': question_id, 'error': '题目不存在'})
+    return results
+
+
+class Command(BaseCommand):
+    help = '对比逐条判分与集合式批量判分在不同批量大小下的延迟和查询数（使用临时数据库）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[50, 200, 1000], help='每批提交的答案数')
+        parser.add_argument('--repeat', type=int, default=5, help='每种批量重复提交的次数，取中位数')
+
+    def handle(self, *args, **options):
+        sizes = options['sizes']
+        rng = random.Random(0)
+        with temporary_database():
+            question_set = save_question_set(
+                '判分基准', 'questions/benchmark.pdf', 'answers/benchmark.pdf', build_parsed_questions(max(sizes))
+            )
+            questions = list(question_set.questions.all())
+
+            for size in sizes:
+                answers = [
+                    {'question_id': question.id, 'user_answers': sorted(rng.sample('ABCD', rng.choice([1, 2])))}
+                    for question in questions[:size]
+                ]
+                legacy_time, legacy_queries = self._measure(legacy_grade_batch, answers, options['repeat'])
+                batch_time, batch_queries = self._measure(grade_batch, answers, options['repeat'])
+                self.stdout.write(
+                    f"{size}个答案: 逐条判分 {legacy_time * 1000:.1f}ms ({legacy_queries}次查询), "
+                    f"批量判分 {batch_time * 1000:.1f}ms ({batch_queries}次查询), "
+                    f"提升 {legacy_time / batch_time:.1f}x"
+                )
+
+    def _measure(self, func, answers, repeat):
+        timings = []
+        for _ in range(repeat):
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                func(answers)
+                timings.append(time.perf_counter() - started)
+        return statistics.median(timings), len(queries)
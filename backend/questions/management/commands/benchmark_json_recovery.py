@@ -0,0 +1,83 @@
+import gc
+import json
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from questions.json_recovery import recover_json_objects
+from ._synthetic import build_json_response
+
+
+def legacy_fix_json_format(text):
+    text = re.sub(r'```json\s*', '', text)
+    text = re.sub(r'```\s*$', '', text)
+    text = text.replace("'", '"')
+    text = re.sub(r'(\w+):', r'"\1":', text)
+    return text
+
+
+def legacy_extract_json(response_text):
+    """原有的贪婪正则提取逻辑（作为对比基线，不含最后的手动构建）"""
+    try:
+        data = json.loads(response_text.strip())
+        if isinstance(data, list):
+            return data
+    except ValueError:
+        pass
+    json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
+    if json_match:
+        try:
+            data = json.loads(json_match.group())
+            if isinstance(data, list):
+                return data
+        except ValueError:
+            pass
+    patterns = [
+        r'\[\s*\{.*\}\s*\]',
+        r'\{.*\}.*\{.*\}',
+        r'question_number.*question_text',
+    ]
+    for pattern in patterns:
+        for match in re.findall(pattern, response_text, re.DOTALL):
+            try:
+                data = json.loads(legacy_fix_json_format(match))
+                if isinstance(data, list):
+                    return data
+            except ValueError:
+                continue
+    return []
+
+
+class Command(BaseCommand):
+    help = '对比原贪婪正则提取与单遍恢复解码在含错误对象的大型JSON响应上的耗时和恢复数量'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, nargs='+', default=[250, 500, 1000, 2000], help='响应中的题目数')
+        parser.add_argument('--bad-every', type=int, default=50, help='每隔多少题插入一个格式错误的对象')
+        parser.add_argument('--skip-legacy-above', type=int, default=1000,
+                            help='题目数超过该值时不运行原实现（其耗时按平方增长）')
+
+    def handle(self, *args, **options):
+        for count in options['questions']:
+            text = build_json_response(count, bad_every=options['bad_every'])
+            size_kb = len(text.encode('utf-8')) / 1024
+            elapsed, (questions, rejected) = self._measure(recover_json_objects, text)
+            line = (
+                f"{count}题响应 ({size_kb:.0f} KB): 恢复解码 {elapsed * 1000:.1f}ms, "
+                f"保留 {len(questions)} 题, 跳过 {len(rejected)} 个对象"
+            )
+            if count <= options['skip_legacy_above']:
+                legacy_elapsed, legacy_questions = self._measure(legacy_extract_json, text)
+                line += f"; 原实现 {legacy_elapsed * 1000:.1f}ms, 保留 {len(legacy_questions)} 题"
+            self.stdout.write(line)
+
+    def _measure(self, func, text):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            result = func(text)
+            return time.perf_counter() - started, result
+        finally:
+            gc.enable()
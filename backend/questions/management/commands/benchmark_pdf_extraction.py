@@ -0,0 +1,57 @@
+import io
+import time
+
+import pdfplumber
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from questions.pdf_extraction import extract_text
+from ._synthetic import build_synthetic_pdf
+
+
+def legacy_extract_text(pdf_bytes: bytes) -> str:
+    """原有的串行提取方式（逐页 text += ...），作为对比基线"""
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        text = ""
+        for page in pdf.pages:
+            text += page.extract_text() or ""
+        return text
+
+
+class Command(BaseCommand):
+    help = '对比串行提取与按页并行提取在大型合成PDF上的耗时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, nargs='+', default=[50, 300], help='合成PDF的页数')
+        parser.add_argument('--lines', type=int, default=40, help='每页文本行数')
+        parser.add_argument('--workers', type=int, default=settings.PDF_EXTRACT_WORKERS, help='并行提取进程数')
+        parser.add_argument('--repeat', type=int, default=1, help='每种方式重复次数，取最好成绩')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"并行进程数: {options['workers']}")
+        for pages in options['pages']:
+            pdf_bytes = build_synthetic_pdf(pages, options['lines'])
+
+            serial_time, serial_text = self._measure(lambda: legacy_extract_text(pdf_bytes), options['repeat'])
+            with override_settings(PDF_EXTRACT_WORKERS=options['workers'], PDF_EXTRACT_MIN_PARALLEL_PAGES=1):
+                parallel_time, parallel_text = self._measure(
+                    lambda: extract_text(io.BytesIO(pdf_bytes), use_cache=False), options['repeat']
+                )
+
+            if parallel_text != serial_text:
+                self.stderr.write(self.style.ERROR(f'{pages}页: 两种方式提取结果不一致'))
+            self.stdout.write(
+                f"{pages}页 ({len(pdf_bytes) / 1024:.0f} KB): "
+                f"串行 {serial_time:.2f}s, 并行 {parallel_time:.2f}s, "
+                f"加速 {serial_time / parallel_time:.2f}x"
+            )
+
+    def _measure(self, func, repeat):
+        best, result = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
@@ -0,0 +1,122 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from questions.models import ExamAttempt, QuestionSet, UserAnswer
+from questions.persistence import save_question_set
+from questions.views import ExamAttemptListView, QuestionSetDetailView, get_question_answers
+from ._synthetic import build_parsed_questions, temporary_database
+
+
+class Command(BaseCommand):
+    help = '在大量答题记录上对比建复合索引前后主要接口的延迟，并记录迁移建索引的耗时（使用临时数据库）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--answers', type=int, default=1000000, help='答题记录数')
+        parser.add_argument('--attempts', type=int, default=20000, help='考试记录数')
+        parser.add_argument('--question-sets', type=int, default=10, help='题目集合数')
+        parser.add_argument('--questions', type=int, default=100, help='每个集合的题目数')
+        parser.add_argument('--repeat', type=int, default=50, help='每个接口重复请求的次数，取中位数')
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            question_sets = [
+                save_question_set(f'索引基准{index}', 'questions/benchmark.pdf', 'answers/benchmark.pdf',
+                                  build_parsed_questions(options['questions'], seed=index))
+                for index in range(options['question_sets'])
+            ]
+            question_ids = [
+                question_id for question_set in question_sets
+                for question_id in question_set.questions.values_list('id', flat=True)
+            ]
+            started = time.perf_counter()
+            self._populate(question_sets, question_ids, options['answers'], options['attempts'])
+            self.stdout.write(
+                f"已生成 {options['answers']} 条答题记录、{options['attempts']} 条考试记录，"
+                f"用时 {time.perf_counter() - started:.1f}s"
+            )
+
+            targets = (question_sets[0].id, question_ids[0])
+            call_command('migrate', 'questions', '0009', verbosity=0)
+            before = self._measure(*targets, options['repeat'])
+            started = time.perf_counter()
+            call_command('migrate', 'questions', '0010', verbosity=0)
+            self.stdout.write(f"迁移 0010（建复合索引和唯一约束）用时 {time.perf_counter() - started:.2f}s")
+            after = self._measure(*targets, options['repeat'])
+
+            for name in before:
+                self.stdout.write(
+                    f"{name}: 建索引前 {before[name] * 1000:.2f}ms, 建索引后 {after[name] * 1000:.2f}ms, "
+                    f"提升 {before[name] / after[name]:.1f}x"
+                )
+
+    def _populate(self, question_sets, question_ids, answer_count, attempt_count):
+        """直接批量插入答题记录（绕过判分和统计），提交时间随机分布在最近90天"""
+        rng = random.Random(0)
+        now = timezone.now()
+        table = connection.ops.quote_name(UserAnswer._meta.db_table)
+        sql = (f'INSERT INTO {table} (question_id, user_answers, is_correct, points, submitted_at) '
+               f'VALUES (%s, %s, %s, %s, %s)')
+        payloads = ['["A"]', '["B"]', '["C"]', '["A", "B"]']
+        batch_size = 50000
+        for offset in range(0, answer_count, batch_size):
+            rows = []
+            for _ in range(min(batch_size, answer_count - offset)):
+                is_correct = rng.random() < 0.6
+                submitted_at = now - timedelta(seconds=rng.randrange(90 * 86400))
+                rows.append((rng.choice(question_ids), rng.choice(payloads), is_correct, float(is_correct),
+                             submitted_at.isoformat(sep=' ')))
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
+
+        attempts = [
+            ExamAttempt(
+                question_set=rng.choice(question_sets), question_ids=b'', question_numbers=b'',
+                answer_masks=b'', correct_flags=b'', score=rng.randrange(101), total=100,
+                submitted_at=now - timedelta(seconds=rng.randrange(90 * 86400))
+            )
+            for _ in range(attempt_count)
+        ]
+        ExamAttempt.objects.bulk_create(attempts, batch_size=1000)
+
+    def _measure(self, question_set_id, question_id, repeat):
+        factory = APIRequestFactory()
+        week_ago = timezone.now() - timedelta(days=7)
+        cases = {
+            '题目集合详情': lambda: QuestionSetDetailView.as_view()(factory.get('/'), pk=question_set_id),
+            '作答历史': lambda: get_question_answers(factory.get('/'), question_id=question_id),
+            '近7天作答数': lambda: UserAnswer.objects.filter(
+                question_id=question_id, submitted_at__gte=week_ago
+            ).count(),
+            '考试记录列表': lambda: ExamAttemptListView.as_view()(factory.get('/'), pk=question_set_id),
+            '最近50次考试': lambda: list(ExamAttempt.objects.filter(question_set_id=question_set_id).only(
+                'id', 'score', 'total', 'submitted_at'
+            )[:50]),
+        }
+        timings = {}
+        for name, call in cases.items():
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                call()
+                samples.append(time.perf_counter() - started)
+            timings[name] = statistics.median(samples)
+        timings['删除题目集合（级联）'] = statistics.median(self._measure_cascade_delete() for _ in range(3))
+        return timings
+
+    def _measure_cascade_delete(self):
+        """删除一个集合（在回滚的事务中）：按外键查找并删除题目、答题记录和考试记录"""
+        question_set = QuestionSet.objects.order_by('-id').first()
+        with transaction.atomic():
+            started = time.perf_counter()
+            question_set.delete()
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        return elapsed
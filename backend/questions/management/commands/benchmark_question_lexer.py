@@ -0,0 +1,136 @@
+import gc
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from questions.question_lexer import parse_question_text, parse_answer_text
+from ._synthetic import build_exam_text, build_answers_text
+
+
+QUESTION_PATTERN = re.compile(r'(\d+)[\.、]\s*(.+)')
+OPTION_PATTERN = re.compile(r'([A-D])[\.、]\s*(.+)')
+ANSWER_PATTERN = re.compile(r'答案[：:]\s*([A-D]+)')
+EXPLANATION_PATTERN = re.compile(r'解析[：:]\s*(.+)')
+
+
+def legacy_parse_questions(text):
+    """原有的逐行多正则解析（作为对比基线）"""
+    questions = []
+    current_question = None
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        question_match = QUESTION_PATTERN.match(line)
+        if question_match:
+            if current_question:
+                questions.append(current_question)
+            current_question = {
+                'question_number': int(question_match.group(1)),
+                'question_text': question_match.group(2),
+                'options': {},
+                'question_type': 'single',
+                'correct_answers': [],
+                'explanation': ''
+            }
+            continue
+        option_match = OPTION_PATTERN.match(line)
+        if option_match and current_question:
+            current_question['options'][option_match.group(1)] = option_match.group(2)
+            continue
+        answer_match = ANSWER_PATTERN.search(line)
+        if answer_match and current_question:
+            answers = answer_match.group(1)
+            current_question['correct_answers'] = list(answers)
+            if len(answers) > 1:
+                current_question['question_type'] = 'multiple'
+            continue
+        explanation_match = EXPLANATION_PATTERN.search(line)
+        if explanation_match and current_question:
+            current_question['explanation'] = explanation_match.group(1)
+            continue
+        if current_question:
+            if not current_question['options']:
+                current_question['question_text'] += ' ' + line
+            elif current_question['explanation']:
+                current_question['explanation'] += ' ' + line
+    if current_question:
+        questions.append(current_question)
+    return questions
+
+
+def legacy_parse_answers(text):
+    """原有的答案解析逻辑（作为对比基线）"""
+    answers = {}
+    current_answer = None
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        answer_match = ANSWER_PATTERN.search(line)
+        if answer_match:
+            number_match = re.search(r'(\d+)[\.、]', line)
+            if number_match:
+                current_answer = {
+                    'question_number': int(number_match.group(1)),
+                    'correct_answers': list(answer_match.group(1)),
+                    'explanation': ''
+                }
+                continue
+        explanation_match = EXPLANATION_PATTERN.search(line)
+        if explanation_match and current_answer:
+            current_answer['explanation'] = explanation_match.group(1)
+            answers[current_answer['question_number']] = current_answer
+            current_answer = None
+            continue
+        if current_answer and current_answer['explanation']:
+            current_answer['explanation'] += ' ' + line
+    return answers
+
+
+class Command(BaseCommand):
+    help = '对比原逐行多正则解析与合并正则词法解析在大型合成题库上的吞吐量'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, nargs='+', default=[10000, 50000], help='合成题库的题目数')
+        parser.add_argument('--passage-lines', type=int, default=5000, help='案例题每题附带的材料行数')
+        parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最好成绩')
+
+    def handle(self, *args, **options):
+        for count in options['questions']:
+            cases = [
+                ('题目', build_exam_text(count), legacy_parse_questions, parse_question_text),
+                ('答案', build_answers_text(count), legacy_parse_answers, parse_answer_text),
+                # 长篇案例材料：题干延续行很多时，原解析逐行拼接字符串的开销会按平方增长
+                ('案例题目', build_exam_text(max(1, count // 1000), passage_lines=options['passage_lines']),
+                 legacy_parse_questions, parse_question_text),
+            ]
+            for name, text, legacy, current in cases:
+                size_mb = len(text.encode('utf-8')) / 1024 / 1024
+                legacy_time, legacy_result = self._measure(legacy, text, options['repeat'])
+                current_time, current_result = self._measure(current, text, options['repeat'])
+                if legacy_result != current_result:
+                    self.stderr.write(self.style.ERROR(f'{count}题{name}文本: 解析结果不一致'))
+                self.stdout.write(
+                    f"{count}题{name}文本 ({size_mb:.1f} MB): "
+                    f"原解析 {legacy_time:.3f}s ({size_mb / legacy_time:.1f} MB/s), "
+                    f"词法解析 {current_time:.3f}s ({size_mb / current_time:.1f} MB/s), "
+                    f"提升 {legacy_time / current_time:.2f}x"
+                )
+
+    def _measure(self, func, text, repeat):
+        best, result = None, None
+        for _ in range(repeat):
+            # 排除上一轮结果回收和分代GC带来的抖动
+            result = None
+            gc.collect()
+            gc.disable()
+            try:
+                started = time.perf_counter()
+                result = func(text)
+                elapsed = time.perf_counter() - started
+            finally:
+                gc.enable()
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
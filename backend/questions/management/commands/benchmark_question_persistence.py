@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from questions.models import QuestionSet, Question
+from questions.persistence import save_question_set
+from ._synthetic import build_parsed_questions, temporary_database
+
+
+def legacy_save(title, merged_questions):
+    """原有的逐条保存方式：每道题一次INSERT和一次提交"""
+    question_set = QuestionSet.objects.create(
+        title=title,
+        questions_file='questions/benchmark.pdf',
+        answers_file='answers/benchmark.pdf'
+    )
+    for question_data in merged_questions:
+        Question.objects.create(
+            question_set=question_set,
+            question_number=question_data['question_number'],
+            question_text=question_data['question_text'],
+            options=question_data['options'],
+            question_type=question_data['question_type'],
+            correct_answers=question_data['correct_answers'],
+            explanation=question_data['explanation']
+        )
+    return question_set
+
+
+class Command(BaseCommand):
+    help = '对比逐条保存与事务内批量保存题目的吞吐量（使用临时数据库）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='每个题目集合的题目数')
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            for size in options['sizes']:
+                questions = build_parsed_questions(size)
+
+                legacy_time = self._measure(lambda: legacy_save('逐条保存', questions))
+                bulk_time = self._measure(lambda: save_question_set(
+                    '批量保存', 'questions/benchmark.pdf', 'answers/benchmark.pdf', questions
+                ))
+
+                self.stdout.write(
+                    f"{size}题: 逐条保存 {legacy_time:.3f}s ({size / legacy_time:.0f}题/s), "
+                    f"批量保存 {bulk_time:.3f}s ({size / bulk_time:.0f}题/s), "
+                    f"提升 {legacy_time / bulk_time:.1f}x"
+                )
+
+    def _measure(self, func):
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
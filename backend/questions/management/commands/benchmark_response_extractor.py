@@ -0,0 +1,73 @@
+import gc
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from questions.response_extractor import build_questions_from_text
+from ._synthetic import build_response_text
+
+
+def legacy_build_json_from_text(text):
+    """原有的 build_json_from_text 实现（作为对比基线）"""
+    questions = []
+    question_matches = re.findall(r'(\d+)[\.、]\s*(.+)', text)
+    for number, content in question_matches:
+        question = {
+            'question_number': int(number),
+            'question_text': content.strip(),
+            'options': {},
+            'question_type': 'single',
+            'correct_answers': [],
+            'explanation': ''
+        }
+        options_text = text[text.find(content):text.find(content) + 500]
+        option_matches = re.findall(r'([A-D])[\.、]\s*(.+)', options_text)
+        for opt_key, opt_text in option_matches:
+            question['options'][opt_key] = opt_text.strip()
+        answer_match = re.search(rf'{number}[^A-D]*答案[：:]\s*([A-D]+)', text)
+        if answer_match:
+            question['correct_answers'] = list(answer_match.group(1))
+            if len(question['correct_answers']) > 1:
+                question['question_type'] = 'multiple'
+        questions.append(question)
+    return questions
+
+
+class Command(BaseCommand):
+    help = '对比原 build_json_from_text 与索引化提取在大型纯文本响应上的耗时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, nargs='+', default=[500, 1000, 5000], help='合成响应的题目数')
+        parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最好成绩')
+        parser.add_argument('--skip-legacy-above', type=int, default=5000,
+                            help='题目数超过该值时不运行原实现（其耗时按平方增长）')
+
+    def handle(self, *args, **options):
+        for count in options['questions']:
+            text = build_response_text(count)
+            size_kb = len(text.encode('utf-8')) / 1024
+            current_time, current_result = self._measure(build_questions_from_text, text, options['repeat'])
+            line = f"{count}题响应 ({size_kb:.0f} KB): 索引化提取 {current_time * 1000:.1f}ms"
+
+            if count <= options['skip_legacy_above']:
+                legacy_time, legacy_result = self._measure(legacy_build_json_from_text, text, 1)
+                if legacy_result != current_result:
+                    self.stderr.write(self.style.ERROR(f'{count}题响应: 提取结果不一致'))
+                line += f", 原实现 {legacy_time * 1000:.1f}ms, 提升 {legacy_time / current_time:.1f}x"
+            self.stdout.write(line)
+
+    def _measure(self, func, text, repeat):
+        best, result = None, None
+        for _ in range(repeat):
+            result = None
+            gc.collect()
+            gc.disable()
+            try:
+                started = time.perf_counter()
+                result = func(text)
+                elapsed = time.perf_counter() - started
+            finally:
+                gc.enable()
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
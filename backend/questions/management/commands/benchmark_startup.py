@@ -0,0 +1,77 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# 在全新的子进程中测量启动耗时；eager模式模拟原来在模块加载时导入PDF/HTTP依赖的行为
+STARTUP_SCRIPT = '''
+import json, os, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {backend_dir!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pmp_platform.settings')
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+import django
+django.setup()
+if {eager!r}:
+    import pdfplumber, PyPDF2, requests
+    import questions.gemini_parser
+setup_done = time.perf_counter()
+
+from django.test import Client
+Client(SERVER_NAME='localhost').get('/api/question-sets/')
+first_request = time.perf_counter()
+heavy_modules = sorted(name for name in ('pdfplumber', 'PyPDF2', 'requests') if name in sys.modules)
+
+# 原来每个请求新建一个解析器，现在从进程内注册表获取同一个实例
+if {eager!r}:
+    from questions.gemini_parser import GeminiPDFParser as acquire
+else:
+    from questions.parsers import get_parser as acquire
+acquire()
+first_parser = time.perf_counter()
+for _ in range(1000):
+    acquire()
+parsers_done = time.perf_counter()
+
+print(json.dumps({{
+    'setup': setup_done - started,
+    'first_request': first_request - setup_done,
+    'first_parser': first_parser - first_request,
+    'parser_call': (parsers_done - first_parser) / 1000,
+    'heavy_modules': heavy_modules,
+}}))
+'''
+
+
+class Command(BaseCommand):
+    help = '在新进程中测量django.setup()、首个请求和获取解析器的耗时（原来的预先导入、每次新建解析器 vs 按需导入、共享解析器）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='每种方式启动的进程数，取中位数')
+
+    def handle(self, *args, **options):
+        for label, eager in (('预先导入', True), ('按需导入', False)):
+            results = [self._run(eager) for _ in range(options['runs'])]
+            setup = statistics.median(result['setup'] for result in results)
+            first_request = statistics.median(result['first_request'] for result in results)
+            first_parser = statistics.median(result['first_parser'] for result in results)
+            parser_call = statistics.median(result['parser_call'] for result in results)
+            self.stdout.write(
+                f"{label}: django.setup() {setup * 1000:.0f}ms, 首个请求 {first_request * 1000:.0f}ms, "
+                f"合计 {(setup + first_request) * 1000:.0f}ms; "
+                f"首次获取解析器 {first_parser * 1000:.1f}ms, 之后每次 {parser_call * 1e6:.1f}µs; "
+                f"首个请求后已加载: {', '.join(results[0]['heavy_modules']) or '无'}"
+            )
+
+    def _run(self, eager: bool) -> dict:
+        script = STARTUP_SCRIPT.format(backend_dir=str(settings.BASE_DIR), eager=eager)
+        output = subprocess.run(
+            [sys.executable, '-c', script],
+            capture_output=True, text=True, check=True, env=os.environ.copy()
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
@@ -0,0 +1,74 @@
+import gc
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from questions.answer_keys import answer_keys, get_answer_key
+from questions.grading import score_sheets
+from questions.persistence import save_question_set
+from ._synthetic import build_parsed_questions, temporary_database
+
+
+def legacy_score_sheets(correct_answers, sheets):
+    """原有的判分方式：每道题把JSON中的正确答案和用户答案转换成set比较"""
+    return [
+        sum(set(correct) == set(answers) for correct, answers in zip(correct_answers, sheet))
+        for sheet in sheets
+    ]
+
+
+class Command(BaseCommand):
+    help = '对比逐题set比较与位掩码数组判卷的吞吐量（使用临时数据库）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sheets', type=int, default=100000, help='答卷数量')
+        parser.add_argument('--questions', type=int, default=200, help='题目集合的题目数')
+        parser.add_argument('--legacy-sheets', type=int, default=2000,
+                            help='原实现实际判分的答卷数（按比例推算全部答卷的耗时）')
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        with temporary_database():
+            question_set = save_question_set(
+                '判卷基准', 'questions/benchmark.pdf', 'answers/benchmark.pdf',
+                build_parsed_questions(options['questions'])
+            )
+            answer_keys.clear()
+            compile_time, key = self._measure(lambda: get_answer_key(question_set.id))
+            cached_time, _ = self._measure(lambda: [get_answer_key(question_set.id) for _ in range(1000)])
+            cached_time /= 1000
+
+        # 约六成题目答对，其余随机作答
+        sheets = rng.integers(1, 16, size=(options['sheets'], len(key)), dtype=np.uint16)
+        correct = rng.random(sheets.shape) < 0.6
+        sheets[correct] = np.broadcast_to(key.masks, sheets.shape)[correct]
+
+        vectorized_time, scores = self._measure(lambda: score_sheets(key, sheets))
+
+        legacy_count = min(options['legacy_sheets'], len(sheets))
+        letters = [[option for bit, option in enumerate('ABCD') if mask >> bit & 1] for mask in range(16)]
+        legacy_sheets = [[letters[mask] for mask in sheet] for sheet in sheets[:legacy_count].tolist()]
+        legacy_time, legacy_scores = self._measure(lambda: legacy_score_sheets(key.correct_answers, legacy_sheets))
+        assert legacy_scores == scores[:legacy_count].tolist()
+        legacy_total = legacy_time * len(sheets) / legacy_count
+
+        self.stdout.write(
+            f"答案键: 编译 {compile_time * 1000:.1f}ms（{len(key)}题，含一次查询），缓存命中 {cached_time * 1e6:.1f}µs"
+        )
+        self.stdout.write(
+            f"{len(sheets)}份答卷 x {len(key)}题: 位掩码数组 {vectorized_time * 1000:.1f}ms "
+            f"({len(sheets) / vectorized_time:.0f}份/s), "
+            f"逐题set比较 {legacy_total:.2f}s (按{legacy_count}份推算, {len(sheets) / legacy_total:.0f}份/s), "
+            f"提升 {legacy_total / vectorized_time:.0f}x; 平均得分 {scores.mean():.1f}"
+        )
+
+    def _measure(self, func):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            result = func()
+            return time.perf_counter() - started, result
+        finally:
+            gc.enable()
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from questions.gemini_parser import get_response_cache
+from questions.pdf_extraction import get_text_cache
+
+
+class Command(BaseCommand):
+    help = '查看本地缓存的命中率、节省的字节数和占用空间'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='清空缓存和统计数据')
+
+    def handle(self, *args, **options):
+        caches = {
+            'PDF提取文本缓存': get_text_cache(),
+            'Gemini响应缓存': get_response_cache(),
+        }
+        for name, cache in caches.items():
+            if options['clear']:
+                cache.clear()
+                self.stdout.write(self.style.SUCCESS(f'{name}已清空'))
+                continue
+
+            stats = cache.stats()
+            self.stdout.write(f'{name} ({cache.directory})')
+            self.stdout.write(f"  条目数: {stats['entries']}")
+            self.stdout.write(
+                f"  占用空间: {self._format_size(stats['total_size'])} / {self._format_size(stats['max_bytes'])}"
+            )
+            self.stdout.write(
+                f"  命中: {stats['hits']}, 未命中: {stats['misses']}, 命中率: {stats['hit_rate']:.1%}"
+            )
+            self.stdout.write(f"  节省的字节数: {self._format_size(stats['bytes_saved'])}")
+            self.stdout.write(f"  淘汰条目数: {stats['evictions']}, 过期条目数: {stats['expired']}")
+
+    def _format_size(self, size):
+        for unit in ['B', 'KB', 'MB']:
+            if size < 1024:
+                return f'{size:.0f} {unit}'
+            size /= 1024
+        return f'{size:.1f} GB'
@@ -0,0 +1,50 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from questions.models import UserAnswer
+from questions.retention import AnswerArchive, compact_answers, retention_cutoff
+
+
+class Command(BaseCommand):
+    help = '把超过保留期的答题记录压缩为每日汇总并删除原始记录（可先写入gzip压缩的JSONL归档）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ANSWER_RETENTION_DAYS,
+                            help='原始答题记录保留的天数，默认为 ANSWER_RETENTION_DAYS')
+        parser.add_argument('--chunk-size', type=int, default=settings.ANSWER_COMPACTION_CHUNK_SIZE,
+                            help='每个事务处理的记录数')
+        parser.add_argument('--no-archive', action='store_true', help='不写归档文件，直接删除原始记录')
+        parser.add_argument('--dry-run', action='store_true', help='只统计需要压缩的记录数')
+
+    def handle(self, *args, **options):
+        if options['days'] <= 0:
+            raise CommandError('没有配置保留期：请设置 ANSWER_RETENTION_DAYS 或使用 --days')
+        cutoff = retention_cutoff(options['days'])
+        if options['dry_run']:
+            count = UserAnswer.objects.filter(submitted_at__lt=cutoff).count()
+            self.stdout.write(f"{timezone.localtime(cutoff):%Y-%m-%d} 之前共有 {count} 条答题记录需要压缩")
+            return
+
+        started = time.perf_counter()
+        if settings.ANSWER_ARCHIVE_ENABLED and not options['no_archive']:
+            path = os.path.join(
+                settings.ANSWER_ARCHIVE_DIR,
+                f"answers-before-{timezone.localtime(cutoff):%Y%m%d}-{timezone.localtime():%Y%m%d%H%M%S}.jsonl.gz"
+            )
+            with AnswerArchive(path) as archive:
+                compacted = compact_answers(cutoff, options['chunk_size'], archive)
+            if not compacted:
+                os.remove(path)
+            archived = f"，归档文件 {path}" if compacted else ''
+        else:
+            compacted = compact_answers(cutoff, options['chunk_size'])
+            archived = ''
+
+        self.stdout.write(self.style.SUCCESS(
+            f"已把 {timezone.localtime(cutoff):%Y-%m-%d} 之前的 {compacted} 条答题记录压缩为每日汇总，"
+            f"用时 {time.perf_counter() - started:.2f}s{archived}"
+        ))
@@ -0,0 +1,131 @@
+import csv
+import json
+import os
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from questions.answer_keys import get_answer_key, mask_options
+from questions.bulk_grading import SheetKey, grade_stream, iter_records
+from questions.models import QuestionSet, UserAnswer
+from questions.statistics import record_answer_arrays
+
+
+class Command(BaseCommand):
+    help = '离线批量判卷：流式读取CSV/JSONL答卷文件，用进程池按题目集合的答案键判分并输出报告'
+
+    def add_arguments(self, parser):
+        parser.add_argument('question_set', type=int, help='题目集合ID')
+        parser.add_argument('input', help='答卷文件（.csv 或 .jsonl）')
+        parser.add_argument('--output', required=True, help='判分报告（.csv 或 .jsonl）')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='输入格式，默认按扩展名判断')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='判卷进程数，1为不使用进程池')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='每批答卷数')
+        parser.add_argument('--save', action='store_true', help='同时把作答写入答题记录（每批一个事务批量插入）')
+
+    def handle(self, *args, **options):
+        try:
+            question_set = QuestionSet.objects.select_related('alias_of').get(pk=options['question_set'])
+        except QuestionSet.DoesNotExist:
+            raise CommandError(f"题目集合 {options['question_set']} 不存在")
+        answer_key = get_answer_key(question_set.canonical.id)
+        if not len(answer_key):
+            raise CommandError(f"题目集合 {question_set.id} 没有题目")
+
+        input_format = options['format'] or self._format_of(options['input'])
+        report_format = self._format_of(options['output'])
+        with open(options['input'], newline='', encoding='utf-8-sig') as source:
+            self._grade(question_set, answer_key, source, input_format, report_format, options)
+
+    def _grade(self, question_set, answer_key, source, input_format, report_format, options):
+        header, records = iter_records(source, input_format)
+        key = SheetKey(
+            answer_key.question_numbers.tolist(), answer_key.masks, question_set.scoring_policy,
+            self._csv_columns(header, answer_key.number_positions) if input_format == 'csv' else None
+        )
+        question_ids = answer_key.question_ids.tolist()
+
+        graded = failed = saved = 0
+        total_score = 0.0
+        started = time.perf_counter()
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            write = self._report_writer(output, report_format)
+            for result in grade_stream(key, records, options['chunk_size'], options['workers']):
+                row_points = result['points'].sum(axis=1).tolist()
+                row_correct = result['correct'].sum(axis=1).tolist()
+                for index, line_number in enumerate(result['line_numbers']):
+                    wrong = [key.question_numbers[position]
+                             for position in (~result['correct'][index]).nonzero()[0].tolist()]
+                    write({
+                        'line': line_number, 'student': result['students'][index],
+                        'score': round(row_points[index], 4), 'correct': row_correct[index],
+                        'total': len(key), 'wrong': wrong, 'error': ''
+                    })
+                for line_number, error in result['errors']:
+                    write({'line': line_number, 'student': '', 'score': '', 'correct': '', 'total': len(key),
+                           'wrong': [], 'error': error})
+                if options['save']:
+                    saved += self._save(question_ids, result)
+
+                graded += len(result['line_numbers'])
+                failed += len(result['errors'])
+                total_score += sum(row_points)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"已判分 {graded} 份答卷（格式错误 {failed} 份），用时 {elapsed:.2f}s，"
+            f"{graded / elapsed if elapsed else 0:.0f}份/s，平均得分 {total_score / graded if graded else 0:.2f}/{len(key)}"
+            + (f"，写入 {saved} 条答题记录" if options['save'] else '')
+        ))
+
+    def _format_of(self, path: str) -> str:
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in ('.csv', '.jsonl'):
+            raise CommandError(f'无法根据扩展名判断文件格式: {path}（支持 .csv 和 .jsonl）')
+        return extension[1:]
+
+    def _csv_columns(self, header, number_positions):
+        """CSV表头：第一列为学生标识，其余列为题号"""
+        if not header:
+            raise CommandError('CSV文件缺少表头')
+        columns = {}
+        for column, name in enumerate(header[1:], start=1):
+            try:
+                position = number_positions.get(int(name.strip()))
+            except ValueError:
+                raise CommandError(f'CSV表头第 {column + 1} 列不是题号: {name}')
+            if position is None:
+                raise CommandError(f'题号 {name} 不在题目集合中')
+            columns[column] = position
+        if not columns:
+            raise CommandError('CSV表头中没有题号列')
+        return columns
+
+    def _report_writer(self, output, report_format):
+        if report_format == 'jsonl':
+            return lambda row: output.write(json.dumps(row, ensure_ascii=False) + '\n')
+        writer = csv.DictWriter(output, fieldnames=['line', 'student', 'score', 'correct', 'total', 'wrong', 'error'])
+        writer.writeheader()
+        return lambda row: writer.writerow({**row, 'wrong': ' '.join(map(str, row['wrong']))})
+
+    def _save(self, question_ids, result) -> int:
+        """把一批答卷中已作答的题目写入答题记录，并在同一事务中累加题目统计"""
+        rows, positions = result['sheets'].nonzero()
+        sheets, correct, points = result['sheets'], result['correct'], result['points']
+        user_answers = [
+            UserAnswer(
+                question_id=question_ids[position],
+                user_answers=mask_options(int(sheets[row, position])),
+                is_correct=bool(correct[row, position]),
+                points=float(points[row, position])
+            )
+            for row, position in zip(rows.tolist(), positions.tolist())
+        ]
+        with transaction.atomic():
+            UserAnswer.objects.bulk_create(user_answers, batch_size=1000)
+            record_answer_arrays(
+                np.asarray(question_ids)[positions], sheets[rows, positions], correct[rows, positions]
+            )
+        return len(user_answers)
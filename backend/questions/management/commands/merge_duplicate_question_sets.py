@@ -0,0 +1,61 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from questions.models import QuestionSet
+from questions.pdf_extraction import file_sha256
+from questions.persistence import content_fingerprint, merge_question_set
+
+
+class Command(BaseCommand):
+    help = '为没有内容指纹的题目集合补算指纹，并把内容相同的题目集合合并为最早一个的别名'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='只列出重复的题目集合，不修改数据')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        groups = defaultdict(list)
+        # 与 find_question_set 一致，跳过仍在导入中的集合；失败任务留下的集合内容不完整，同样跳过
+        question_sets = (
+            QuestionSet.objects
+            .filter(alias_of__isnull=True)
+            .exclude(ingestion_jobs__status__in=('pending', 'running', 'failed'))
+            .order_by('created_at', 'id')
+        )
+        for question_set in question_sets:
+            fingerprint = question_set.content_fingerprint or self._fingerprint(question_set)
+            if not fingerprint:
+                continue
+            if fingerprint != question_set.content_fingerprint and not dry_run:
+                QuestionSet.objects.filter(pk=question_set.pk).update(content_fingerprint=fingerprint)
+                question_set.content_fingerprint = fingerprint
+            groups[fingerprint].append(question_set)
+
+        merged = 0
+        for canonical, *duplicates in groups.values():
+            for duplicate in duplicates:
+                self.stdout.write(f'题目集合 {duplicate.id}「{duplicate.title}」与 {canonical.id}「{canonical.title}」内容相同')
+                if dry_run:
+                    continue
+                try:
+                    merge_question_set(duplicate, canonical)
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f'  跳过: {str(e)}'))
+                    continue
+                merged += 1
+
+        if dry_run:
+            self.stdout.write('dry-run模式，未修改数据')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'已合并 {merged} 个重复的题目集合'))
+
+    def _fingerprint(self, question_set: QuestionSet) -> str:
+        """根据已保存的题目和答案文件计算内容指纹，文件缺失时返回空字符串"""
+        try:
+            questions_sha256, _ = file_sha256(question_set.questions_file.path)
+            answers_sha256, _ = file_sha256(question_set.answers_file.path)
+        except (ValueError, OSError) as e:
+            print(f"无法读取题目集合 {question_set.id} 的文件: {str(e)}")
+            return ''
+        return content_fingerprint(questions_sha256, answers_sha256)
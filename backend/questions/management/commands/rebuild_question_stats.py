@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from questions.statistics import rebuild_question_stats
+
+
+class Command(BaseCommand):
+    help = '从答题记录、每日汇总和考试记录分块重新计算题目统计（补算升级前的记录或修复统计）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--question-set', type=int, action='append', dest='question_sets',
+                            help='只处理指定的题目集合（可重复），默认处理全部')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='每批读取的记录数')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        questions = rebuild_question_stats(options['question_sets'], options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"已重新统计 {questions} 道题目，用时 {time.perf_counter() - started:.2f}s"
+        ))
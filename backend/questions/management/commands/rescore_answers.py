@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.answer_keys import answer_keys
+from questions.grading import rescore_exam_attempts, rescore_user_answers
+from questions.leaderboard import rebuild_leaderboard
+from questions.models import QuestionSet
+from questions.retention import rescore_daily_summaries
+from questions.scoring import SCORING_POLICIES
+from questions.statistics import rebuild_question_stats
+
+
+class Command(BaseCommand):
+    help = '修改判分策略或答案后，分块重新计算历史答题记录和考试记录的得分'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--question-set', type=int, action='append', dest='question_sets',
+                            help='只处理指定的题目集合（可重复），默认处理全部')
+        parser.add_argument('--policy', choices=sorted(SCORING_POLICIES),
+                            help='先把指定题目集合的判分策略改为该策略')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='每批读取和更新的记录数')
+
+    def handle(self, *args, **options):
+        question_set_ids = options['question_sets']
+        if options['policy']:
+            if not question_set_ids:
+                raise CommandError('--policy 需要同时指定 --question-set')
+            aliases = list(QuestionSet.objects.filter(id__in=question_set_ids, alias_of__isnull=False).values_list(
+                'id', flat=True
+            ))
+            if aliases:
+                raise CommandError(f'别名集合 {aliases} 使用其指向集合的判分策略，请指定指向的集合')
+            for question_set in QuestionSet.objects.filter(id__in=question_set_ids):
+                question_set.scoring_policy = options['policy']
+                question_set.save(update_fields=['scoring_policy'])
+            self.stdout.write(f"题目集合 {question_set_ids} 的判分策略已改为 {options['policy']}")
+
+        answer_keys.clear()
+        started = time.perf_counter()
+        answers = rescore_user_answers(question_set_ids, options['chunk_size'])
+        summaries = rescore_daily_summaries(question_set_ids, options['chunk_size'])
+        attempts = rescore_exam_attempts(question_set_ids, options['chunk_size'])
+        # 是否答对和考试得分变化后题目统计、成绩榜和得分分布需要重新计算
+        questions = rebuild_question_stats(question_set_ids, options['chunk_size'])
+        rebuild_leaderboard(question_set_ids, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"已更新 {answers} 条答题记录、{summaries} 条每日汇总、{attempts} 条考试记录，重新统计 {questions} 道题目，"
+            f"用时 {time.perf_counter() - started:.2f}s"
+        ))
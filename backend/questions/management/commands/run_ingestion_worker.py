@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from questions.ingestion import IngestionWorkerPool
+
+
+class Command(BaseCommand):
+    help = '启动独立的题目导入worker，执行数据库中排队和中断的导入任务'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='并发任务数（默认使用INGESTION_WORKERS）')
+        parser.add_argument('--interval', type=float, default=5.0, help='轮询新任务的间隔秒数')
+        parser.add_argument('--once', action='store_true', help='处理完当前排队的任务后退出')
+
+    def handle(self, *args, **options):
+        from django.conf import settings
+
+        workers = options['workers'] or settings.INGESTION_WORKERS
+        pool = IngestionWorkerPool(workers)
+        pool.start()
+        self.stdout.write(f'导入worker已启动，并发数: {workers}')
+
+        try:
+            if options['once']:
+                return
+            while True:
+                time.sleep(options['interval'])
+                pool.submit_pending()
+        except KeyboardInterrupt:
+            self.stdout.write('正在停止导入worker...')
+        finally:
+            pool.shutdown(wait=True)
+            self.stdout.write(self.style.SUCCESS('导入worker已停止'))
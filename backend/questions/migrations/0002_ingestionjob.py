@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='题目集合标题')),
+                ('questions_file', models.FileField(upload_to='questions/', verbose_name='题目文件')),
+                ('answers_file', models.FileField(upload_to='answers/', verbose_name='答案解析文件')),
+                ('status', models.CharField(choices=[('pending', '等待中'), ('running', '解析中'), ('succeeded', '已完成'), ('failed', '失败')], db_index=True, default='pending', max_length=20, verbose_name='状态')),
+                ('stage', models.CharField(blank=True, max_length=50, verbose_name='当前阶段')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='进度')),
+                ('stage_timings', models.JSONField(blank=True, default=dict, verbose_name='各阶段耗时')),
+                ('questions_count', models.IntegerField(default=0, verbose_name='题目数量')),
+                ('error', models.TextField(blank=True, verbose_name='错误信息')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='执行次数')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='心跳时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('question_set', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ingestion_jobs', to='questions.questionset', verbose_name='题目集合')),
+            ],
+            options={
+                'verbose_name': '导入任务',
+                'verbose_name_plural': '导入任务',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0002_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='answers_sha256',
+            field=models.CharField(blank=True, max_length=64, verbose_name='答案文件SHA-256'),
+        ),
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='questions_sha256',
+            field=models.CharField(blank=True, max_length=64, verbose_name='题目文件SHA-256'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0003_ingestionjob_file_digests'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionset',
+            name='alias_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='questions.questionset', verbose_name='别名指向的题目集合'),
+        ),
+        migrations.AddField(
+            model_name='questionset',
+            name='content_fingerprint',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='内容指纹'),
+        ),
+    ]
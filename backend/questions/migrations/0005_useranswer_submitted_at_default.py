@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:32
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0004_questionset_content_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='useranswer',
+            name='submitted_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='提交时间'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0005_useranswer_submitted_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_ids', models.BinaryField(verbose_name='题目ID')),
+                ('question_numbers', models.BinaryField(verbose_name='题号')),
+                ('answer_masks', models.BinaryField(verbose_name='作答选项')),
+                ('correct_flags', models.BinaryField(verbose_name='是否答对')),
+                ('score', models.PositiveIntegerField(verbose_name='得分')),
+                ('total', models.PositiveIntegerField(verbose_name='题目数')),
+                ('submitted_at', models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='提交时间')),
+                ('question_set', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='questions.questionset', verbose_name='题目集合')),
+            ],
+            options={
+                'verbose_name': '考试记录',
+                'verbose_name_plural': '考试记录',
+                'ordering': ['-submitted_at'],
+            },
+        ),
+    ]
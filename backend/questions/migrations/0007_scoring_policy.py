@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+def backfill_points(apps, schema_editor):
+    # 已有答题记录按原来的规则计分：答对得1分
+    UserAnswer = apps.get_model('questions', 'UserAnswer')
+    UserAnswer.objects.filter(is_correct=True).update(points=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0006_examattempt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examattempt',
+            name='scoring_policy',
+            field=models.CharField(default='strict', max_length=20, verbose_name='判分策略'),
+        ),
+        migrations.AddField(
+            model_name='questionset',
+            name='scoring_policy',
+            field=models.CharField(choices=[('strict', '全部选对得分'), ('partial', '多选题少选按比例得分')], default='strict', max_length=20, verbose_name='判分策略'),
+        ),
+        migrations.AddField(
+            model_name='useranswer',
+            name='points',
+            field=models.FloatField(default=0, verbose_name='得分'),
+        ),
+        migrations.AlterField(
+            model_name='examattempt',
+            name='score',
+            field=models.FloatField(verbose_name='得分'),
+        ),
+        migrations.RunPython(backfill_points, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0007_scoring_policy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='questions.question', verbose_name='题目')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='作答次数')),
+                ('correct_count', models.PositiveIntegerField(default=0, verbose_name='答对次数')),
+                ('option_counts', models.JSONField(default=dict, verbose_name='各选项被选次数')),
+                ('exam_attempts', models.PositiveIntegerField(default=0, verbose_name='考试中作答次数')),
+                ('exam_correct_count', models.PositiveIntegerField(default=0, verbose_name='考试中答对次数')),
+                ('exam_score_sum', models.FloatField(default=0, verbose_name='考试得分之和')),
+                ('exam_score_square_sum', models.FloatField(default=0, verbose_name='考试得分平方和')),
+                ('exam_correct_score_sum', models.FloatField(default=0, verbose_name='答对者考试得分之和')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '题目统计',
+                'verbose_name_plural': '题目统计',
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0008_questionstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreHistogram',
+            fields=[
+                ('question_set', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score_histogram', serialize=False, to='questions.questionset', verbose_name='题目集合')),
+                ('bucket_counts', models.JSONField(default=list, verbose_name='分桶计数')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='考试次数')),
+                ('score_sum', models.FloatField(default=0, verbose_name='得分之和')),
+                ('score_square_sum', models.FloatField(default=0, verbose_name='得分平方和')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '得分分布',
+                'verbose_name_plural': '得分分布',
+            },
+        ),
+        migrations.AddField(
+            model_name='examattempt',
+            name='student',
+            field=models.CharField(blank=True, max_length=100, verbose_name='考生'),
+        ),
+        migrations.CreateModel(
+            name='ScoreEntry',
+            fields=[
+                ('attempt', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score_entry', serialize=False, to='questions.examattempt', verbose_name='考试记录')),
+                ('student', models.CharField(blank=True, max_length=100, verbose_name='考生')),
+                ('score', models.FloatField(verbose_name='得分')),
+                ('total', models.PositiveIntegerField(verbose_name='题目数')),
+                ('submitted_at', models.DateTimeField(verbose_name='提交时间')),
+                ('question_set', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_entries', to='questions.questionset', verbose_name='题目集合')),
+            ],
+            options={
+                'verbose_name': '成绩榜条目',
+                'verbose_name_plural': '成绩榜条目',
+                'indexes': [models.Index(fields=['question_set', '-score', 'submitted_at'], name='score_entry_rank_idx')],
+            },
+        ),
+    ]
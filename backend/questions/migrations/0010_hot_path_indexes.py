@@ -0,0 +1,145 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:55
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+import django.db.models.deletion
+
+# 大表上建索引：迁移不包在一个事务中，每个索引单独提交；PostgreSQL 上并发建索引不阻塞写入，
+# SQLite 上直接建索引而不重建整张表（SQLite 添加普通唯一约束和修改字段都会复制整张表）。
+
+
+def renumber_duplicate_questions(apps, schema_editor):
+    # 同一集合中重复的题号：保留ID最小的题目，其余改为集合最大题号之后的新题号（不删除题目和答题记录）
+    Question = apps.get_model('questions', 'Question')
+    duplicates = (
+        Question.objects.values('question_set_id', 'question_number')
+        .annotate(count=Count('id')).filter(count__gt=1)
+    )
+    for row in duplicates:
+        question_ids = list(Question.objects.filter(
+            question_set_id=row['question_set_id'], question_number=row['question_number']
+        ).order_by('id').values_list('id', flat=True))
+        next_number = Question.objects.filter(
+            question_set_id=row['question_set_id']
+        ).aggregate(Max('question_number'))['question_number__max'] + 1
+        for offset, question_id in enumerate(question_ids[1:]):
+            Question.objects.filter(id=question_id).update(question_number=next_number + offset)
+        print(f"题目集合 {row['question_set_id']} 中重复的题号 {row['question_number']} "
+              f"已改为 {next_number}-{next_number + len(question_ids) - 2}")
+
+
+def _is_postgresql(schema_editor) -> bool:
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+class AddIndexOnline(migrations.AddIndex):
+    """建索引：PostgreSQL 上使用 CREATE INDEX CONCURRENTLY"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _is_postgresql(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not _is_postgresql(schema_editor):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+
+class AddUniqueConstraintOnline(migrations.AddConstraint):
+    """添加唯一约束：先建唯一索引（PostgreSQL 上并发），再把索引转为约束；SQLite 上唯一索引即约束"""
+
+    def _sql_parts(self, model, schema_editor):
+        quote_name = schema_editor.quote_name
+        columns = ', '.join(quote_name(model._meta.get_field(field).column) for field in self.constraint.fields)
+        return quote_name(model._meta.db_table), quote_name(self.constraint.name), columns
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        table, name, columns = self._sql_parts(model, schema_editor)
+        if _is_postgresql(schema_editor):
+            schema_editor.execute(f'CREATE UNIQUE INDEX CONCURRENTLY {name} ON {table} ({columns})')
+            schema_editor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}')
+        elif schema_editor.connection.vendor == 'sqlite':
+            schema_editor.execute(f'CREATE UNIQUE INDEX {name} ON {table} ({columns})')
+        else:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor == 'sqlite':
+            schema_editor.execute(f'DROP INDEX {self._sql_parts(model, schema_editor)[1]}')
+        else:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def drop_foreign_key_index(model_name: str, field_name: str, field) -> migrations.SeparateDatabaseAndState:
+    """去掉外键字段的单列索引（已被以该字段开头的复合索引覆盖），只删除索引，不修改字段"""
+
+    def forwards(apps, schema_editor):
+        model = apps.get_model('questions', model_name)
+        column = model._meta.get_field(field_name).column
+        connection = schema_editor.connection
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        for name, info in constraints.items():
+            if info['index'] and not info['unique'] and not info['primary_key'] and info['columns'] == [column]:
+                if _is_postgresql(schema_editor):
+                    schema_editor.execute(schema_editor._delete_index_sql(model, name, concurrently=True))
+                else:
+                    schema_editor.execute(schema_editor._delete_index_sql(model, name))
+
+    def backwards(apps, schema_editor):
+        model = apps.get_model('questions', model_name)
+        schema_editor.execute(schema_editor._create_index_sql(model, fields=[model._meta.get_field(field_name)]))
+
+    return migrations.SeparateDatabaseAndState(
+        database_operations=[migrations.RunPython(forwards, backwards)],
+        state_operations=[migrations.AlterField(model_name=model_name, name=field_name, field=field)],
+    )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('questions', '0009_leaderboard'),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_duplicate_questions, migrations.RunPython.noop, atomic=True),
+        AddUniqueConstraintOnline(
+            model_name='question',
+            constraint=models.UniqueConstraint(fields=('question_set', 'question_number'), name='unique_question_number'),
+        ),
+        AddIndexOnline(
+            model_name='useranswer',
+            index=models.Index(fields=['question', 'submitted_at'], name='user_answer_history_idx'),
+        ),
+        AddIndexOnline(
+            model_name='examattempt',
+            index=models.Index(fields=['question_set', '-submitted_at'], name='exam_attempt_history_idx'),
+        ),
+        # 复合索引建好之后再删除被覆盖的外键索引
+        drop_foreign_key_index('question', 'question_set', models.ForeignKey(
+            db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='questions',
+            to='questions.questionset'
+        )),
+        drop_foreign_key_index('useranswer', 'question', models.ForeignKey(
+            db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='user_answers',
+            to='questions.question'
+        )),
+        drop_foreign_key_index('examattempt', 'question_set', models.ForeignKey(
+            db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='attempts',
+            to='questions.questionset', verbose_name='题目集合'
+        )),
+    ]
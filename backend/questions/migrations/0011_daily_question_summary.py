@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0010_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyQuestionSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='日期')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='作答次数')),
+                ('correct_count', models.PositiveIntegerField(default=0, verbose_name='答对次数')),
+                ('points_sum', models.FloatField(default=0, verbose_name='得分之和')),
+                ('answer_counts', models.JSONField(default=dict, verbose_name='各作答的次数')),
+                ('question', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='questions.question', verbose_name='题目')),
+            ],
+            options={
+                'verbose_name': '每日作答汇总',
+                'verbose_name_plural': '每日作答汇总',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyquestionsummary',
+            constraint=models.UniqueConstraint(fields=('question', 'day'), name='unique_daily_summary'),
+        ),
+    ]
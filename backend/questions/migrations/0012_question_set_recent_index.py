@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0011_daily_question_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='questionset',
+            index=models.Index(fields=['-created_at', '-id'], name='question_set_recent_idx'),
+        ),
+    ]
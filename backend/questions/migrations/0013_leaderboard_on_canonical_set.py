@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def move_alias_scores(apps, schema_editor):
+    # 成绩榜和得分分布改为记在别名指向的集合上：已有的别名集合数据并入其指向的集合
+    QuestionSet = apps.get_model('questions', 'QuestionSet')
+    ScoreEntry = apps.get_model('questions', 'ScoreEntry')
+    ScoreHistogram = apps.get_model('questions', 'ScoreHistogram')
+    aliases = dict(QuestionSet.objects.filter(alias_of__isnull=False).values_list('id', 'alias_of_id'))
+    for alias_id, canonical_id in aliases.items():
+        ScoreEntry.objects.filter(question_set_id=alias_id).update(question_set_id=canonical_id)
+    for alias_histogram in ScoreHistogram.objects.filter(question_set_id__in=list(aliases)):
+        histogram, _ = ScoreHistogram.objects.get_or_create(question_set_id=aliases[alias_histogram.question_set_id])
+        counts = list(histogram.bucket_counts)
+        counts.extend([0] * (len(alias_histogram.bucket_counts) - len(counts)))
+        for bucket, count in enumerate(alias_histogram.bucket_counts):
+            counts[bucket] += count
+        histogram.bucket_counts = counts
+        histogram.attempts += alias_histogram.attempts
+        histogram.score_sum += alias_histogram.score_sum
+        histogram.score_square_sum += alias_histogram.score_square_sum
+        histogram.save()
+        alias_histogram.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0012_question_set_recent_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_alias_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0013_leaderboard_on_canonical_set'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='examattempt',
+            name='exam_attempt_history_idx',
+        ),
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(fields=['question_set', '-submitted_at', '-id'], name='exam_attempt_history_idx'),
+        ),
+    ]
@@ -1,21 +1,49 @@
 from django.db import models
+from django.utils import timezone
 import json
 
 
 class QuestionSet(models.Model):
-    """题目集合模型"""
+    """题目集合模型
+
+    重复上传相同内容的题目和答案文件时不再重新解析：同名时直接返回已有集合，
+    标题不同时创建一个别名集合（alias_of 指向原集合，自身没有文件和题目）。
+    """
+    SCORING_POLICY_CHOICES = [
+        ('strict', '全部选对得分'),
+        ('partial', '多选题少选按比例得分'),
+    ]
+
     title = models.CharField(max_length=200, verbose_name="题目集合标题")
     questions_file = models.FileField(upload_to='questions/', verbose_name="题目文件")
     answers_file = models.FileField(upload_to='answers/', verbose_name="答案解析文件")
+    content_fingerprint = models.CharField(max_length=64, blank=True, db_index=True, verbose_name="内容指纹")
+    alias_of = models.ForeignKey(
+        'self', on_delete=models.CASCADE, null=True, blank=True,
+        related_name='aliases', verbose_name="别名指向的题目集合"
+    )
+    # 判分策略（questions/scoring.py），修改后用 rescore_answers 命令重新计算历史得分
+    scoring_policy = models.CharField(
+        max_length=20, choices=SCORING_POLICY_CHOICES, default='strict', verbose_name="判分策略"
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
     
     class Meta:
         verbose_name = "题目集合"
         verbose_name_plural = "题目集合"
+        indexes = [
+            # 列表按 (创建时间, ID) 倒序游标分页
+            models.Index(fields=['-created_at', '-id'], name='question_set_recent_idx'),
+        ]
     
     def __str__(self):
         return self.title
 
+    @property
+    def canonical(self) -> 'QuestionSet':
+        """实际保存题目的集合（别名集合返回其指向的集合）"""
+        return self.alias_of or self
+
 
 class Question(models.Model):
     """题目模型"""
@@ -24,7 +52,10 @@ class Question(models.Model):
         ('multiple', '多选题'),
     ]
     
-    question_set = models.ForeignKey(QuestionSet, on_delete=models.CASCADE, related_name='questions')
+    # 按集合查询由 (question_set, question_number) 唯一索引覆盖，外键不再单独建索引
+    question_set = models.ForeignKey(
+        QuestionSet, on_delete=models.CASCADE, related_name='questions', db_index=False
+    )
     question_number = models.IntegerField(verbose_name="题号")
     question_text = models.TextField(verbose_name="题干")
     options = models.JSONField(verbose_name="选项")
@@ -36,6 +67,9 @@ class Question(models.Model):
         verbose_name = "题目"
         verbose_name_plural = "题目"
         ordering = ['question_number']
+        constraints = [
+            models.UniqueConstraint(fields=['question_set', 'question_number'], name='unique_question_number'),
+        ]
     
     def __str__(self):
         return f"第{self.question_number}题"
@@ -43,14 +77,189 @@ class Question(models.Model):
 
 class UserAnswer(models.Model):
     """用户答案模型"""
-    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='user_answers')
+    # 按题目查询由 (question, submitted_at) 复合索引覆盖，外键不再单独建索引
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='user_answers', db_index=False)
     user_answers = models.JSONField(verbose_name="用户答案")
     is_correct = models.BooleanField(verbose_name="是否正确")
-    submitted_at = models.DateTimeField(auto_now_add=True, verbose_name="提交时间")
+    points = models.FloatField(default=0, verbose_name="得分")
+    # 判分时赋值（写后缓冲模式下记录稍后才插入，提交时间仍为判分时间）
+    submitted_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name="提交时间")
     
     class Meta:
         verbose_name = "用户答案"
         verbose_name_plural = "用户答案"
+        indexes = [
+            models.Index(fields=['question', 'submitted_at'], name='user_answer_history_idx'),
+        ]
+    
+    def __str__(self):
+        return f"用户答案 - 第{self.question.question_number}题" 
+
+class DailyQuestionSummary(models.Model):
+    """超过保留期的答题记录压缩后的每日汇总（compact_answers 命令写入）
+
+    answer_counts 按作答选项位掩码计数（键为位掩码的十进制字符串），
+    修改答案或判分策略后仍可以重新计算答对次数和得分。
+    """
+    # 按题目查询由 (question, day) 唯一索引覆盖
+    question = models.ForeignKey(
+        Question, on_delete=models.CASCADE, related_name='daily_summaries', db_index=False, verbose_name="题目"
+    )
+    day = models.DateField(verbose_name="日期")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="作答次数")
+    correct_count = models.PositiveIntegerField(default=0, verbose_name="答对次数")
+    points_sum = models.FloatField(default=0, verbose_name="得分之和")
+    answer_counts = models.JSONField(default=dict, verbose_name="各作答的次数")
+
+    class Meta:
+        verbose_name = "每日作答汇总"
+        verbose_name_plural = "每日作答汇总"
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'day'], name='unique_daily_summary'),
+        ]
+
+    def __str__(self):
+        return f"每日作答汇总 - {self.question_id} {self.day} ({self.correct_count}/{self.attempts})"
+
+
+class QuestionStats(models.Model):
+    """题目统计：逐题累计的作答计数
+
+    写入答题记录和考试记录时在同一事务中累加，读取统计不需要扫描答题记录；
+    rebuild_question_stats 命令可以从历史记录（含压缩后的每日汇总）重新计算。
+    考试中的作答另外累计整卷得分之和，用于计算区分度（点二列相关）。
+    """
+    question = models.OneToOneField(
+        Question, on_delete=models.CASCADE, primary_key=True, related_name='stats', verbose_name="题目"
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name="作答次数")
+    correct_count = models.PositiveIntegerField(default=0, verbose_name="答对次数")
+    option_counts = models.JSONField(default=dict, verbose_name="各选项被选次数")
+    exam_attempts = models.PositiveIntegerField(default=0, verbose_name="考试中作答次数")
+    exam_correct_count = models.PositiveIntegerField(default=0, verbose_name="考试中答对次数")
+    exam_score_sum = models.FloatField(default=0, verbose_name="考试得分之和")
+    exam_score_square_sum = models.FloatField(default=0, verbose_name="考试得分平方和")
+    exam_correct_score_sum = models.FloatField(default=0, verbose_name="答对者考试得分之和")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "题目统计"
+        verbose_name_plural = "题目统计"
+
+    def __str__(self):
+        return f"题目统计 - {self.question_id} ({self.correct_count}/{self.attempts})"
+
+class IngestionJob(models.Model):
+    """题目导入任务模型（后台解析PDF）"""
+    STATUS_CHOICES = [
+        ('pending', '等待中'),
+        ('running', '解析中'),
+        ('succeeded', '已完成'),
+        ('failed', '失败'),
+    ]
     
+    title = models.CharField(max_length=200, verbose_name="题目集合标题")
+    questions_file = models.FileField(upload_to='questions/', verbose_name="题目文件")
+    answers_file = models.FileField(upload_to='answers/', verbose_name="答案解析文件")
+    questions_sha256 = models.CharField(max_length=64, blank=True, verbose_name="题目文件SHA-256")
+    answers_sha256 = models.CharField(max_length=64, blank=True, verbose_name="答案文件SHA-256")
+    question_set = models.ForeignKey(
+        QuestionSet, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='ingestion_jobs', verbose_name="题目集合"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True, verbose_name="状态")
+    stage = models.CharField(max_length=50, blank=True, verbose_name="当前阶段")
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name="进度")
+    stage_timings = models.JSONField(default=dict, blank=True, verbose_name="各阶段耗时")
+    questions_count = models.IntegerField(default=0, verbose_name="题目数量")
+    error = models.TextField(blank=True, verbose_name="错误信息")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="执行次数")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="开始时间")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="心跳时间")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="完成时间")
+    
+    class Meta:
+        verbose_name = "导入任务"
+        verbose_name_plural = "导入任务"
+        ordering = ['created_at']
+    
+    def __str__(self):
+        return f"导入任务 - {self.title}"
+
+
+class ExamAttempt(models.Model):
+    """考试记录：一次提交整套题目的答卷及判分结果
+
+    逐题结果以紧凑的二进制数组保存在同一行中（按提交时答案键的题目顺序）：
+    题目ID（int64）、题号（int32）、作答选项位掩码（uint16）和是否答对的位图，
+    读取一次考试记录只需要一次查询。
+    """
+    # 按集合查询由 (question_set, -submitted_at) 复合索引覆盖，外键不再单独建索引
+    question_set = models.ForeignKey(
+        QuestionSet, on_delete=models.CASCADE, related_name='attempts', db_index=False, verbose_name="题目集合"
+    )
+    student = models.CharField(max_length=100, blank=True, verbose_name="考生")
+    question_ids = models.BinaryField(verbose_name="题目ID")
+    question_numbers = models.BinaryField(verbose_name="题号")
+    answer_masks = models.BinaryField(verbose_name="作答选项")
+    correct_flags = models.BinaryField(verbose_name="是否答对")
+    scoring_policy = models.CharField(max_length=20, default='strict', verbose_name="判分策略")
+    score = models.FloatField(verbose_name="得分")
+    total = models.PositiveIntegerField(verbose_name="题目数")
+    submitted_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name="提交时间")
+
+    class Meta:
+        verbose_name = "考试记录"
+        verbose_name_plural = "考试记录"
+        ordering = ['-submitted_at']
+        indexes = [
+            models.Index(fields=['question_set', '-submitted_at', '-id'], name='exam_attempt_history_idx'),
+        ]
+
+    def __str__(self):
+        return f"考试记录 - {self.question_set.title} ({self.score}/{self.total})"
+
+
+class ScoreEntry(models.Model):
+    """成绩榜条目：考试记录的总分窄表（不含逐题结果），按题目集合和得分建索引用于排名"""
+    attempt = models.OneToOneField(
+        ExamAttempt, on_delete=models.CASCADE, primary_key=True, related_name='score_entry', verbose_name="考试记录"
+    )
+    question_set = models.ForeignKey(
+        QuestionSet, on_delete=models.CASCADE, related_name='score_entries', verbose_name="题目集合"
+    )
+    student = models.CharField(max_length=100, blank=True, verbose_name="考生")
+    score = models.FloatField(verbose_name="得分")
+    total = models.PositiveIntegerField(verbose_name="题目数")
+    submitted_at = models.DateTimeField(verbose_name="提交时间")
+
+    class Meta:
+        verbose_name = "成绩榜条目"
+        verbose_name_plural = "成绩榜条目"
+        indexes = [
+            models.Index(fields=['question_set', '-score', 'submitted_at'], name='score_entry_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student or '匿名'} - {self.score}/{self.total}"
+
+
+class ScoreHistogram(models.Model):
+    """题目集合的得分分布：按得分向下取整分桶的考试次数，以及得分之和、平方和"""
+    question_set = models.OneToOneField(
+        QuestionSet, on_delete=models.CASCADE, primary_key=True, related_name='score_histogram',
+        verbose_name="题目集合"
+    )
+    bucket_counts = models.JSONField(default=list, verbose_name="分桶计数")  # 下标为得分向下取整
+    attempts = models.PositiveIntegerField(default=0, verbose_name="考试次数")
+    score_sum = models.FloatField(default=0, verbose_name="得分之和")
+    score_square_sum = models.FloatField(default=0, verbose_name="得分平方和")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "得分分布"
+        verbose_name_plural = "得分分布"
+
     def __str__(self):
-        return f"用户答案 - 第{self.question.question_number}题" 
\ No newline at end of file
+        return f"得分分布 - {self.question_set_id} ({self.attempts}次)"
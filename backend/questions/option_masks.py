@@ -0,0 +1,28 @@
+from typing import Iterable, List
+
+import numpy as np
+
+
+# 选项位掩码：A=1, B=2, C=4, D=8 ... O=2^14；无法识别的选项记为最高位，不会与任何答案键相等
+MASK_DTYPE = np.uint16
+MAX_OPTIONS = 15
+INVALID_OPTION = 1 << MAX_OPTIONS
+
+
+def option_mask(options: Iterable[str]) -> int:
+    """把选项字母列表编码成位掩码（与顺序和重复无关）"""
+    mask = 0
+    for option in options:
+        index = ord(option) - ord('A') if isinstance(option, str) and len(option) == 1 else -1
+        mask |= 1 << index if 0 <= index < MAX_OPTIONS else INVALID_OPTION
+    return mask
+
+
+def mask_options(mask: int) -> List[str]:
+    """把位掩码解码成按字母排序的选项列表（无法识别的选项不会还原）"""
+    return [chr(ord('A') + index) for index in range(MAX_OPTIONS) if mask >> index & 1]
+
+
+def encode_answers(answer_lists: Iterable[Iterable[str]]) -> np.ndarray:
+    """把多组选项列表编码成位掩码数组"""
+    return np.fromiter((option_mask(options) for options in answer_lists), dtype=MASK_DTYPE)
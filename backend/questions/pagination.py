@@ -0,0 +1,45 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from django.db.models import QuerySet
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(moment: datetime, pk: int) -> str:
+    """游标：上一页最后一条记录的 (时间, ID)，编码为URL安全的字符串"""
+    payload = json.dumps([moment.isoformat(), pk]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析游标，格式不正确时抛出 ValueError"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        moment, pk = json.loads(payload)
+    except (ValueError, TypeError):
+        raise ValueError('cursor格式不正确')
+    moment = parse_datetime(moment) if isinstance(moment, str) else None
+    if moment is None or not isinstance(pk, int):
+        raise ValueError('cursor格式不正确')
+    return moment, pk
+
+
+def paginate_recent(queryset: QuerySet, cursor: Optional[str], limit: int,
+                    field: str = 'created_at') -> Tuple[List, Optional[str]]:
+    """按 (时间字段, ID) 倒序的游标分页，返回 (本页记录, 下一页游标)；没有下一页时游标为 None
+
+    条件写成 时间 <= 游标时间 再排除同一时间中ID不小于游标的记录，数据库可以直接在
+    (时间, id) 索引上定位起点，翻到多深都不需要跳过前面的记录。
+    """
+    queryset = queryset.order_by(f'-{field}', '-id')
+    if cursor:
+        moment, pk = decode_cursor(cursor)
+        queryset = queryset.filter(**{f'{field}__lte': moment}).exclude(**{field: moment, 'id__gte': pk})
+    # 多取一条判断是否还有下一页
+    items = list(queryset[:limit + 1])
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor(getattr(items[-1], field), items[-1].id)
@@ -0,0 +1,42 @@
+import threading
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+# 解析器名称 -> 类路径；对应模块在第一次获取解析器时才导入
+PARSERS = {
+    'gemini': 'questions.gemini_parser.GeminiPDFParser',
+    'regex': 'questions.pdf_parser.PDFParser',
+}
+
+_parsers = {}
+_parsers_lock = threading.Lock()
+
+
+def get_parser(name: str = 'gemini'):
+    """获取进程内共享的解析器实例，所有请求和导入任务复用同一个实例
+
+    解析器不保存单次解析的状态，可以在多个线程中同时使用。
+    创建失败（例如缺少API密钥）时不缓存，下次调用会重新尝试。
+    """
+    with _parsers_lock:
+        parser = _parsers.get(name)
+        if parser is None:
+            parser = import_string(PARSERS[name])()
+            _parsers[name] = parser
+        return parser
+
+
+def reset_parsers():
+    """丢弃已创建的解析器，下次获取时按当前配置重新创建"""
+    with _parsers_lock:
+        _parsers.clear()
+
+
+@receiver(setting_changed)
+def _reset_parsers_on_setting_change(setting, **kwargs):
+    # 解析器在创建时读取Gemini相关配置（测试中用override_settings修改）
+    if setting.startswith('GEMINI_'):
+        reset_parsers()
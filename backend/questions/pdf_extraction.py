@@ -0,0 +1,257 @@
+import hashlib
+import io
+import math
+import mmap
+import os
+import tempfile
+import threading
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional, Union
+
+from django.conf import settings
+
+from .disk_cache import DiskCache
+
+
+# 提取逻辑变化时递增，旧版本的缓存结果自动失效
+EXTRACTOR_VERSION = 2
+
+def _extract_page_range(source, start: int, stop: int) -> List[str]:
+    """提取 [start, stop) 范围内各页的文本（在子进程中执行）"""
+    return list(_iter_page_range(source, start, stop))
+
+
+def _iter_page_range(source, start: int, stop: int) -> Iterator[str]:
+    """逐页提取文本：优先pdfplumber，单页失败时仅对该页回退到PyPDF2"""
+    # PDF库较重，只在真正提取时导入，不拖慢只负责答题判卷的进程启动
+    import pdfplumber
+
+    with ExitStack() as stack:
+        fallback_reader = None
+        try:
+            pdf = stack.enter_context(pdfplumber.open(stack.enter_context(_open_source(source))))
+        except Exception:
+            pdf = None
+
+        for page_index in range(start, stop):
+            if pdf is not None:
+                try:
+                    yield pdf.pages[page_index].extract_text() or ""
+                    continue
+                except Exception:
+                    pass
+
+            # 备用方案：使用PyPDF2提取当前页
+            try:
+                if fallback_reader is None:
+                    import PyPDF2
+                    fallback_reader = PyPDF2.PdfReader(stack.enter_context(_open_source(source)))
+                yield fallback_reader.pages[page_index].extract_text() or ""
+            except Exception as e:
+                raise Exception(f"无法解析PDF文件第{page_index + 1}页: {str(e)}")
+
+
+def count_pages(source) -> int:
+    """获取PDF页数"""
+    import pdfplumber
+
+    try:
+        with _open_source(source) as stream, pdfplumber.open(stream) as pdf:
+            return len(pdf.pages)
+    except Exception:
+        try:
+            import PyPDF2
+            with _open_source(source) as stream:
+                return len(PyPDF2.PdfReader(stream).pages)
+        except Exception as e:
+            raise Exception(f"无法解析PDF文件: {str(e)}")
+
+
+def _resolve_source(pdf_file) -> Union[str, bytes]:
+    """把上传文件/FieldFile/路径统一成文件路径或字节串"""
+    if isinstance(pdf_file, (str, os.PathLike)):
+        return os.fspath(pdf_file)
+    if hasattr(pdf_file, 'temporary_file_path'):
+        return pdf_file.temporary_file_path()
+    try:
+        path = pdf_file.path
+    except (AttributeError, NotImplementedError, ValueError):
+        path = None
+    if path and os.path.exists(path):
+        return path
+
+    if hasattr(pdf_file, 'seek'):
+        pdf_file.seek(0)
+    return pdf_file.read()
+
+
+@contextmanager
+def _open_source(source):
+    """打开PDF供pdfplumber/PyPDF2读取：文件路径以只读内存映射打开，字节串包装成文件对象
+
+    内存映射由操作系统按需分页读入，解析器只读取用到的对象，
+    大文件不会被复制到进程堆中。
+    """
+    if isinstance(source, bytes):
+        yield io.BytesIO(source)
+        return
+
+    with open(source, 'rb') as source_file:
+        if os.fstat(source_file.fileno()).st_size == 0:
+            # 空文件无法映射，交给解析器报错
+            yield source_file
+            return
+        with mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def _page_ranges(page_count: int, workers: int) -> List[tuple]:
+    """把页码切分成若干连续区间，区间数约为进程数的4倍以平衡负载"""
+    pages_per_task = max(
+        settings.PDF_EXTRACT_MIN_PAGES_PER_TASK,
+        math.ceil(page_count / (workers * 4))
+    )
+    return [
+        (start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    ]
+
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """进程内共享的提取进程池，所有并发导入任务共用同一组CPU"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=settings.PDF_EXTRACT_WORKERS)
+        return _process_pool
+
+
+def _reset_process_pool():
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def _iter_parallel(path: str, page_count: int) -> Iterator[str]:
+    """按页区间分发到进程池，按原始页序逐页产出"""
+    pool = _get_process_pool()
+    futures = [
+        pool.submit(_extract_page_range, path, start, stop)
+        for start, stop in _page_ranges(page_count, settings.PDF_EXTRACT_WORKERS)
+    ]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def iter_pdf_pages(pdf_file) -> Iterator[str]:
+    """按页序逐页产出PDF文本；页数较多时使用进程池并行提取"""
+    source = _resolve_source(pdf_file)
+    page_count = count_pages(source)
+
+    parallel = (
+        settings.PDF_EXTRACT_WORKERS > 1
+        and page_count >= settings.PDF_EXTRACT_MIN_PARALLEL_PAGES
+    )
+    if not parallel:
+        yield from _iter_page_range(source, 0, page_count)
+        return
+
+    # 子进程按路径打开文件，内存中的上传文件先落盘到临时文件
+    temp_path = None
+    if isinstance(source, bytes):
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
+            temp_file.write(source)
+            temp_path = source = temp_file.name
+
+    try:
+        produced = 0
+        try:
+            for page_text in _iter_parallel(source, page_count):
+                produced += 1
+                yield page_text
+        except BrokenProcessPool:
+            # 进程池异常退出时重建进程池，剩余页在当前进程串行提取
+            _reset_process_pool()
+            yield from _iter_page_range(source, produced, page_count)
+    finally:
+        if temp_path:
+            os.unlink(temp_path)
+
+
+_text_cache = None
+
+
+def get_text_cache() -> DiskCache:
+    """获取提取文本缓存（按文件内容寻址）"""
+    global _text_cache
+    if _text_cache is None or _text_cache.directory != str(settings.PDF_TEXT_CACHE_DIR):
+        _text_cache = DiskCache(settings.PDF_TEXT_CACHE_DIR, settings.PDF_TEXT_CACHE_MAX_BYTES)
+    return _text_cache
+
+
+def file_sha256(pdf_file) -> tuple:
+    """计算文件内容的SHA-256，返回 (摘要, 字节数)"""
+    digest = hashlib.sha256()
+    size = 0
+    if hasattr(pdf_file, 'chunks'):
+        # Django的File/UploadedFile/FieldFile，分块读取后复位
+        for chunk in pdf_file.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        pdf_file.seek(0)
+        return digest.hexdigest(), size
+
+    source = _resolve_source(pdf_file)
+    if isinstance(source, bytes):
+        digest.update(source)
+        size = len(source)
+    else:
+        with open(source, 'rb') as source_file:
+            for chunk in iter(lambda: source_file.read(1024 * 1024), b''):
+                digest.update(chunk)
+                size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def extract_text(pdf_file, use_cache: bool = True, digest: Optional[str] = None) -> str:
+    """提取整个PDF的文本（各页文本直接拼接）；相同内容的文件直接读取缓存
+
+    digest 为已知的文件SHA-256（例如上传时边接收边计算），提供时跳过对文件的哈希读取。
+    """
+    if not (use_cache and settings.PDF_TEXT_CACHE_ENABLED):
+        return "".join(iter_pdf_pages(pdf_file))
+
+    if digest is None:
+        digest, size = file_sha256(pdf_file)
+    else:
+        size = _source_size(pdf_file)
+    cache_key = f'{digest}-v{EXTRACTOR_VERSION}'
+    cache = get_text_cache()
+    cached = cache.get(cache_key, saved_bytes=size)
+    if cached is not None:
+        return cached.decode('utf-8')
+
+    text = "".join(iter_pdf_pages(pdf_file))
+    cache.set(cache_key, text.encode('utf-8'))
+    return text
+
+
+def _source_size(pdf_file) -> int:
+    """文件字节数（用于缓存命中统计），不读取文件内容"""
+    size = getattr(pdf_file, 'size', None)
+    if size is not None:
+        return size
+    source = _resolve_source(pdf_file)
+    return len(source) if isinstance(source, bytes) else os.path.getsize(source)
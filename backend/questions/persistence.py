@@ -0,0 +1,260 @@
+import hashlib
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .answer_keys import invalidate_answer_key
+from .chunking import question_completeness
+from .grading import ATTEMPT_ID_DTYPE, ATTEMPT_NUMBER_DTYPE
+from .leaderboard import merge_leaderboard
+from .models import QuestionSet, Question, UserAnswer, ExamAttempt
+from .retention import merge_daily_summaries
+from .statistics import merge_question_stats
+
+
+def build_question(question_set: QuestionSet, question_data: Dict) -> Question:
+    """根据解析结果构建题目对象（不写入数据库）"""
+    return Question(
+        question_set=question_set,
+        question_number=question_data['question_number'],
+        question_text=question_data['question_text'],
+        options=question_data['options'],
+        question_type=question_data['question_type'],
+        correct_answers=question_data['correct_answers'],
+        explanation=question_data['explanation']
+    )
+
+
+def save_question_set(title: str, questions_file, answers_file, merged_questions: List[Dict],
+                      content_fingerprint: str = '') -> QuestionSet:
+    """在一个事务中创建题目集合并批量插入全部题目，任一步失败则整体回滚
+
+    同一集合中题号唯一：题号重复时保留信息更完整的版本。
+    """
+    unique_questions = {}
+    for question_data in merged_questions:
+        existing = unique_questions.get(question_data['question_number'])
+        if existing is None or question_completeness(question_data) > question_completeness(existing):
+            unique_questions[question_data['question_number']] = question_data
+
+    with transaction.atomic():
+        question_set = QuestionSet.objects.create(
+            title=title,
+            questions_file=questions_file,
+            answers_file=answers_file,
+            content_fingerprint=content_fingerprint
+        )
+        Question.objects.bulk_create(
+            [build_question(question_set, question_data) for question_data in unique_questions.values()],
+            batch_size=settings.QUESTION_BULK_BATCH_SIZE
+        )
+    return question_set
+
+
+class IncrementalQuestionWriter:
+    """边解析边保存题目：首题立即写入，之后按数量或时间间隔批量写入
+
+    题目写入前合并答案文件中的答案和解析。同一题号重复出现时
+    （流式解码结果和分片最终结果），保留信息更完整的版本。
+    """
+
+    QUESTION_FIELDS = ['question_text', 'options', 'question_type', 'correct_answers', 'explanation']
+
+    def __init__(self, question_set: QuestionSet, answers: Optional[Dict[int, Dict]] = None,
+                 on_flush: Optional[Callable[[int], None]] = None):
+        self.question_set = question_set
+        self.answers = answers or {}
+        self.on_flush = on_flush
+        self.questions = {}  # 题号 -> 最新版本的题目数据
+        self.pending = {}  # 尚未插入的题目
+        self.updates = {}  # 已插入、需要更新的题目
+        self.count = 0
+        self.first_saved_at = None
+        self.last_flush = time.monotonic()
+
+    @classmethod
+    def create(cls, title: str, questions_file, answers_file, **kwargs) -> 'IncrementalQuestionWriter':
+        """创建题目集合并返回对应的写入器
+
+        集合在导入完成（finish）之前没有内容指纹，重复上传不会复用只写入了一部分的集合。
+        """
+        question_set = QuestionSet.objects.create(
+            title=title,
+            questions_file=questions_file,
+            answers_file=answers_file
+        )
+        return cls(question_set, **kwargs)
+
+    def add(self, question_data: Dict):
+        """加入一道题目，必要时触发写库"""
+        question = self._prepare(question_data)
+        if question is None:
+            return
+
+        number = question['question_number']
+        existing = self.questions.get(number)
+        if existing is None or question_completeness(question) > question_completeness(existing):
+            self.questions[number] = question
+            if existing is None or number in self.pending:
+                self.pending[number] = question
+            else:
+                self.updates[number] = question
+
+        # 重复的题目也检查一次，避免缓冲区中的题目长时间得不到写入
+        if (self.first_saved_at is None
+                or len(self.pending) >= settings.QUESTION_BULK_BATCH_SIZE
+                or time.monotonic() - self.last_flush >= settings.INGESTION_FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        """写入缓冲区中的新题目和更新"""
+        if not self.pending and not self.updates:
+            return
+        with transaction.atomic():
+            Question.objects.bulk_create(
+                [build_question(self.question_set, question) for question in self.pending.values()],
+                batch_size=settings.QUESTION_BULK_BATCH_SIZE
+            )
+            for number, question in self.updates.items():
+                Question.objects.filter(question_set=self.question_set, question_number=number).update(
+                    **{field: question[field] for field in self.QUESTION_FIELDS}
+                )
+        # 批量写入不触发模型信号，显式丢弃已缓存的答案键
+        invalidate_answer_key(self.question_set.id)
+        self.count += len(self.pending)
+        self.pending = {}
+        self.updates = {}
+        self.last_flush = time.monotonic()
+        if self.first_saved_at is None:
+            self.first_saved_at = self.last_flush
+        if self.on_flush:
+            self.on_flush(self.count)
+
+    def finish(self, content_fingerprint: str = ''):
+        """写入剩余题目，并记录内容指纹（之后相同内容的上传复用该集合）"""
+        self.flush()
+        if content_fingerprint:
+            QuestionSet.objects.filter(pk=self.question_set.pk).update(content_fingerprint=content_fingerprint)
+            self.question_set.content_fingerprint = content_fingerprint
+
+    def discard(self):
+        """导入失败时删除已写入的题目集合（题目级联删除）"""
+        self.pending = {}
+        self.updates = {}
+        self.question_set.delete()
+
+    def _prepare(self, question_data: Dict) -> Optional[Dict]:
+        try:
+            number = int(question_data.get('question_number'))
+        except (TypeError, ValueError):
+            print(f"跳过没有题号的题目: {str(question_data)[:100]}")
+            return None
+
+        question = {
+            'question_number': number,
+            'question_text': question_data.get('question_text') or '',
+            'options': question_data.get('options') or {},
+            'question_type': question_data.get('question_type') or 'single',
+            'correct_answers': question_data.get('correct_answers') or [],
+            'explanation': question_data.get('explanation') or ''
+        }
+        answer_info = self.answers.get(number)
+        if answer_info:
+            question['correct_answers'] = answer_info['correct_answers']
+            question['explanation'] = answer_info['explanation']
+            # 根据答案数量判断题目类型
+            question['question_type'] = 'multiple' if len(answer_info['correct_answers']) > 1 else 'single'
+        return question
+
+
+def discard_stored_files(*field_files):
+    """删除已保存到存储中的上传文件（导入失败时清理）"""
+    for field_file in field_files:
+        if field_file:
+            try:
+                field_file.delete(save=False)
+            except OSError as e:
+                print(f"删除文件失败: {field_file.name} - {str(e)}")
+
+
+def discard_partial_question_set(job):
+    """删除导入任务上次执行中断时留下的、只写入了一部分题目的集合（题目级联删除）"""
+    if job.question_set_id is None:
+        return
+    QuestionSet.objects.filter(pk=job.question_set_id).delete()
+    job.question_set = None
+
+
+def content_fingerprint(questions_sha256: str, answers_sha256: str) -> str:
+    """题目文件和答案文件内容的联合指纹；任一文件的摘要未知时返回空字符串"""
+    if not (questions_sha256 and answers_sha256):
+        return ''
+    return hashlib.sha256(f'{questions_sha256}:{answers_sha256}'.encode('ascii')).hexdigest()
+
+
+def find_question_set(fingerprint: str) -> Optional[QuestionSet]:
+    """按内容指纹查找已导入的题目集合（不含别名集合和仍在导入中的集合）"""
+    if not fingerprint:
+        return None
+    return (
+        QuestionSet.objects
+        .filter(content_fingerprint=fingerprint, alias_of__isnull=True)
+        .exclude(ingestion_jobs__status__in=('pending', 'running'))
+        .order_by('created_at', 'id')
+        .first()
+    )
+
+
+def reuse_question_set(title: str, existing: QuestionSet) -> QuestionSet:
+    """重复上传时复用已有集合：标题相同直接返回，否则返回（必要时创建）同名的别名集合"""
+    if existing.title == title:
+        return existing
+    alias, _ = QuestionSet.objects.get_or_create(
+        alias_of=existing,
+        title=title,
+        defaults={'content_fingerprint': existing.content_fingerprint}
+    )
+    return alias
+
+
+def merge_question_set(duplicate: QuestionSet, canonical: QuestionSet):
+    """把内容重复的题目集合合并为 canonical 的别名
+
+    答题记录、每日汇总和考试记录改为指向 canonical 中同题号的题目，随后删除重复的题目和文件；
+    集合本身保留（ID和标题不变），以别名的形式继续可用。重复题目的统计累加到 canonical 的同号题目，
+    成绩榜条目和得分分布并入 canonical。
+    """
+    target_ids = dict(canonical.questions.values_list('question_number', 'id'))
+    duplicate_questions = list(duplicate.questions.values_list('id', 'question_number'))
+    missing = sorted({number for _, number in duplicate_questions if number not in target_ids})
+    if missing:
+        raise Exception(f"题目集合 {canonical.id} 中缺少题号 {missing[:10]}，无法合并题目集合 {duplicate.id}")
+
+    stored_files = [
+        field_file for field_file in (duplicate.questions_file, duplicate.answers_file)
+        if field_file and field_file.name not in (canonical.questions_file.name, canonical.answers_file.name)
+    ]
+    with transaction.atomic():
+        for question_id, number in duplicate_questions:
+            UserAnswer.objects.filter(question_id=question_id).update(question_id=target_ids[number])
+        question_map = {question_id: target_ids[number] for question_id, number in duplicate_questions}
+        merge_daily_summaries(question_map)
+        merge_question_stats(question_map)
+        merge_leaderboard(duplicate, canonical)
+        for attempt in ExamAttempt.objects.filter(question_set__in=[duplicate, *duplicate.aliases.all()]):
+            numbers = np.frombuffer(bytes(attempt.question_numbers), dtype=ATTEMPT_NUMBER_DTYPE).tolist()
+            attempt.question_ids = np.array(
+                [target_ids[number] for number in numbers], dtype=ATTEMPT_ID_DTYPE
+            ).tobytes()
+            attempt.save(update_fields=['question_ids'])
+        duplicate.questions.all().delete()
+        QuestionSet.objects.filter(alias_of=duplicate).update(alias_of=canonical)
+        duplicate.alias_of = canonical
+        duplicate.content_fingerprint = canonical.content_fingerprint
+        duplicate.questions_file = ''
+        duplicate.answers_file = ''
+        duplicate.save()
+    discard_stored_files(*stored_files)
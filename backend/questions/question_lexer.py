@@ -0,0 +1,113 @@
+import re
+from typing import Dict, List
+
+
+# 各类行的正则片段（均为前瞻，只负责分类和捕获，不消耗字符）
+# 行内空白用 [^\S\n] 表示，保证匹配不会跨行；文本捕获到行内最后一个非空白字符为止
+TEXT = r'\S(?:.*\S)?'
+QUESTION = rf'(?=(?P<number>\d+)[\.、][^\S\n]*(?P<question_text>{TEXT}))'
+OPTION = rf'(?=(?P<option_key>[A-D])[\.、][^\S\n]*(?P<option_text>{TEXT}))'
+ANSWER = r'(?=.*?答案[：:][^\S\n]*(?P<answers>[A-D]+))'
+ANSWER_NUMBER = r'(?=.*?(?P<answer_number>\d+)[\.、])'
+EXPLANATION = rf'(?=.*?解析[：:][^\S\n]*(?P<explanation_text>{TEXT}))'
+# 行内含有"答"或"解"才可能是答案/解析行；先整体跳过不含标记字符的部分（用反向引用模拟占有量词，
+# 失败时不回溯），让大多数普通延续行只扫描一遍
+MARKED = r'(?=(?=(?P<unmarked>[^答解\n]*))(?P=unmarked)[答解])'
+
+
+def _combine(leading: Dict[str, str], marked: Dict[str, str]) -> re.Pattern:
+    """按优先级把各类行的正则合并为一个整体扫描的正则
+
+    每次匹配对应一个非空行：先跳过行首空白，再按顺序尝试行首类型（leading）
+    和含标记字符的类型（marked），都不匹配时归为延续内容（continuation），
+    最后消耗到行尾。匹配到的分组名（match.lastgroup）即为行类型。
+    """
+    kinds = [f'(?P<{kind}>{pattern})' for kind, pattern in leading.items()]
+    if marked:
+        kinds.append(MARKED + '(?:' + '|'.join(f'(?P<{kind}>{pattern})' for kind, pattern in marked.items()) + ')')
+    return re.compile(rf'^[^\S\n]*(?=\S)(?:{"|".join(kinds)}|(?P<continuation>))[^\n]*', re.MULTILINE)
+
+
+# 题目文件：题号 > 选项 > 答案 > 解析
+QUESTION_LINE = _combine(
+    {'question': QUESTION, 'option': OPTION},
+    {'answer': ANSWER, 'explanation': EXPLANATION}
+)
+# 答案文件：带题号的答案 > 解析
+ANSWER_LINE = _combine({}, {'answer': ANSWER + ANSWER_NUMBER, 'explanation': EXPLANATION})
+
+def _build_question(state: Dict) -> Dict:
+    return {
+        'question_number': state['question_number'],
+        'question_text': ' '.join(state['question_text']),
+        'options': state['options'],
+        'question_type': state['question_type'],
+        'correct_answers': state['correct_answers'],
+        'explanation': ' '.join(state['explanation'])
+    }
+
+
+def parse_question_text(text: str) -> List[Dict]:
+    """解析题目文本；题干和解析的延续内容先收集到列表，最后一次性拼接"""
+    questions = []
+    current = None
+
+    for match in QUESTION_LINE.finditer(text):
+        kind = match.lastgroup
+        if kind == 'question':
+            # 保存前一个题目，开始新题目
+            if current:
+                questions.append(_build_question(current))
+            current = {
+                'question_number': int(match.group('number')),
+                'question_text': [match.group('question_text')],
+                'options': {},
+                'question_type': 'single',  # 默认为单选
+                'correct_answers': [],
+                'explanation': []
+            }
+        elif current is None:
+            continue
+        elif kind == 'option':
+            current['options'][match.group('option_key')] = match.group('option_text')
+        elif kind == 'answer':
+            answers = match.group('answers')
+            current['correct_answers'] = list(answers)
+            # 如果答案超过1个，则为多选题
+            if len(answers) > 1:
+                current['question_type'] = 'multiple'
+        elif kind == 'explanation':
+            current['explanation'] = [match.group('explanation_text')]
+        elif not current['options']:
+            # 还没有选项，是题干的延续
+            current['question_text'].append(match.group().strip())
+        elif current['explanation']:
+            # 已有解析，是解析的延续
+            current['explanation'].append(match.group().strip())
+
+    # 添加最后一个题目
+    if current:
+        questions.append(_build_question(current))
+
+    return questions
+
+
+def parse_answer_text(text: str) -> Dict[int, Dict]:
+    """解析答案解析文本，一道题的答案在遇到其解析时生效"""
+    answers = {}
+    current = None
+
+    for match in ANSWER_LINE.finditer(text):
+        kind = match.lastgroup
+        if kind == 'answer':
+            current = {
+                'question_number': int(match.group('answer_number')),
+                'correct_answers': list(match.group('answers')),
+                'explanation': ''
+            }
+        elif kind == 'explanation' and current:
+            current['explanation'] = match.group('explanation_text')
+            answers[current['question_number']] = current
+            current = None
+
+    return answers
@@ -0,0 +1,118 @@
+import re
+from bisect import bisect_left
+from typing import Dict, List
+
+
+QUESTION_HEADER = re.compile(r'(\d+)[\.、]\s*(.+)')
+OPTION = re.compile(r'([A-D])[\.、]\s*(.+)')
+ANSWER_MARKER = re.compile(r'答案[：:]\s*([A-D]+)')
+ANSWER_LETTER = re.compile(r'[A-D]')
+DIGITS = re.compile(r'\d+')
+
+# 选项在题干之后的这个范围内查找（与原实现一致）
+OPTION_WINDOW = 500
+
+
+class ResponseIndex:
+    """对响应文本做一次预扫描，记录题号、选项和答案标记的位置
+
+    之后每道题的选项和答案都通过二分查找定位，整体复杂度为 O(n log n)，
+    不再对全文做重复的 find 和正则搜索。
+    """
+
+    def __init__(self, text: str, numbers: List[str]):
+        self.text = text
+
+        self.options = list(OPTION.finditer(text))
+        self.option_starts = [match.start() for match in self.options]
+
+        # 答案字母的位置，以及"答案："标记按其字母位置建立的索引
+        self.letters = [match.start() for match in ANSWER_LETTER.finditer(text)]
+        self.markers = {match.start(1): match for match in ANSWER_MARKER.finditer(text)}
+
+        # 只记录需要查询的题号在文本中出现的位置（可能出现在更长的数字串内部）
+        self.occurrences = {number: [] for number in numbers}
+        lengths = sorted({len(number) for number in numbers})
+        for run in DIGITS.finditer(text):
+            start, end = run.span()
+            for position in range(start, end):
+                for length in lengths:
+                    if position + length > end:
+                        break
+                    positions = self.occurrences.get(text[position:position + length])
+                    if positions is not None:
+                        positions.append(position)
+        self._answers = {}
+
+    def options_after(self, position: int) -> Dict[str, str]:
+        """等价于在 text[position:position + 500] 中 findall 选项，后出现的同名选项覆盖前者"""
+        end = position + OPTION_WINDOW
+        options = {}
+        index = bisect_left(self.option_starts, position)
+        if index and self.options[index - 1].end() > position:
+            # 前一个选项匹配跨过了起点，窗口内的匹配序列不同，直接扫描这个窗口
+            return self._scan_options(position, end)
+
+        for match_index in range(index, len(self.options)):
+            match = self.options[match_index]
+            if match.start() >= end:
+                break
+            if match.end() > end:
+                # 匹配被窗口截断，从这里开始按截断后的文本重新扫描
+                options.update(self._scan_options(match.start(), end))
+                break
+            options[match.group(1)] = match.group(2).strip()
+        return options
+
+    def answers_for(self, number: str) -> str:
+        """等价于 re.search(rf'{number}[^A-D]*答案[：:]\\s*([A-D]+)', text)，返回答案字母
+
+        [^A-D]* 不能跨过答案字母，所以题号之后的第一个答案字母必须正好是某个
+        "答案："标记所捕获的字母，且标记位于题号之后。
+        """
+        if number not in self._answers:
+            self._answers[number] = ''
+            for position in self.occurrences.get(number, ()):
+                number_end = position + len(number)
+                index = bisect_left(self.letters, number_end)
+                if index == len(self.letters):
+                    break
+                marker = self.markers.get(self.letters[index])
+                if marker is not None and marker.start() >= number_end:
+                    self._answers[number] = marker.group(1)
+                    break
+        return self._answers[number]
+
+    def _scan_options(self, start: int, end: int) -> Dict[str, str]:
+        return {
+            match.group(1): match.group(2).strip()
+            for match in OPTION.finditer(self.text, start, end)
+        }
+
+
+def build_questions_from_text(text: str) -> List[Dict]:
+    """从非JSON的响应文本中按题号、选项和答案标记构建题目列表"""
+    headers = list(QUESTION_HEADER.finditer(text))
+    index = ResponseIndex(text, [match.group(1) for match in headers])
+
+    questions = []
+    for match in headers:
+        number = match.group(1)
+        question = {
+            'question_number': int(number),
+            'question_text': match.group(2).strip(),
+            'options': index.options_after(match.start(2)),
+            'question_type': 'single',
+            'correct_answers': [],
+            'explanation': ''
+        }
+
+        answers = index.answers_for(number)
+        if answers:
+            question['correct_answers'] = list(answers)
+            if len(answers) > 1:
+                question['question_type'] = 'multiple'
+
+        questions.append(question)
+
+    return questions
@@ -0,0 +1,229 @@
+import gzip
+import json
+import os
+import zlib
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .answer_keys import MASK_DTYPE, answer_keys, encode_answers
+from .models import DailyQuestionSummary, UserAnswer
+from .scoring import POINTS_DTYPE, score_points
+
+# 按ID删除时每条DELETE的参数个数（SQLite默认最多999个参数）
+DELETE_BATCH_SIZE = 500
+
+
+def retention_cutoff(days: int, now: Optional[datetime] = None) -> datetime:
+    """保留期的起点：本地时间今天零点往前 days 天，早于该时间的答题记录可以压缩（整天压缩）"""
+    today = timezone.localdate(now)
+    return timezone.make_aware(datetime.combine(today - timedelta(days=days), time.min))
+
+
+class AnswerArchive:
+    """gzip压缩的JSONL归档文件：每行一条被删除的答题记录（含原始ID）
+
+    每批写入后同步到磁盘，之后才提交删除该批记录的事务；中途失败时归档中可能多出
+    仍保留在数据库中的记录，按ID去重即可。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, 'xb')
+        self.gzip = gzip.GzipFile(fileobj=self.file, mode='wb')
+        self.count = 0
+
+    def write(self, rows: List[Tuple]):
+        for answer_id, question_id, user_answers, is_correct, points, submitted_at in rows:
+            self.gzip.write((json.dumps({
+                'id': answer_id,
+                'question_id': question_id,
+                'user_answers': user_answers,
+                'is_correct': is_correct,
+                'points': points,
+                'submitted_at': submitted_at.isoformat(),
+            }, ensure_ascii=False) + '\n').encode('utf-8'))
+        self.gzip.flush(zlib.Z_SYNC_FLUSH)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.count += len(rows)
+
+    def close(self):
+        self.gzip.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _empty_increment() -> Dict:
+    return {'attempts': 0, 'correct_count': 0, 'points_sum': 0.0, 'answer_counts': {}}
+
+
+def _merge_counts(counts: Dict[str, int], more: Dict[str, int]) -> Dict[str, int]:
+    merged = dict(counts)
+    for mask, count in more.items():
+        merged[mask] = merged.get(mask, 0) + count
+    return merged
+
+
+SUMMARY_FIELDS = ['attempts', 'correct_count', 'points_sum', 'answer_counts']
+
+
+def _add_summaries(increments: Dict[Tuple[int, object], Dict]):
+    """把 (题目ID, 日期) -> 计数增量 累加到每日汇总（已有的行锁定后更新，没有的行插入）"""
+    # 按日期分组只读取需要的行（题目ID和日期的交叉组合可能远多于实际需要的行）
+    questions_by_day = {}
+    for question_id, day in increments:
+        questions_by_day.setdefault(day, set()).add(question_id)
+    condition = Q()
+    for day, question_ids in questions_by_day.items():
+        condition |= Q(day=day, question_id__in=question_ids)
+    existing = {
+        (row['question_id'], row['day']): row
+        for row in DailyQuestionSummary.objects.select_for_update().filter(condition).values(
+            'id', 'question_id', 'day', *SUMMARY_FIELDS
+        )
+    }
+    created, updated = [], []
+    for key, increment in increments.items():
+        row = existing.get(key)
+        if row is None:
+            created.append(DailyQuestionSummary(question_id=key[0], day=key[1], **increment))
+            continue
+        row['attempts'] += increment['attempts']
+        row['correct_count'] += increment['correct_count']
+        row['points_sum'] += increment['points_sum']
+        row['answer_counts'] = _merge_counts(row['answer_counts'], increment['answer_counts'])
+        updated.append(row)
+    DailyQuestionSummary.objects.bulk_create(created)
+    _write_summaries(updated)
+
+
+def _write_summaries(rows: List[Dict]):
+    """批量写回汇总行（executemany，一条语句，与 statistics._write_stats 相同的做法）"""
+    if not rows:
+        return
+    meta = DailyQuestionSummary._meta
+    quote_name = connection.ops.quote_name
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        quote_name(meta.db_table),
+        ', '.join(f'{quote_name(meta.get_field(name).column)} = %s' for name in SUMMARY_FIELDS),
+        quote_name(meta.pk.column)
+    )
+    answer_counts = meta.get_field('answer_counts')
+    params = [
+        [row['attempts'], row['correct_count'], row['points_sum'],
+         answer_counts.get_db_prep_save(row['answer_counts'], connection), row['id']]
+        for row in rows
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def compact_answers(cutoff: datetime, chunk_size: int = 2000, archive: Optional[AnswerArchive] = None) -> int:
+    """把提交时间早于 cutoff 的答题记录压缩为每日汇总并删除原始记录，返回压缩的记录数
+
+    按ID顺序分块处理，每块在一个短事务中累加汇总并删除，不会长时间阻塞其他写入；
+    题目统计（QuestionStats）是累计值，不受删除影响。给定 archive 时删除前先写入归档。
+    """
+    answers = UserAnswer.objects.filter(submitted_at__lt=cutoff).order_by('id')
+    compacted = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            rows = list(answers.filter(id__gt=last_id).values_list(
+                'id', 'question_id', 'user_answers', 'is_correct', 'points', 'submitted_at'
+            )[:chunk_size])
+            if not rows:
+                return compacted
+            last_id = rows[-1][0]
+            if archive is not None:
+                archive.write(rows)
+
+            increments = {}
+            current_timezone = timezone.get_current_timezone()
+            masks = encode_answers(row[2] if isinstance(row[2], list) else [] for row in rows).tolist()
+            for (_, question_id, _, is_correct, points, submitted_at), mask in zip(rows, masks):
+                key = (question_id, submitted_at.astimezone(current_timezone).date())
+                increment = increments.setdefault(key, _empty_increment())
+                increment['attempts'] += 1
+                increment['correct_count'] += int(is_correct)
+                increment['points_sum'] += points
+                increment['answer_counts'][str(mask)] = increment['answer_counts'].get(str(mask), 0) + 1
+            _add_summaries(increments)
+
+            answer_ids = [row[0] for row in rows]
+            for start in range(0, len(answer_ids), DELETE_BATCH_SIZE):
+                UserAnswer.objects.filter(id__in=answer_ids[start:start + DELETE_BATCH_SIZE]).delete()
+        compacted += len(rows)
+
+
+def rescore_daily_summaries(question_set_ids: Optional[Iterable[int]] = None, chunk_size: int = 5000) -> int:
+    """按当前答案键和判分策略，从各作答的次数重新计算每日汇总的答对次数和得分之和，返回更新的行数"""
+    summaries = DailyQuestionSummary.objects.order_by('id')
+    if question_set_ids is not None:
+        summaries = summaries.filter(question__question_set_id__in=list(question_set_ids))
+
+    updated = 0
+    last_id = 0
+    while True:
+        chunk = list(summaries.filter(id__gt=last_id).values('id', 'question_id', *SUMMARY_FIELDS)[:chunk_size])
+        if not chunk:
+            return updated
+        last_id = chunk[-1]['id']
+        located = answer_keys.locate({summary['question_id'] for summary in chunk})
+        chunk = [summary for summary in chunk if summary['question_id'] in located]
+
+        # 所有汇总行的各种作答展开成一维数组一次判分，再按汇总行求和
+        rows, masks, counts, key_masks, policies = [], [], [], [], []
+        for row, summary in enumerate(chunk):
+            key, position = located[summary['question_id']]
+            for mask, count in summary['answer_counts'].items():
+                rows.append(row)
+                masks.append(int(mask))
+                counts.append(count)
+                key_masks.append(key.masks[position])
+                policies.append(key.scoring_policy)
+        masks = np.array(masks, dtype=MASK_DTYPE)
+        key_masks = np.array(key_masks, dtype=MASK_DTYPE)
+        counts = np.array(counts, dtype=np.int64)
+        policies = np.array(policies, dtype=object)
+        points = np.zeros(len(masks), dtype=POINTS_DTYPE)
+        for policy in set(policies.tolist()):
+            selected = policies == policy
+            points[selected] = score_points(policy, key_masks[selected], masks[selected])
+        correct_counts = np.bincount(rows, weights=counts * (masks == key_masks), minlength=len(chunk))
+        points_sums = np.bincount(rows, weights=counts * points, minlength=len(chunk))
+
+        changed = []
+        for summary, correct_count, points_sum in zip(chunk, correct_counts.tolist(), points_sums.tolist()):
+            if (summary['correct_count'], summary['points_sum']) != (int(correct_count), points_sum):
+                summary['correct_count'], summary['points_sum'] = int(correct_count), points_sum
+                changed.append(summary)
+        with transaction.atomic():
+            _write_summaries(changed)
+        updated += len(changed)
+
+
+def merge_daily_summaries(question_map: Dict[int, int]):
+    """合并题目集合时把重复题目的每日汇总并入对应题目（同一天的汇总相加），在调用方的事务中执行"""
+    increments = {}
+    for summary in DailyQuestionSummary.objects.filter(question_id__in=list(question_map)):
+        key = (question_map[summary.question_id], summary.day)
+        increment = increments.setdefault(key, _empty_increment())
+        increment['attempts'] += summary.attempts
+        increment['correct_count'] += summary.correct_count
+        increment['points_sum'] += summary.points_sum
+        increment['answer_counts'] = _merge_counts(increment['answer_counts'], summary.answer_counts)
+    if increments:
+        DailyQuestionSummary.objects.filter(question_id__in=list(question_map)).delete()
+        _add_summaries(increments)
@@ -0,0 +1,50 @@
+from typing import Callable, Dict
+
+import numpy as np
+
+from .option_masks import MASK_DTYPE
+
+
+POINTS_DTYPE = np.float64
+
+# 16位位掩码中选中的选项数
+POPCOUNT = np.array([bin(mask).count('1') for mask in range(1 << 16)], dtype=np.uint8)
+
+
+def strict_points(key_masks: np.ndarray, sheets: np.ndarray) -> np.ndarray:
+    """全部选对得1分，否则0分"""
+    return (sheets == key_masks).astype(POINTS_DTYPE)
+
+
+def partial_points(key_masks: np.ndarray, sheets: np.ndarray) -> np.ndarray:
+    """全部选对得1分；只选了正确选项中的一部分时按选中比例得分；选了任何错误选项得0分
+
+    单选题只有一个正确选项，结果与 strict 相同。没有正确选项的题目（答案未解析出）
+    与判断是否答对一致：不选得1分，选了任何选项得0分。
+    """
+    selected = POPCOUNT[sheets]
+    required = POPCOUNT[key_masks]
+    no_wrong_option = (sheets & ~key_masks) == 0
+    fraction = np.where(required > 0, selected / np.maximum(required, 1), 1)
+    return np.where(no_wrong_option, fraction, 0).astype(POINTS_DTYPE)
+
+
+# 判分策略名称 -> 计分函数；函数接收答案键位掩码和形状可广播的答卷位掩码数组，返回每道题的得分
+SCORING_POLICIES: Dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    'strict': strict_points,
+    'partial': partial_points,
+}
+
+
+def get_scoring_policy(name: str) -> Callable[[np.ndarray, np.ndarray], np.ndarray]:
+    try:
+        return SCORING_POLICIES[name]
+    except KeyError:
+        raise ValueError(f"未知的判分策略: {name}")
+
+
+def score_points(policy: str, key_masks, sheets) -> np.ndarray:
+    """按判分策略计算每道题的得分（数组运算，sheets 可以是多份答卷）"""
+    key_masks = np.asarray(key_masks, dtype=MASK_DTYPE)
+    sheets = np.asarray(sheets, dtype=MASK_DTYPE)
+    return get_scoring_policy(policy)(key_masks, sheets)
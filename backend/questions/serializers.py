@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import QuestionSet, Question, UserAnswer
+from .grading import attempt_results
+from .models import QuestionSet, Question, UserAnswer, IngestionJob, ExamAttempt
 
 
 class QuestionSerializer(serializers.ModelSerializer):
@@ -13,12 +14,31 @@ class QuestionSerializer(serializers.ModelSerializer):
 
 
 class QuestionSetSerializer(serializers.ModelSerializer):
-    """题目集合序列化器"""
-    questions = QuestionSerializer(many=True, read_only=True)
+    """题目集合序列化器（别名集合返回其指向集合的题目和判分策略）"""
+    scoring_policy = serializers.CharField(source='canonical.scoring_policy', read_only=True)
+    questions = QuestionSerializer(source='canonical.questions', many=True, read_only=True)
     
     class Meta:
         model = QuestionSet
-        fields = ['id', 'title', 'created_at', 'questions']
+        fields = ['id', 'title', 'alias_of', 'scoring_policy', 'created_at', 'questions']
+
+
+class QuestionSetSummarySerializer(serializers.ModelSerializer):
+    """题目集合摘要序列化器（列表用，只有题目数量，不含题目；数量由视图在查询中标注）"""
+    scoring_policy = serializers.CharField(source='canonical.scoring_policy', read_only=True)
+    question_count = serializers.IntegerField(read_only=True)
+    single_count = serializers.SerializerMethodField()
+    multiple_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = QuestionSet
+        fields = [
+            'id', 'title', 'alias_of', 'scoring_policy', 'created_at',
+            'question_count', 'single_count', 'multiple_count'
+        ]
+
+    def get_single_count(self, question_set):
+        return question_set.question_count - question_set.multiple_count
 
 
 class UserAnswerSerializer(serializers.ModelSerializer):
@@ -27,7 +47,7 @@ class UserAnswerSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = UserAnswer
-        fields = ['id', 'question', 'user_answers', 'is_correct', 'submitted_at']
+        fields = ['id', 'question', 'user_answers', 'is_correct', 'points', 'submitted_at']
 
 
 class FileUploadSerializer(serializers.Serializer):
@@ -40,4 +60,32 @@ class FileUploadSerializer(serializers.Serializer):
 class SubmitAnswerSerializer(serializers.Serializer):
     """提交答案序列化器"""
     question_id = serializers.IntegerField()
-    user_answers = serializers.ListField(child=serializers.CharField()) 
\ No newline at end of file
+    user_answers = serializers.ListField(child=serializers.CharField()) 
+
+class IngestionJobSerializer(serializers.ModelSerializer):
+    """导入任务序列化器"""
+    class Meta:
+        model = IngestionJob
+        fields = [
+            'id', 'title', 'status', 'stage', 'progress', 'stage_timings',
+            'questions_count', 'question_set', 'error', 'attempts',
+            'created_at', 'started_at', 'finished_at'
+        ]
+
+
+class ExamAttemptSummarySerializer(serializers.ModelSerializer):
+    """考试记录摘要序列化器（不含逐题结果）"""
+    class Meta:
+        model = ExamAttempt
+        fields = ['id', 'question_set', 'student', 'scoring_policy', 'score', 'total', 'submitted_at']
+
+
+class ExamAttemptSerializer(ExamAttemptSummarySerializer):
+    """考试记录序列化器（逐题结果从记录中保存的压缩数组解码）"""
+    results = serializers.SerializerMethodField()
+
+    class Meta(ExamAttemptSummarySerializer.Meta):
+        fields = ExamAttemptSummarySerializer.Meta.fields + ['results']
+
+    def get_results(self, attempt):
+        return attempt_results(attempt)
@@ -0,0 +1,295 @@
+import math
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .bulk_writes import insert_many
+from .models import DailyQuestionSummary, ExamAttempt, Question, QuestionSet, QuestionStats, UserAnswer
+from .option_masks import MAX_OPTIONS, encode_answers
+
+OPTION_LETTERS = [chr(ord('A') + index) for index in range(MAX_OPTIONS)]
+
+COUNTER_FIELDS = [
+    'attempts', 'correct_count', 'exam_attempts', 'exam_correct_count',
+    'exam_score_sum', 'exam_score_square_sum', 'exam_correct_score_sum',
+]
+
+
+class StatsAccumulator:
+    """在内存中按题目累加统计增量（数组运算），再一次写入数据库"""
+
+    def __init__(self, question_ids: Iterable[int]):
+        self.question_ids = np.unique(np.fromiter(question_ids, dtype=np.int64))
+        size = len(self.question_ids)
+        self.counters = {
+            field: np.zeros(size, dtype=np.float64 if field.endswith('_sum') else np.int64)
+            for field in COUNTER_FIELDS
+        }
+        self.options = np.zeros((size, MAX_OPTIONS), dtype=np.int64)
+
+    def add(self, question_ids, masks, correct, exam_scores=None):
+        """累加一组作答：题目ID、作答位掩码、是否答对；exam_scores 为每条作答所在考试的总分"""
+        index = np.searchsorted(self.question_ids, np.asarray(question_ids, dtype=np.int64))
+        size = len(self.question_ids)
+        correct = np.asarray(correct, dtype=bool)
+        masks = np.asarray(masks, dtype=np.int64)
+
+        def count(weights=None):
+            return np.bincount(index, weights=weights, minlength=size)
+
+        self.counters['attempts'] += count().astype(np.int64)
+        self.counters['correct_count'] += count(correct).astype(np.int64)
+        for bit in range(MAX_OPTIONS):
+            self.options[:, bit] += count((masks >> bit) & 1).astype(np.int64)
+        if exam_scores is not None:
+            scores = np.broadcast_to(np.asarray(exam_scores, dtype=np.float64), index.shape)
+            self.counters['exam_attempts'] += count().astype(np.int64)
+            self.counters['exam_correct_count'] += count(correct).astype(np.int64)
+            self.counters['exam_score_sum'] += count(scores)
+            self.counters['exam_score_square_sum'] += count(scores * scores)
+            self.counters['exam_correct_score_sum'] += count(scores * correct)
+
+    def add_counts(self, question_ids, attempts, correct_counts, option_counts):
+        """累加已经汇总的计数（每日汇总）：每行的作答次数、答对次数和各选项被选次数 (行数, MAX_OPTIONS)"""
+        index = np.searchsorted(self.question_ids, np.asarray(question_ids, dtype=np.int64))
+        np.add.at(self.counters['attempts'], index, np.asarray(attempts, dtype=np.int64))
+        np.add.at(self.counters['correct_count'], index, np.asarray(correct_counts, dtype=np.int64))
+        np.add.at(self.options, index, np.asarray(option_counts, dtype=np.int64).reshape(len(index), MAX_OPTIONS))
+
+    def _option_counts(self, row: int, existing: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        counts = dict(existing or {})
+        for bit in np.flatnonzero(self.options[row]).tolist():
+            letter = OPTION_LETTERS[bit]
+            counts[letter] = counts.get(letter, 0) + int(self.options[row, bit])
+        return counts
+
+    def apply(self):
+        """把增量累加到数据库中的统计（调用方负责事务，与答题记录的插入在同一事务中）
+
+        锁定已有的统计行（首次作答的题目先创建），在内存中累加后用一条语句批量写回；
+        语句数与题目数无关。按题目ID顺序加锁，并发的两批作答不会互相死锁。
+        """
+        if not len(self.question_ids):
+            return
+        question_ids = self.question_ids.tolist()
+        stats = list(_locked_stats(question_ids))
+        missing = sorted(set(question_ids) - {stat.question_id for stat in stats})
+        if missing:
+            insert_many([QuestionStats(question_id=question_id) for question_id in missing], ignore_conflicts=True)
+            stats += list(_locked_stats(missing))
+
+        rows = {question_id: row for row, question_id in enumerate(question_ids)}
+        for stat in stats:
+            row = rows[stat.question_id]
+            for field in COUNTER_FIELDS:
+                setattr(stat, field, getattr(stat, field) + self.counters[field][row].item())
+            stat.option_counts = self._option_counts(row, stat.option_counts)
+        _write_stats(stats, timezone.now())
+
+    def replace(self):
+        """用累加结果替换数据库中的统计（重新计算时使用）"""
+        question_ids = self.question_ids.tolist()
+        with transaction.atomic():
+            QuestionStats.objects.filter(question_id__in=question_ids).delete()
+            QuestionStats.objects.bulk_create([
+                QuestionStats(
+                    question_id=question_id,
+                    option_counts=self._option_counts(row),
+                    **{field: self.counters[field][row].item() for field in COUNTER_FIELDS}
+                )
+                for row, question_id in enumerate(question_ids)
+            ], batch_size=500)
+
+
+def _locked_stats(question_ids: List[int]):
+    return QuestionStats.objects.select_for_update().filter(question_id__in=question_ids).order_by('question_id')
+
+
+def _write_stats(stats: List[QuestionStats], updated_at):
+    """批量写回统计行（executemany，一条语句；bulk_update 为每行生成 CASE 表达式，行数多时很慢）"""
+    meta = QuestionStats._meta
+    quote_name = connection.ops.quote_name
+    columns = [meta.get_field(name).column for name in COUNTER_FIELDS + ['option_counts', 'updated_at']]
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        quote_name(meta.db_table),
+        ', '.join(f'{quote_name(column)} = %s' for column in columns),
+        quote_name(meta.pk.column)
+    )
+    # 计数列是普通数值，只有JSON列和时间列需要按数据库转换
+    option_counts = meta.get_field('option_counts')
+    updated_at = meta.get_field('updated_at').get_db_prep_save(updated_at, connection)
+    params = [
+        [getattr(stat, field) for field in COUNTER_FIELDS]
+        + [option_counts.get_db_prep_save(stat.option_counts, connection), updated_at, stat.pk]
+        for stat in stats
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def record_user_answers(user_answers: List[UserAnswer]):
+    """答题记录插入后累加统计（在插入的事务中调用）"""
+    if not user_answers:
+        return
+    accumulator = StatsAccumulator(answer.question_id for answer in user_answers)
+    accumulator.add(
+        [answer.question_id for answer in user_answers],
+        encode_answers(answer.user_answers for answer in user_answers),
+        [answer.is_correct for answer in user_answers]
+    )
+    accumulator.apply()
+
+
+def record_answer_arrays(question_ids, masks, correct):
+    """按数组累加一批答题记录的统计（批量判卷时使用，在插入的事务中调用）"""
+    accumulator = StatsAccumulator(question_ids)
+    accumulator.add(question_ids, masks, correct)
+    accumulator.apply()
+
+
+def record_exam_attempt(question_ids, masks, correct, score: float):
+    """考试记录保存后累加统计：卷中每道题都计一次作答（未作答计为答错）"""
+    accumulator = StatsAccumulator(question_ids)
+    accumulator.add(question_ids, masks, correct, exam_scores=score)
+    accumulator.apply()
+
+
+def merge_question_stats(question_map: Dict[int, int]):
+    """合并题目集合时把重复题目的统计累加到对应题目（在调用方的事务中执行）
+
+    与提交作答一样锁定并累加对应题目的统计行，合并期间照常接受提交，不需要重新计算。
+    """
+    stats = list(_locked_stats(list(question_map)))
+    if not stats:
+        return
+    targets = [question_map[stat.question_id] for stat in stats]
+    accumulator = StatsAccumulator(targets)
+    index = np.searchsorted(accumulator.question_ids, np.asarray(targets, dtype=np.int64))
+    for field in COUNTER_FIELDS:
+        np.add.at(accumulator.counters[field], index, [getattr(stat, field) for stat in stats])
+    for row, stat in zip(index.tolist(), stats):
+        for letter, count in (stat.option_counts or {}).items():
+            accumulator.options[row, OPTION_LETTERS.index(letter)] += count
+    accumulator.apply()
+
+
+def answer_count_options(answer_counts: Dict[str, int]) -> np.ndarray:
+    """每日汇总中按作答位掩码的计数换算成各选项被选次数"""
+    options = np.zeros(MAX_OPTIONS, dtype=np.int64)
+    for mask, count in answer_counts.items():
+        mask = int(mask)
+        options += count * ((mask >> np.arange(MAX_OPTIONS)) & 1)
+    return options
+
+
+def rebuild_question_stats(question_set_ids: Optional[Iterable[int]] = None, chunk_size: int = 5000) -> int:
+    """从答题记录、每日汇总和考试记录分块重新计算题目统计，返回统计的题目数
+
+    用于补算（例如升级前已有的记录、重新判分之后）；重新计算期间新提交的作答可能被漏算，
+    应在没有提交时运行。
+    """
+    # 延迟导入：grading 在保存记录时会调用本模块
+    from .grading import decode_attempt_arrays
+
+    questions = Question.objects.all()
+    attempts = ExamAttempt.objects.all()
+    if question_set_ids is not None:
+        # 别名集合的题目统计在其指向的集合上
+        question_set_ids = list({
+            alias_of_id or question_set_id
+            for question_set_id, alias_of_id in QuestionSet.objects.filter(
+                id__in=list(question_set_ids)
+            ).values_list('id', 'alias_of_id')
+        })
+        questions = questions.filter(question_set_id__in=question_set_ids)
+        alias_ids = QuestionSet.objects.filter(alias_of_id__in=question_set_ids).values_list('id', flat=True)
+        attempts = attempts.filter(question_set_id__in=question_set_ids + list(alias_ids))
+    accumulator = StatsAccumulator(questions.values_list('id', flat=True))
+    known = set(accumulator.question_ids.tolist())
+
+    answers = UserAnswer.objects.filter(question_id__in=questions.values('id')).order_by('id')
+    last_id = 0
+    while True:
+        rows = list(answers.filter(id__gt=last_id).values_list('id', 'question_id', 'user_answers', 'is_correct')[:chunk_size])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        accumulator.add(
+            [row[1] for row in rows],
+            encode_answers(row[2] if isinstance(row[2], list) else [] for row in rows),
+            [row[3] for row in rows]
+        )
+
+    # 超过保留期的答题记录已压缩为每日汇总
+    summaries = DailyQuestionSummary.objects.filter(question_id__in=questions.values('id')).order_by('id')
+    last_id = 0
+    while True:
+        rows = list(summaries.filter(id__gt=last_id).values_list(
+            'id', 'question_id', 'attempts', 'correct_count', 'answer_counts'
+        )[:chunk_size])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        accumulator.add_counts(
+            [row[1] for row in rows], [row[2] for row in rows], [row[3] for row in rows],
+            np.array([answer_count_options(row[4]) for row in rows], dtype=np.int64)
+        )
+
+    last_id = 0
+    attempts = attempts.order_by('id')
+    while True:
+        chunk = list(attempts.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        for attempt in chunk:
+            question_ids, masks, correct = decode_attempt_arrays(attempt)
+            present = np.fromiter((question_id in known for question_id in question_ids.tolist()),
+                                  dtype=bool, count=len(question_ids))  # 跳过已删除的题目
+            accumulator.add(question_ids[present], masks[present], correct[present], exam_scores=attempt.score)
+
+    accumulator.replace()
+    return len(accumulator.question_ids)
+
+
+def point_biserial(stat: Dict) -> Optional[float]:
+    """区分度：题目答对与否和考试总分的点二列相关系数（总分包含该题）；样本不足时为None"""
+    n = stat['exam_attempts']
+    n_correct = stat['exam_correct_count']
+    if n < 2 or n_correct in (0, n):
+        return None
+    mean = stat['exam_score_sum'] / n
+    variance = stat['exam_score_square_sum'] / n - mean * mean
+    if variance <= 1e-12:
+        return None
+    mean_correct = stat['exam_correct_score_sum'] / n_correct
+    mean_incorrect = (stat['exam_score_sum'] - stat['exam_correct_score_sum']) / (n - n_correct)
+    p = n_correct / n
+    return (mean_correct - mean_incorrect) / math.sqrt(variance) * math.sqrt(p * (1 - p))
+
+
+def question_set_statistics(question_set: QuestionSet) -> List[Dict]:
+    """题目集合中每道题的统计（一次查询，只读取累计计数，与历史记录的数量无关）"""
+    rows = Question.objects.filter(question_set=question_set.canonical).order_by('question_number').values(
+        'id', 'question_number', 'question_type', 'stats__option_counts',
+        *[f'stats__{field}' for field in COUNTER_FIELDS]
+    )
+    statistics = []
+    for row in rows:
+        stat = {field: row[f'stats__{field}'] or 0 for field in COUNTER_FIELDS}
+        attempts = stat['attempts']
+        discrimination = point_biserial(stat)
+        statistics.append({
+            'question_id': row['id'],
+            'question_number': row['question_number'],
+            'question_type': row['question_type'],
+            'attempts': attempts,
+            'correct_count': stat['correct_count'],
+            'difficulty': round(stat['correct_count'] / attempts, 4) if attempts else None,
+            'option_counts': row['stats__option_counts'] or {},
+            'exam_attempts': stat['exam_attempts'],
+            'discrimination': round(discrimination, 4) if discrimination is not None else None,
+        })
+    return statistics
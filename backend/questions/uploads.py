@@ -0,0 +1,69 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http.multipartparser import MultiPartParser as DjangoMultiPartParser
+from django.http.multipartparser import MultiPartParserError
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+
+def get_upload_temp_dir() -> str:
+    """上传临时目录：默认位于MEDIA_ROOT下，与媒体文件在同一文件系统，保存时只需重命名"""
+    directory = settings.INGESTION_UPLOAD_TEMP_DIR or os.path.join(settings.MEDIA_ROOT, '.uploads')
+    os.makedirs(directory, exist_ok=True)
+    return str(directory)
+
+
+class DiskUploadedFile(TemporaryUploadedFile):
+    """写在上传临时目录中的上传文件，附带接收时计算的SHA-256"""
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(suffix='.upload' + ext, dir=get_upload_temp_dir())
+        # 跳过TemporaryUploadedFile.__init__（它会在FILE_UPLOAD_TEMP_DIR中再建一个临时文件）
+        super(TemporaryUploadedFile, self).__init__(file, name, content_type, size, charset, content_type_extra)
+        self.sha256 = None
+
+
+class DiskUploadHandler(TemporaryFileUploadHandler):
+    """上传内容边接收边写入磁盘，不论大小都不在内存中缓冲整个文件
+
+    接收时同时计算SHA-256，提取文本时用作缓存键，不需要再把文件读一遍。
+    保存到FileField时，存储后端对带 temporary_file_path 的文件直接移动，
+    媒体目录中的文件就是这次写入的文件本身。
+    """
+
+    def new_file(self, *args, **kwargs):
+        super(TemporaryFileUploadHandler, self).new_file(*args, **kwargs)
+        self.file = DiskUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.file.write(raw_data)
+        self.digest.update(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.sha256 = self.digest.hexdigest()
+        return super().file_complete(file_size)
+
+
+class DiskMultiPartParser(MultiPartParser):
+    """multipart解析器：上传文件一律交给 DiskUploadHandler 直接写入磁盘"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context['request']
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        meta = request.META.copy()
+        meta['CONTENT_TYPE'] = media_type
+
+        try:
+            parser = DjangoMultiPartParser(meta, stream, [DiskUploadHandler(request)], encoding)
+            data, files = parser.parse()
+            return DataAndFiles(data, files)
+        except MultiPartParserError as exc:
+            raise ParseError(f'Multipart form parse error - {str(exc)}')
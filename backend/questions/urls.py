@@ -5,12 +5,28 @@ urlpatterns = [
     # 文件上传
     path('upload/', views.FileUploadView.as_view(), name='file_upload'),
     
+    # 导入任务
+    path('ingestion-jobs/', views.IngestionJobListView.as_view(), name='ingestion_job_list'),
+    path('ingestion-jobs/<int:pk>/', views.IngestionJobDetailView.as_view(), name='ingestion_job_detail'),
+    path('ingestion-jobs/<int:pk>/events/', views.ingestion_job_events, name='ingestion_job_events'),
+    
     # 题目集合
     path('question-sets/', views.QuestionSetListView.as_view(), name='question_set_list'),
     path('question-sets/<int:pk>/', views.QuestionSetDetailView.as_view(), name='question_set_detail'),
+    path('question-sets/<int:pk>/statistics/', views.QuestionSetStatisticsView.as_view(), name='question_set_statistics'),
+    
+    # 成绩榜和得分分布
+    path('question-sets/<int:pk>/leaderboard/', views.LeaderboardView.as_view(), name='leaderboard'),
+    path('question-sets/<int:pk>/score-histogram/', views.ScoreHistogramView.as_view(), name='score_histogram'),
+    path('question-sets/<int:pk>/score-percentile/', views.ScorePercentileView.as_view(), name='score_percentile'),
+    
+    # 考试记录
+    path('question-sets/<int:pk>/attempts/', views.ExamAttemptListView.as_view(), name='exam_attempt_list'),
+    path('attempts/<int:pk>/', views.ExamAttemptDetailView.as_view(), name='exam_attempt_detail'),
     
     # 题目详情
     path('questions/<int:question_id>/', views.get_question_detail, name='question_detail'),
+    path('questions/<int:question_id>/answers/', views.get_question_answers, name='question_answers'),
     
     # 答案提交
     path('submit-answer/', views.SubmitAnswerView.as_view(), name='submit_answer'),
@@ -2,86 +2,160 @@ from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from .models import QuestionSet, Question, UserAnswer
+from .answer_keys import get_answer_key
+from .models import QuestionSet, Question, UserAnswer, IngestionJob, ExamAttempt
 from .serializers import (
     QuestionSetSerializer, QuestionSerializer, UserAnswerSerializer,
-    FileUploadSerializer, SubmitAnswerSerializer
+    FileUploadSerializer, SubmitAnswerSerializer, IngestionJobSerializer,
+    ExamAttemptSerializer, ExamAttemptSummarySerializer, QuestionSetSummarySerializer
 )
-from .gemini_parser import GeminiPDFParser as PDFParser
+from .grading import grade_batch, grade_exam
+from .ingestion import enqueue_job, iter_job_events, record_duplicate_upload
+from .leaderboard import get_histogram, histogram_summary, score_percentile, top_scores
+from .pagination import paginate_recent
+from .persistence import content_fingerprint, find_question_set, reuse_question_set
+from .scoring import SCORING_POLICIES
+from .statistics import question_set_statistics
+from .uploads import DiskMultiPartParser
 import json
 
 
 class FileUploadView(APIView):
-    """文件上传和解析视图"""
+    """文件上传视图：保存文件并创建后台导入任务
+
+    上传文件在接收时直接写入媒体目录下的临时文件，保存时移动到最终位置，
+    整个过程只读写一次，不在内存中缓冲。
+    题目和答案文件与已有题目集合内容相同时不保存文件、不解析，直接复用已有集合。
+    """
+    parser_classes = [DiskMultiPartParser]
     
     def post(self, request):
         serializer = FileUploadSerializer(data=request.data)
         if serializer.is_valid():
-            try:
-                # 创建题目集合
-                question_set = QuestionSet.objects.create(
-                    title=serializer.validated_data['title'],
-                    questions_file=serializer.validated_data['questions_file'],
-                    answers_file=serializer.validated_data['answers_file']
-                )
-                
-                # 解析PDF文件
-                parser = PDFParser()
-                
-                # 解析题目文件
-                questions_text = parser.extract_text_from_pdf(
-                    serializer.validated_data['questions_file']
-                )
-                questions = parser.parse_questions(questions_text)
-                
-                # 解析答案文件
-                answers_text = parser.extract_text_from_pdf(
-                    serializer.validated_data['answers_file']
-                )
-                answers = parser.parse_answers(answers_text)
-                
-                # 合并题目和答案
-                merged_questions = parser.merge_questions_and_answers(questions, answers)
-                
-                # 保存题目到数据库
-                for question_data in merged_questions:
-                    Question.objects.create(
-                        question_set=question_set,
-                        question_number=question_data['question_number'],
-                        question_text=question_data['question_text'],
-                        options=question_data['options'],
-                        question_type=question_data['question_type'],
-                        correct_answers=question_data['correct_answers'],
-                        explanation=question_data['explanation']
-                    )
-                
-                return Response({
-                    'message': '文件上传成功',
-                    'question_set_id': question_set.id,
-                    'questions_count': len(merged_questions)
-                }, status=status.HTTP_201_CREATED)
-                
-            except Exception as e:
-                import traceback
-                print(f"错误详情: {str(e)}")
-                print(f"错误堆栈: {traceback.format_exc()}")
+            title = serializer.validated_data['title']
+            questions_file = serializer.validated_data['questions_file']
+            answers_file = serializer.validated_data['answers_file']
+            questions_sha256 = getattr(questions_file, 'sha256', None) or ''
+            answers_sha256 = getattr(answers_file, 'sha256', None) or ''
+
+            existing = find_question_set(content_fingerprint(questions_sha256, answers_sha256))
+            if existing is not None:
+                question_set = reuse_question_set(title, existing)
+                job = record_duplicate_upload(title, question_set, questions_sha256, answers_sha256)
                 return Response({
-                    'error': f'文件解析失败: {str(e)}',
-                    'details': traceback.format_exc()
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                    'message': '题目集合已存在，未重新解析',
+                    'job_id': job.id,
+                    'job': IngestionJobSerializer(job).data,
+                    'duplicate_of': existing.id
+                }, status=status.HTTP_200_OK)
+
+            job = IngestionJob.objects.create(
+                title=title,
+                questions_file=questions_file,
+                answers_file=answers_file,
+                questions_sha256=questions_sha256,
+                answers_sha256=answers_sha256
+            )
+            enqueue_job(job)
+            
+            return Response({
+                'message': '文件上传成功，正在后台解析',
+                'job_id': job.id,
+                'job': IngestionJobSerializer(job).data
+            }, status=status.HTTP_202_ACCEPTED)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class IngestionJobListView(APIView):
+    """导入任务列表视图"""
+    
+    def get(self, request):
+        jobs = IngestionJob.objects.all().order_by('-created_at')
+        job_status = request.query_params.get('status')
+        if job_status:
+            jobs = jobs.filter(status=job_status)
+        serializer = IngestionJobSerializer(jobs[:100], many=True)
+        return Response(serializer.data)
+
+
+class IngestionJobDetailView(APIView):
+    """导入任务状态视图"""
+    
+    def get(self, request, pk):
+        job = get_object_or_404(IngestionJob, pk=pk)
+        serializer = IngestionJobSerializer(job)
+        return Response(serializer.data)
+
+
+def ingestion_job_events(request, pk):
+    """导入任务进度事件流（Server-Sent Events），推送已解析的题目数量
+
+    使用普通Django视图而不是APIView，浏览器EventSource的 Accept: text/event-stream
+    不会经过DRF的内容协商。
+    """
+    get_object_or_404(IngestionJob, pk=pk)
+    response = StreamingHttpResponse(iter_job_events(pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # 禁止反向代理缓冲事件
+    return response
+
+
+def _question_count(canonical_id, **filters) -> Subquery:
+    """相关子查询：集合的题目数（走 (question_set, question_number) 唯一索引，只对本页的集合执行）"""
+    return Subquery(
+        Question.objects.filter(question_set=canonical_id, **filters).order_by()
+        .values('question_set').annotate(count=Count('id')).values('count'),
+        output_field=IntegerField()
+    )
+
+
 class QuestionSetListView(APIView):
-    """题目集合列表视图"""
+    """题目集合列表视图
+
+    默认返回全部集合及其题目；?view=summary 时返回摘要（题目数量，不含题目），
+    按创建时间倒序游标分页（limit 默认20、最多100，cursor 取上一页返回的 next_cursor）。
+    仍在导入中的集合（题目尚未写完）不列出。
+    """
+
+    def _visible(self):
+        return QuestionSet.objects.exclude(ingestion_jobs__status__in=('pending', 'running'))
     
     def get(self, request):
-        question_sets = QuestionSet.objects.all().order_by('-created_at')
+        if request.query_params.get('view') == 'summary':
+            return self._summary(request)
+        # 别名集合的题目来自指向的集合，两者的题目都一次预取
+        question_sets = self._visible().select_related('alias_of').prefetch_related(
+            'questions', 'alias_of__questions'
+        ).order_by('-created_at', '-id')
         serializer = QuestionSetSerializer(question_sets, many=True)
         return Response(serializer.data)
 
+    def _summary(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({'error': 'limit必须是整数'}, status=status.HTTP_400_BAD_REQUEST)
+        canonical_id = Coalesce(OuterRef('alias_of_id'), OuterRef('id'))
+        question_sets = self._visible().select_related('alias_of').only(
+            'id', 'title', 'alias_of_id', 'scoring_policy', 'created_at', 'alias_of__scoring_policy'
+        ).annotate(
+            question_count=Coalesce(_question_count(canonical_id), 0),
+            multiple_count=Coalesce(_question_count(canonical_id, question_type='multiple'), 0),
+        )
+        try:
+            page, next_cursor = paginate_recent(question_sets, request.query_params.get('cursor'), limit)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': QuestionSetSummarySerializer(page, many=True).data,
+            'next_cursor': next_cursor
+        })
+
 
 class QuestionSetDetailView(APIView):
     """题目集合详情视图"""
@@ -91,6 +165,138 @@ class QuestionSetDetailView(APIView):
         serializer = QuestionSetSerializer(question_set)
         return Response(serializer.data)
 
+    def patch(self, request, pk):
+        """修改判分策略；已有记录的得分需要运行 rescore_answers 命令重新计算
+
+        别名集合使用其指向集合的判分策略，不能单独修改。
+        """
+        question_set = get_object_or_404(QuestionSet, pk=pk)
+        scoring_policy = request.data.get('scoring_policy') if hasattr(request.data, 'get') else None
+        if scoring_policy not in SCORING_POLICIES:
+            return Response({
+                'error': f'未知的判分策略: {scoring_policy}，可选: {", ".join(SCORING_POLICIES)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if question_set.alias_of_id is not None:
+            return Response({
+                'error': f'别名集合使用题目集合 {question_set.alias_of_id} 的判分策略，请修改该集合'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        question_set.scoring_policy = scoring_policy
+        question_set.save(update_fields=['scoring_policy'])
+        serializer = QuestionSetSerializer(question_set)
+        return Response(serializer.data)
+
+
+class QuestionSetStatisticsView(APIView):
+    """题目集合统计视图：逐题的作答次数、难度、选项分布和区分度（只读取累计计数）"""
+
+    def get(self, request, pk):
+        question_set = get_object_or_404(QuestionSet.objects.select_related('alias_of'), pk=pk)
+        return Response({
+            'question_set': question_set.id,
+            'questions': question_set_statistics(question_set)
+        })
+
+
+class LeaderboardView(APIView):
+    """成绩榜视图：得分最高的若干次考试（只读取成绩榜）"""
+
+    def get(self, request, pk):
+        question_set = get_object_or_404(QuestionSet.objects.select_related('alias_of'), pk=pk)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 100)
+        except ValueError:
+            return Response({'error': 'limit必须是整数'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'question_set': question_set.id,
+            'results': top_scores(question_set, limit)
+        })
+
+
+class ScoreHistogramView(APIView):
+    """得分分布视图（只读取预先统计的分布）"""
+
+    def get(self, request, pk):
+        question_set = get_object_or_404(QuestionSet.objects.select_related('alias_of'), pk=pk)
+        return Response({
+            'question_set': question_set.id,
+            **histogram_summary(get_histogram(question_set))
+        })
+
+
+class ScorePercentileView(APIView):
+    """百分位视图：某个得分在题目集合所有考试中的百分位等级（只读取预先统计的分布）"""
+
+    def get(self, request, pk):
+        question_set = get_object_or_404(QuestionSet.objects.select_related('alias_of'), pk=pk)
+        try:
+            score = float(request.query_params['score'])
+        except (KeyError, ValueError):
+            return Response({'error': '需要数字参数score'}, status=status.HTTP_400_BAD_REQUEST)
+        histogram = get_histogram(question_set)
+        return Response({
+            'question_set': question_set.id,
+            'score': score,
+            'attempts': histogram.attempts,
+            'percentile': score_percentile(histogram, score)
+        })
+
+
+class ExamAttemptListView(APIView):
+    """考试记录视图：GET 列出题目集合的考试记录，POST 一次提交整套答卷并判分"""
+
+    def get(self, request, pk):
+        """按提交时间倒序游标分页（limit 默认20、最多100，cursor 取上一页返回的 next_cursor）"""
+        question_set = get_object_or_404(QuestionSet, pk=pk)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({'error': 'limit必须是整数'}, status=status.HTTP_400_BAD_REQUEST)
+        attempts = question_set.attempts.only(
+            'id', 'question_set_id', 'student', 'scoring_policy', 'score', 'total', 'submitted_at'
+        )
+        try:
+            page, next_cursor = paginate_recent(attempts, request.query_params.get('cursor'), limit, 'submitted_at')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': ExamAttemptSummarySerializer(page, many=True).data,
+            'next_cursor': next_cursor
+        })
+
+    def post(self, request, pk):
+        question_set = get_object_or_404(QuestionSet.objects.select_related('alias_of'), pk=pk)
+        try:
+            if not hasattr(request.data, 'get'):
+                raise ValueError('请求体必须是包含answers的对象')
+            student = request.data.get('student', '')
+            if not isinstance(student, str) or len(student) > 100:
+                raise ValueError('student必须是不超过100个字符的字符串')
+            attempt = grade_exam(question_set, request.data.get('answers', []), student)
+        except ValueError as e:
+            return Response({
+                'error': f'提交考试失败: {str(e)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # 判分时使用的答案键已在缓存中，附上正确答案和解析不需要再查询
+        key = get_answer_key(question_set.canonical.id)
+        data = ExamAttemptSerializer(attempt).data
+        for result in data['results']:
+            position = key.positions.get(result['question_id'])
+            if position is not None:
+                result['correct_answers'] = key.correct_answers[position]
+                result['explanation'] = key.explanations[position]
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class ExamAttemptDetailView(APIView):
+    """考试记录详情视图（一次查询）"""
+
+    def get(self, request, pk):
+        attempt = get_object_or_404(ExamAttempt, pk=pk)
+        serializer = ExamAttemptSerializer(attempt)
+        return Response(serializer.data)
+
 
 class SubmitAnswerView(APIView):
     """提交答案视图"""
@@ -98,35 +304,22 @@ class SubmitAnswerView(APIView):
     def post(self, request):
         serializer = SubmitAnswerSerializer(data=request.data)
         if serializer.is_valid():
-            question_id = serializer.validated_data['question_id']
-            user_answers = serializer.validated_data['user_answers']
-            
-            try:
-                question = Question.objects.get(id=question_id)
-                
-                # 判断答案是否正确
-                correct_answers = set(question.correct_answers)
-                user_answers_set = set(user_answers)
-                is_correct = correct_answers == user_answers_set
-                
-                # 保存用户答案
-                user_answer = UserAnswer.objects.create(
-                    question=question,
-                    user_answers=user_answers,
-                    is_correct=is_correct
-                )
-                
-                return Response({
-                    'message': '答案提交成功',
-                    'is_correct': is_correct,
-                    'correct_answers': question.correct_answers,
-                    'explanation': question.explanation
-                }, status=status.HTTP_201_CREATED)
-                
-            except Question.DoesNotExist:
+            result = grade_batch([{
+                'question_id': serializer.validated_data['question_id'],
+                'user_answers': serializer.validated_data['user_answers']
+            }])[0]
+            if 'error' in result:
                 return Response({
-                    'error': '题目不存在'
+                    'error': result['error']
                 }, status=status.HTTP_404_NOT_FOUND)
+
+            return Response({
+                'message': '答案提交成功',
+                'is_correct': result['is_correct'],
+                'points': result['points'],
+                'correct_answers': result['correct_answers'],
+                'explanation': result['explanation']
+            }, status=status.HTTP_201_CREATED)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -144,51 +337,37 @@ def get_question_detail(request, question_id):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+@api_view(['GET'])
+def get_question_answers(request, question_id):
+    """题目的作答历史：最近的答题记录，按提交时间倒序（使用 (question, submitted_at) 索引）"""
+    if not Question.objects.filter(id=question_id).exists():
+        return Response({
+            'error': '题目不存在'
+        }, status=status.HTTP_404_NOT_FOUND)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+    except ValueError:
+        return Response({'error': 'limit必须是整数'}, status=status.HTTP_400_BAD_REQUEST)
+    # 只返回作答本身，不像 UserAnswerSerializer 那样为每条记录嵌套整道题目
+    answers = UserAnswer.objects.filter(question_id=question_id).order_by('-submitted_at').values(
+        'id', 'user_answers', 'is_correct', 'points', 'submitted_at'
+    )[:limit]
+    return Response(list(answers))
+
+
 @api_view(['POST'])
 def submit_batch_answers(request):
-    """批量提交答案"""
+    """批量提交答案（一次查询取题、内存判分、一次批量写入）"""
     try:
-        answers_data = request.data.get('answers', [])
-        results = []
-        
-        for answer_data in answers_data:
-            question_id = answer_data.get('question_id')
-            user_answers = answer_data.get('user_answers', [])
-            
-            try:
-                question = Question.objects.get(id=question_id)
-                
-                # 判断答案是否正确
-                correct_answers = set(question.correct_answers)
-                user_answers_set = set(user_answers)
-                is_correct = correct_answers == user_answers_set
-                
-                # 保存用户答案
-                UserAnswer.objects.create(
-                    question=question,
-                    user_answers=user_answers,
-                    is_correct=is_correct
-                )
-                
-                results.append({
-                    'question_id': question_id,
-                    'is_correct': is_correct,
-                    'correct_answers': question.correct_answers,
-                    'explanation': question.explanation
-                })
-                
-            except Question.DoesNotExist:
-                results.append({
-                    'question_id': question_id,
-                    'error': '题目不存在'
-                })
-        
-        return Response({
-            'message': '批量提交完成',
-            'results': results
-        }, status=status.HTTP_200_OK)
-        
-    except Exception as e:
+        if not hasattr(request.data, 'get'):
+            raise ValueError('请求体必须是包含answers的对象')
+        results = grade_batch(request.data.get('answers', []))
+    except ValueError as e:
         return Response({
             'error': f'批量提交失败: {str(e)}'
-        }, status=status.HTTP_400_BAD_REQUEST) 
\ No newline at end of file
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'message': '批量提交完成',
+        'results': results
+    }, status=status.HTTP_200_OK)
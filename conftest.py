@@ -0,0 +1,37 @@
+"""
+pytest配置：测试使用独立的内存数据库和临时媒体目录，避免污染开发数据
+"""
+import os
+import sys
+import tempfile
+import django
+import pytest
+
+# 设置Django环境
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pmp_platform.settings')
+django.setup()
+
+
+@pytest.fixture(scope='session', autouse=True)
+def django_test_database():
+    """创建测试数据库，导入任务在请求内同步执行"""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment, override_settings
+
+    setup_test_environment()
+    media_root = tempfile.TemporaryDirectory()
+    test_settings = override_settings(
+        MEDIA_ROOT=media_root.name,
+        PDF_TEXT_CACHE_DIR=os.path.join(media_root.name, 'cache', 'pdf_text'),
+        GEMINI_CACHE_DIR=os.path.join(media_root.name, 'cache', 'gemini'),
+        GEMINI_MAX_RETRIES=0,
+        INGESTION_EAGER=True
+    )
+    test_settings.enable()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    yield
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+    test_settings.disable()
+    media_root.cleanup()
+    teardown_test_environment()
@@ -2,12 +2,62 @@ import React, { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 
+interface IngestionJob {
+  id: number;
+  status: 'pending' | 'running' | 'succeeded' | 'failed';
+  stage: string;
+  progress: number;
+  questions_count: number;
+  question_set: number | null;
+  error: string;
+  message?: string;
+}
+
 interface UploadResponse {
   message: string;
-  question_set_id: number;
-  questions_count: number;
+  job_id: number;
+  job: IngestionJob;
+  duplicate_of?: number;
 }
 
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const isRunning = (job: IngestionJob) => job.status === 'pending' || job.status === 'running';
+
+// 轮询后台导入任务，直到解析完成或失败（浏览器不支持事件流时使用）
+const pollJob = async (jobId: number, onUpdate: (job: IngestionJob) => void) => {
+  let job = (await axios.get<IngestionJob>(`/api/ingestion-jobs/${jobId}/`)).data;
+  while (isRunning(job)) {
+    onUpdate(job);
+    await sleep(2000);
+    job = (await axios.get<IngestionJob>(`/api/ingestion-jobs/${jobId}/`)).data;
+  }
+  return job;
+};
+
+// 通过事件流接收导入进度（已解析的题目数量），连接失败时退回轮询
+const waitForJob = (jobId: number, onUpdate: (job: IngestionJob) => void) =>
+  new Promise<IngestionJob>((resolve, reject) => {
+    if (typeof EventSource === 'undefined') {
+      pollJob(jobId, onUpdate).then(resolve, reject);
+      return;
+    }
+    const source = new EventSource(`/api/ingestion-jobs/${jobId}/events/`);
+    source.addEventListener('progress', (event) => {
+      onUpdate(JSON.parse((event as MessageEvent).data));
+    });
+    source.addEventListener('end', (event) => {
+      source.close();
+      resolve(JSON.parse((event as MessageEvent).data));
+    });
+    source.onerror = () => {
+      // 服务端超时断开时浏览器会自动重连，只有连接彻底关闭时才改为轮询
+      if (source.readyState === EventSource.CLOSED) {
+        pollJob(jobId, onUpdate).then(resolve, reject);
+      }
+    };
+  });
+
 const Home: React.FC = () => {
   const [title, setTitle] = useState('');
   const [questionsFile, setQuestionsFile] = useState<File | null>(null);
@@ -39,11 +89,29 @@ const Home: React.FC = () => {
         },
       });
 
-      setUploadMessage(`上传成功！解析了 ${response.data.questions_count} 道题目`);
+      // 等待后台导入任务完成，期间显示已解析的题目数量
+      let job = response.data.job;
+      if (isRunning(job)) {
+        setUploadMessage('文件已上传，正在解析...');
+        job = await waitForJob(response.data.job_id, (current) => {
+          setUploadMessage(`文件已上传，正在解析... ${current.progress}%，已解析 ${current.questions_count} 道题目`);
+        });
+      }
+
+      if (job.status === 'failed') {
+        setUploadMessage(`上传失败: 文件解析失败: ${job.error}`);
+        return;
+      }
+
+      setUploadMessage(
+        response.data.duplicate_of
+          ? `上传成功！题目集合已存在，共 ${job.questions_count} 道题目`
+          : `上传成功！解析了 ${job.questions_count} 道题目`
+      );
       
       // 跳转到题目集合详情页
       setTimeout(() => {
-        navigate(`/question-sets/${response.data.question_set_id}`);
+        navigate(`/question-sets/${job.question_set}`);
       }, 2000);
 
     } catch (error: any) {
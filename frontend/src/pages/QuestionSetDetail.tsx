@@ -33,6 +33,7 @@ const QuestionSetDetail: React.FC = () => {
   const [userAnswers, setUserAnswers] = useState<Record<number, string[]>>({});
   const [submitted, setSubmitted] = useState(false);
   const [results, setResults] = useState<Record<number, AnswerResult>>({});
+  const [score, setScore] = useState({ score: 0, total: 0 });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
 
@@ -78,7 +79,7 @@ const QuestionSetDetail: React.FC = () => {
     }));
 
     try {
-      const response = await axios.post('/api/submit-batch-answers/', {
+      const response = await axios.post(`/api/question-sets/${id}/attempts/`, {
         answers
       });
 
@@ -88,6 +89,7 @@ const QuestionSetDetail: React.FC = () => {
       });
 
       setResults(resultsMap);
+      setScore({ score: response.data.score, total: response.data.total });
       setSubmitted(true);
     } catch (error: any) {
       setError('提交答案失败: ' + (error.response?.data?.error || error.message));
@@ -301,9 +303,9 @@ const QuestionSetDetail: React.FC = () => {
             </div>
             <div>
               <p className="text-2xl font-bold text-gray-600">
-                {Math.round((Object.values(results).filter(r => r.is_correct).length / totalQuestions) * 100)}%
+                {score.score} / {score.total}
               </p>
-              <p className="text-sm text-gray-600">正确率</p>
+              <p className="text-sm text-gray-600">得分</p>
             </div>
           </div>
         </div>
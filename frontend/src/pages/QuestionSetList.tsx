@@ -2,37 +2,53 @@ import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import axios from 'axios';
 
-interface QuestionSet {
+interface QuestionSetSummary {
   id: number;
   title: string;
   created_at: string;
-  questions: Question[];
+  question_count: number;
+  single_count: number;
+  multiple_count: number;
 }
 
-interface Question {
-  id: number;
-  question_number: number;
-  question_text: string;
-  question_type: 'single' | 'multiple';
+interface QuestionSetPage {
+  results: QuestionSetSummary[];
+  next_cursor: string | null;
 }
 
+const PAGE_SIZE = 20;
+
 const QuestionSetList: React.FC = () => {
-  const [questionSets, setQuestionSets] = useState<QuestionSet[]>([]);
+  const [questionSets, setQuestionSets] = useState<QuestionSetSummary[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
 
   useEffect(() => {
     fetchQuestionSets();
   }, []);
 
-  const fetchQuestionSets = async () => {
+  // 摘要列表只返回题目数量，按创建时间倒序分页加载
+  const fetchQuestionSets = async (cursor?: string) => {
     try {
-      const response = await axios.get<QuestionSet[]>('/api/question-sets/');
-      setQuestionSets(response.data);
+      const response = await axios.get<QuestionSetPage>('/api/question-sets/', {
+        params: { view: 'summary', limit: PAGE_SIZE, cursor }
+      });
+      setQuestionSets(previous => (cursor ? [...previous, ...response.data.results] : response.data.results));
+      setNextCursor(response.data.next_cursor);
     } catch (error: any) {
       setError('获取题目集合失败: ' + (error.response?.data?.error || error.message));
     } finally {
       setLoading(false);
+      setLoadingMore(false);
+    }
+  };
+
+  const loadMore = () => {
+    if (nextCursor) {
+      setLoadingMore(true);
+      fetchQuestionSets(nextCursor);
     }
   };
 
@@ -91,17 +107,17 @@ const QuestionSetList: React.FC = () => {
                   </p>
                 </div>
                 <span className="bg-primary-100 text-primary-800 text-sm px-3 py-1 rounded-full">
-                  {questionSet.questions.length} 道题
+                  {questionSet.question_count} 道题
                 </span>
               </div>
 
               <div className="flex justify-between items-center">
                 <div className="text-sm text-gray-600">
                   <span className="mr-4">
-                    单选题: {questionSet.questions.filter(q => q.question_type === 'single').length}
+                    单选题: {questionSet.single_count}
                   </span>
                   <span>
-                    多选题: {questionSet.questions.filter(q => q.question_type === 'multiple').length}
+                    多选题: {questionSet.multiple_count}
                   </span>
                 </div>
                 <Link
@@ -113,6 +129,15 @@ const QuestionSetList: React.FC = () => {
               </div>
             </div>
           ))}
+          {nextCursor && (
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="bg-white text-primary-700 border border-primary-200 px-4 py-2 rounded-md hover:bg-primary-50 transition-colors disabled:opacity-50"
+            >
+              {loadingMore ? '加载中...' : '加载更多'}
+            </button>
+          )}
         </div>
       )}
     </div>
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+长文档分片解析测试脚本：按题号边界切分分片，合并时按题号去重
+"""
+import os
+import sys
+import json
+import django
+from unittest import mock
+
+# 设置Django环境
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pmp_platform.settings')
+django.setup()
+
+from django.test import override_settings
+
+from questions.chunking import (
+    QUESTION_BOUNDARY, estimate_tokens, merge_chunk_results, split_into_chunks, split_question_blocks
+)
+from questions.gemini_parser import GeminiPDFParser
+from questions.management.commands._synthetic import build_exam_text
+from questions.question_lexer import parse_question_text
+
+CHUNK_TOKENS = 300
+
+
+def test_chunks_split_on_question_boundaries():
+    """分片只在题号行切开：拼接后与原文一致，每个分片以题号开头，每道题只出现在一个分片中"""
+    text = '第一部分 单选题\n' + build_exam_text(40, seed=3)
+    chunks = split_into_chunks(text, CHUNK_TOKENS)
+
+    print(f"分片数: {len(chunks)}, 各分片token: {[estimate_tokens(chunk) for chunk in chunks]}")
+    assert len(chunks) > 3
+    assert ''.join(chunks) == text
+    assert all(QUESTION_BOUNDARY.match(chunk) for chunk in chunks[1:])
+    # 单道题超出预算时独占一个分片，不会被拆开
+    assert all(estimate_tokens(chunk) <= CHUNK_TOKENS or len(split_question_blocks(chunk)) == 1 for chunk in chunks)
+
+    numbers = [question['question_number'] for chunk in chunks for question in parse_question_text(chunk)]
+    assert numbers == list(range(1, 41))
+
+
+def test_merge_keeps_most_complete_duplicate():
+    """相邻分片在边界处重复返回同一题时只保留信息最完整的一条，题号统一为整数并排序"""
+    complete = {'question_number': 5, 'question_text': '第5题', 'options': {'A': '是', 'B': '否'},
+                'correct_answers': ['A'], 'explanation': '解析'}
+    truncated = {'question_number': '5', 'question_text': '第5题', 'options': {'A': '是'}}
+    merged = merge_chunk_results([
+        [{'question_number': 4, 'question_text': '第4题'}, truncated],
+        [complete, {'question_number': '6', 'question_text': '第6题'}],
+        [{'question_text': '没有题号'}, 'not a question'],
+        None,
+    ])
+
+    assert [question.get('question_number') for question in merged] == [4, 5, 6, None]
+    assert merged[1] is complete
+
+
+def test_chunked_parse_dedupes_boundary_questions():
+    """分片并发解析：模型在分片末尾重复输出下一分片首题的残缺版本，合并结果与整篇解析一致"""
+    text = build_exam_text(30, seed=5)
+    chunks = split_into_chunks(text, CHUNK_TOKENS)
+    expected = parse_question_text(text)
+
+    def fake_api(parser, prompt, use_cache=None):
+        index = next(index for index, chunk in enumerate(chunks) if chunk in prompt)
+        questions = parse_question_text(chunks[index])
+        if index + 1 < len(chunks):
+            following = parse_question_text(chunks[index + 1])[0]
+            questions.append({'question_number': following['question_number'],
+                              'question_text': following['question_text']})
+        return json.dumps(questions, ensure_ascii=False)
+
+    with override_settings(GEMINI_CHUNK_TOKENS=CHUNK_TOKENS, GEMINI_MAX_CONCURRENCY=3), \
+            mock.patch.object(GeminiPDFParser, 'call_gemini_api', fake_api):
+        questions = GeminiPDFParser(use_cache=False).parse_with_gemini(text)
+
+    print(f"分片数: {len(chunks)}, 合并后题目数: {len(questions)}")
+    assert len(chunks) > 3
+    assert questions == expected
+
+
+if __name__ == '__main__':
+    test_chunks_split_on_question_boundaries()
+    test_merge_keeps_most_complete_duplicate()
+    test_chunked_parse_dedupes_boundary_questions()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+磁盘缓存测试脚本
+"""
+import os
+import sys
+import tempfile
+import time
+import django
+from concurrent.futures import ThreadPoolExecutor
+
+# 设置Django环境
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pmp_platform.settings')
+django.setup()
+
+from questions.disk_cache import DiskCache
+
+
+def test_concurrent_writes_to_same_key():
+    """多个线程同时写入同一个键都成功，缓存目录中不残留临时文件"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DiskCache(directory, max_bytes=10 * 1024 * 1024)
+        values = [bytes([index]) * 200000 for index in range(16)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda value: cache.set('ab' * 32, value), values))
+
+        assert cache.get('ab' * 32) in values
+        assert os.listdir(os.path.join(directory, 'ab')) == ['ab' * 32]
+
+
+def test_hit_and_ttl_expiry():
+    """有效期内命中并累计节省的字节数，过期后按未命中处理并删除数据文件"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DiskCache(directory, max_bytes=1024, ttl=0.2)
+        cache.set('cd' * 32, b'response')
+        assert cache.get('cd' * 32, saved_bytes=100) == b'response'
+
+        time.sleep(0.3)
+        assert cache.get('cd' * 32) is None
+        stats = cache.stats()
+        print(f"缓存统计: {stats}")
+        assert stats['hits'] == 1 and stats['misses'] == 1 and stats['expired'] == 1
+        assert stats['bytes_saved'] == 100
+        assert stats['entries'] == 0
+        assert not os.path.exists(os.path.join(directory, 'cd', 'cd' * 32))
+
+
+def test_lru_eviction():
+    """超出容量时淘汰最近最少访问的条目，刚读取过的条目保留"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DiskCache(directory, max_bytes=300)
+        keys = [f'{index:02d}' * 32 for index in range(4)]
+        for key in keys[:3]:
+            cache.set(key, b'x' * 100)
+        assert cache.get(keys[0]) is not None
+
+        cache.set(keys[3], b'x' * 100)
+        stats = cache.stats()
+        print(f"缓存统计: {stats}")
+        assert cache.get(keys[1]) is None
+        assert all(cache.get(key) is not None for key in (keys[0], keys[2], keys[3]))
+        assert stats['evictions'] == 1 and stats['total_size'] == 300
+        assert not os.path.exists(os.path.join(directory, keys[1][:2], keys[1]))
+
+        # 超过容量上限的单个值不写入
+        cache.set('ff' * 32, b'x' * 301)
+        assert cache.get('ff' * 32) is None
+
+
+if __name__ == '__main__':
+    test_concurrent_writes_to_same_key()
+    test_hit_and_ttl_expiry()
+    test_lru_eviction()
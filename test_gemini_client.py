@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""
+Gemini客户端测试脚本（使用本地HTTP桩服务器，不访问真实API）
+"""
+import os
+import sys
+import json
+import threading
+import time
+import django
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 设置Django环境
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pmp_platform.settings')
+django.setup()
+
+from questions.gemini_client import GeminiAPIError, GeminiClient, RateLimiter, TokenBucket
+
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    """按预设状态码序列依次响应的Gemini桩服务"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server.requests.append(json.loads(body))
+        server.connections.add(self.client_address)
+
+        status = server.statuses.pop(0) if server.statuses else 200
+        if status == 200:
+            payload = json.dumps({
+                'candidates': [{'content': {'parts': [{'text': '[]'}]}}]
+            }).encode('utf-8')
+        else:
+            payload = json.dumps({'error': {'code': status}}).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(statuses):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubGeminiHandler)
+    server.statuses = list(statuses)
+    server.requests = []
+    server.connections = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}/v1beta/models/test:generateContent'
+
+
+def make_client(**kwargs):
+    options = dict(max_retries=3, backoff_base=0.01, backoff_max=0.05, timeout=5)
+    options.update(kwargs)
+    return GeminiClient('test-key', RateLimiter(6000, 10 ** 7), **options)
+
+
+def test_retries_retryable_status_codes():
+    """429/503 之后重试成功"""
+    server, url = start_stub_server([429, 503])
+    try:
+        result = make_client().generate_content(url, {'contents': []})
+        print(f"请求次数: {len(server.requests)}")
+        assert result['candidates'][0]['content']['parts'][0]['text'] == '[]'
+        assert len(server.requests) == 3
+    finally:
+        server.shutdown()
+
+
+def test_gives_up_after_max_retries():
+    """超过最大重试次数后抛出GeminiAPIError"""
+    server, url = start_stub_server([503] * 10)
+    try:
+        try:
+            make_client(max_retries=2).generate_content(url, {'contents': []})
+        except GeminiAPIError as e:
+            assert e.status_code == 503
+        else:
+            raise AssertionError('应当抛出GeminiAPIError')
+        assert len(server.requests) == 3
+    finally:
+        server.shutdown()
+
+
+def test_non_retryable_status_fails_fast():
+    """400等不可重试的错误不重试"""
+    server, url = start_stub_server([400])
+    try:
+        try:
+            make_client().generate_content(url, {'contents': []})
+        except GeminiAPIError as e:
+            assert e.status_code == 400
+        assert len(server.requests) == 1
+    finally:
+        server.shutdown()
+
+
+def test_reuses_keep_alive_connection():
+    """多次请求复用同一个TCP连接"""
+    server, url = start_stub_server([])
+    try:
+        client = make_client()
+        for _ in range(5):
+            client.generate_content(url, {'contents': []})
+        print(f"连接数: {len(server.connections)}")
+        assert len(server.requests) == 5
+        assert len(server.connections) == 1
+    finally:
+        server.shutdown()
+
+
+def test_token_bucket_limits_rate():
+    """令牌耗尽后按速率等待"""
+    bucket = TokenBucket(rate_per_minute=600, capacity=1)  # 每秒10个
+    started = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    elapsed = time.monotonic() - started
+    print(f"取4个令牌耗时: {elapsed:.2f}s")
+    assert elapsed >= 0.25
+
+
+if __name__ == '__main__':
+    test_retries_retryable_status_codes()
+    test_gives_up_after_max_retries()
+    test_non_retryable_status_fails_fast()
+    test_reuses_keep_alive_connection()
+    test_token_bucket_limits_rate()
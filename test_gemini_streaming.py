@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+"""
+Gemini流式生成测试脚本（使用本地SSE桩服务器，不访问真实API）
+"""
+import os
+import sys
+import json
+import hashlib
+import tempfile
+import threading
+import time
+import django
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 设置Django环境
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pmp_platform.settings')
+django.setup()
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from questions.gemini_parser import GeminiPDFParser, get_response_cache
+from questions.ingestion import recover_unfinished_jobs, run_job
+from questions.management.commands._synthetic import build_synthetic_pdf
+from questions.models import IngestionJob, Question, QuestionSet
+from questions.pdf_extraction import get_text_cache
+from questions.persistence import content_fingerprint, find_question_set
+from questions.views import ingestion_job_events
+
+QUESTIONS = [
+    {
+        'question_number': number,
+        'question_text': f'第{number}题：项目章程由哪个过程组制定？',
+        'options': {'A': '启动', 'B': '规划', 'C': '执行', 'D': '监控'},
+        'question_type': 'single',
+        'correct_answers': ['A'],
+        'explanation': '项目章程在启动过程组中制定。'
+    }
+    for number in range(1, 6)
+]
+FRAGMENT_DELAY = 0.2
+
+
+class StubStreamingHandler(BaseHTTPRequestHandler):
+    """把JSON响应切成小片段，以SSE事件逐个发送的Gemini桩服务"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.paths.append(self.path)
+
+        text = json.dumps(QUESTIONS, ensure_ascii=False, indent=2)
+        size = len(text) // 10 + 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for start in range(0, len(text), size):
+            event = {'candidates': [{'content': {'parts': [{'text': text[start:start + size]}]}}]}
+            self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\r\n\r\n".encode('utf-8'))
+            self.wfile.flush()
+            time.sleep(FRAGMENT_DELAY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubStreamingHandler)
+    server.paths = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}/v1beta/models/test'
+
+
+class stub_gemini:
+    """启动桩服务器，并临时把Gemini地址和API密钥指向它"""
+
+    def __enter__(self):
+        self.server, model_url = start_stub_server()
+        self.old_key = os.environ.get('GEMINI_API_KEY')
+        os.environ['GEMINI_API_KEY'] = 'test-key'
+        self.settings = override_settings(GEMINI_MODEL_URL=model_url, GEMINI_STREAMING=True)
+        self.settings.enable()
+        return self.server
+
+    def __exit__(self, *exc_info):
+        self.settings.disable()
+        if self.old_key is None:
+            os.environ.pop('GEMINI_API_KEY', None)
+        else:
+            os.environ['GEMINI_API_KEY'] = self.old_key
+        self.server.shutdown()
+        return False
+
+
+def test_questions_arrive_before_stream_ends():
+    """流式响应中每个题目对象一完整就回调，不等待整个响应"""
+    with stub_gemini() as server:
+        parser = GeminiPDFParser(use_cache=False)
+        arrivals = []
+        started = time.perf_counter()
+        questions = parser.parse_questions(
+            '1. 项目章程由哪个过程组制定？\nA. 启动\n',
+            on_question=lambda question: arrivals.append((time.perf_counter() - started, question))
+        )
+        total = time.perf_counter() - started
+
+    first_arrival = arrivals[0][0]
+    print(f"首题到达: {first_arrival:.2f}s, 全部完成: {total:.2f}s")
+    assert server.paths[0].startswith('/v1beta/models/test:streamGenerateContent?alt=sse')
+    assert questions == QUESTIONS
+    assert arrivals[0][1] == QUESTIONS[0]
+    assert first_arrival < total - 3 * FRAGMENT_DELAY
+
+
+def test_pipeline_saves_questions_incrementally():
+    """导入流水线边解析边保存，记录首题耗时，事件流推送题目数量"""
+    pdf = build_synthetic_pdf(1, 12)
+    job = IngestionJob.objects.create(
+        title='流式导入',
+        questions_file=SimpleUploadedFile('questions.pdf', pdf, content_type='application/pdf'),
+        answers_file=SimpleUploadedFile('answers.pdf', pdf, content_type='application/pdf')
+    )
+    with stub_gemini():
+        run_job(job.pk)
+
+    job.refresh_from_db()
+    print(f"任务状态: {job.status}, 阶段耗时: {job.stage_timings}")
+    assert job.status == 'succeeded', job.error
+    assert job.questions_count == len(QUESTIONS)
+    assert job.question_set.questions.count() == len(QUESTIONS)
+    assert job.stage_timings['time_to_first_question'] < (
+        job.stage_timings['extract_answers'] + job.stage_timings['parse_answers']
+        + job.stage_timings['extract_questions'] + job.stage_timings['parse_questions']
+    )
+
+    response = ingestion_job_events(RequestFactory().get(f'/api/ingestion-jobs/{job.pk}/events/'), job.pk)
+    body = b''.join(response.streaming_content).decode('utf-8')
+    print(body)
+    assert response['Content-Type'] == 'text/event-stream'
+    assert body.startswith('event: end\n')
+    assert json.loads(body.split('data: ', 1)[1])['questions_count'] == len(QUESTIONS)
+
+
+def test_interrupted_job_retry_discards_partial_set():
+    """worker中断后重试的任务删除上次写入了一部分的集合；导入完成前集合没有内容指纹，不会被重复上传复用"""
+    questions_pdf = build_synthetic_pdf(2, 9)
+    answers_pdf = build_synthetic_pdf(2, 10)
+    fingerprint = content_fingerprint(hashlib.sha256(questions_pdf).hexdigest(), hashlib.sha256(answers_pdf).hexdigest())
+    partial = QuestionSet.objects.create(title='中断的导入')
+    Question.objects.create(
+        question_set=partial, question_number=1, question_text='只写入了一道题', options={'A': '是'},
+        question_type='single', correct_answers=['A']
+    )
+    job = IngestionJob.objects.create(
+        title='中断的导入',
+        questions_file=SimpleUploadedFile('questions.pdf', questions_pdf, content_type='application/pdf'),
+        answers_file=SimpleUploadedFile('answers.pdf', answers_pdf, content_type='application/pdf'),
+        questions_sha256=hashlib.sha256(questions_pdf).hexdigest(),
+        answers_sha256=hashlib.sha256(answers_pdf).hexdigest(),
+        question_set=partial, status='running', attempts=1,
+        heartbeat_at=timezone.now() - timedelta(seconds=settings.INGESTION_JOB_LEASE_SECONDS + 1)
+    )
+    assert find_question_set(fingerprint) is None
+
+    assert job.pk in recover_unfinished_jobs()
+    with stub_gemini():
+        run_job(job.pk)
+
+    job.refresh_from_db()
+    assert job.status == 'succeeded', job.error
+    assert job.attempts == 2
+    assert not QuestionSet.objects.filter(pk=partial.pk).exists()
+    assert job.question_set.content_fingerprint == fingerprint
+    assert find_question_set(fingerprint) == job.question_set
+
+
+def test_reingesting_same_pdfs_makes_no_api_calls():
+    """再次导入内容相同的PDF时，文本提取和Gemini响应都从缓存读取，不发出HTTP请求"""
+    questions_pdf = build_synthetic_pdf(2, 11)
+    answers_pdf = build_synthetic_pdf(2, 13)
+
+    def ingest(title):
+        job = IngestionJob.objects.create(
+            title=title,
+            questions_file=SimpleUploadedFile('questions.pdf', questions_pdf, content_type='application/pdf'),
+            answers_file=SimpleUploadedFile('answers.pdf', answers_pdf, content_type='application/pdf')
+        )
+        run_job(job.pk)
+        job.refresh_from_db()
+        assert job.status == 'succeeded', job.error
+        return job
+
+    with tempfile.TemporaryDirectory() as directory, override_settings(
+        GEMINI_CACHE_DIR=os.path.join(directory, 'gemini'),
+        PDF_TEXT_CACHE_DIR=os.path.join(directory, 'pdf_text')
+    ), stub_gemini() as server:
+        first = ingest('缓存导入')
+        requests_made = len(server.paths)
+        again = ingest('缓存导入（再次）')
+        gemini_stats = get_response_cache().stats()
+        text_stats = get_text_cache().stats()
+
+    print(f"首次请求数: {requests_made}, Gemini缓存: {gemini_stats}, 文本缓存: {text_stats}")
+    assert requests_made > 0
+    assert len(server.paths) == requests_made
+    assert gemini_stats['hits'] == requests_made
+    assert text_stats['hits'] == 2
+    assert again.questions_count == first.questions_count == len(QUESTIONS)
+
+
+if __name__ == '__main__':
+    test_questions_arrive_before_stream_ends()
+    test_pipeline_saves_questions_incrementally()
+    test_interrupted_job_retry_discards_partial_set()
+    test_reingesting_same_pdfs_makes_no_api_calls()
@@ -0,0 +1,558 @@
+#!/usr/bin/env python
+"""
+批量判分测试脚本
+"""
+import os
+import sys
+import csv
+import gzip
+import json
+import sqlite3
+import subprocess
+import tempfile
+import django
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+
+# 设置Django环境
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pmp_platform.settings')
+django.setup()
+
+import numpy as np
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from questions.answer_buffer import get_answer_buffer
+from questions.answer_keys import answer_keys, encode_answers, get_answer_key, option_mask
+from questions.grading import grade_exam, grade_sheets, score_sheets
+from questions.management.commands._synthetic import build_parsed_questions
+from questions.models import DailyQuestionSummary, ExamAttempt, QuestionSet, QuestionStats, UserAnswer
+from questions.persistence import save_question_set
+from questions.scoring import score_points
+from questions.views import (
+    ExamAttemptDetailView, ExamAttemptListView, LeaderboardView, QuestionSetDetailView, QuestionSetStatisticsView,
+    ScoreHistogramView, ScorePercentileView, SubmitAnswerView, submit_batch_answers
+)
+
+
+def create_question_set(count):
+    return save_question_set('判分测试', 'questions/grading.pdf', 'answers/grading.pdf', build_parsed_questions(count))
+
+
+def submit(answers):
+    request = APIRequestFactory().post('/api/submit-batch-answers/', {'answers': answers}, format='json')
+    return submit_batch_answers(request)
+
+
+def test_batch_grading_query_count():
+    """批量提交的查询数与答案数量无关：一次取题、一次插入、统计的读取和写回各一次（首次作答时另加创建统计行）"""
+    question_set = create_question_set(1000)
+    questions = list(question_set.questions.all())
+    query_counts = {}
+    for size in (50, 200, 1000):
+        answers = [
+            {'question_id': question.id, 'user_answers': question.correct_answers if index % 3 else ['A', 'B', 'C', 'D']}
+            for index, question in enumerate(questions[:size])
+        ]
+        saved_before = UserAnswer.objects.count()
+        answer_keys.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = submit(answers)
+        query_counts[size] = len(queries)
+
+        assert response.status_code == 200
+        assert UserAnswer.objects.count() == saved_before + size
+        results = response.data['results']
+        assert [result['question_id'] for result in results] == [answer['question_id'] for answer in answers]
+        assert [result['is_correct'] for result in results] == [
+            set(question.correct_answers) == set(answer['user_answers'])
+            for question, answer in zip(questions, answers)
+        ]
+
+    # 答案键已缓存、统计行已存在时不再查询题目，只有插入和统计的读取、写回
+    with CaptureQueriesContext(connection) as queries:
+        submit(answers)
+    query_counts['cached'] = len(queries)
+
+    print(f"查询数: {query_counts}")
+    assert query_counts[50] == query_counts[200] == query_counts[1000] <= 8  # 含首次作答时创建统计行
+    assert query_counts['cached'] == 5
+    stats = QuestionStats.objects.filter(question__question_set=question_set)
+    assert stats.count() == 1000
+    assert sum(stats.values_list('attempts', flat=True)) == 50 + 200 + 1000 + 1000
+
+
+def test_batch_grading_reports_missing_questions():
+    """不存在的题目逐条返回错误，其余答案照常判分；格式错误的请求返回400且不写入"""
+    question = create_question_set(1).questions.get()
+    saved_before = UserAnswer.objects.count()
+    response = submit([
+        {'question_id': question.id, 'user_answers': question.correct_answers},
+        {'question_id': 999999, 'user_answers': ['A']},
+    ])
+    assert response.data['results'][1] == {'question_id': 999999, 'error': '题目不存在'}
+    assert response.data['results'][0]['is_correct'] is True
+    assert UserAnswer.objects.count() == saved_before + 1
+
+    response = submit([
+        {'question_id': question.id, 'user_answers': ['A']},
+        {'question_id': 'abc', 'user_answers': ['A']},
+    ])
+    assert response.status_code == 400
+    assert UserAnswer.objects.count() == saved_before + 1
+
+
+def test_vectorized_grading_matches_set_comparison():
+    """位掩码数组判卷的结果与逐题集合比较一致"""
+    question_set = create_question_set(50)
+    key = get_answer_key(question_set.id)
+    rng = np.random.default_rng(0)
+    sheets = rng.integers(0, 16, size=(500, len(key)), dtype=np.uint16)
+    sheets[:, ::7] = key.masks[::7]  # 保证有答对的题目
+
+    def letters(mask):
+        return [option for bit, option in enumerate('ABCD') if mask >> bit & 1]
+
+    expected = [
+        [set(letters(mask)) == set(correct) for mask, correct in zip(sheet.tolist(), key.correct_answers)]
+        for sheet in sheets
+    ]
+    assert grade_sheets(key, sheets).tolist() == expected
+    assert score_sheets(key, sheets).tolist() == [sum(row) for row in expected]
+    assert option_mask(['B', 'A', 'A']) == 3
+    sheet = key.encode_sheet({1: key.correct_answers[0], 2: ['a']})
+    assert grade_sheets(key, sheet)[:2].tolist() == [True, False]
+
+
+def test_answer_key_invalidated_when_question_changes():
+    """修改题目后缓存的答案键失效，下一次判分使用新答案"""
+    question = create_question_set(3).questions.get(question_number=1)
+    question.correct_answers = ['A']
+    question.save()
+    assert submit([{'question_id': question.id, 'user_answers': ['A']}]).data['results'][0]['is_correct'] is True
+
+    question.correct_answers = ['B', 'D']
+    question.save()
+    result = submit([{'question_id': question.id, 'user_answers': ['D', 'B']}]).data['results'][0]
+    assert result['is_correct'] is True
+    assert result['correct_answers'] == ['B', 'D']
+
+
+def submit_one(question_id, user_answers):
+    request = APIRequestFactory().post(
+        '/api/submit-answer/', {'question_id': question_id, 'user_answers': user_answers}, format='json'
+    )
+    try:
+        return SubmitAnswerView.as_view()(request)
+    finally:
+        connections.close_all()
+
+
+def test_write_behind_keeps_every_answer():
+    """写后缓冲模式：并发提交立即返回，记录在退出前一直在缓冲区中，关闭时全部写入"""
+    question_ids = list(create_question_set(20).questions.values_list('id', flat=True))
+    answer_keys.locate(question_ids)  # 预热答案键缓存，并发提交时不需要查询题目
+    saved_before = UserAnswer.objects.count()
+    started = timezone.now()
+    with override_settings(ANSWER_WRITE_BEHIND=True, ANSWER_BUFFER_MAX_SIZE=10 ** 6,
+                           ANSWER_BUFFER_FLUSH_INTERVAL=3600):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(
+                lambda index: submit_one(question_ids[index % 20], ['A']), range(200)
+            ))
+        assert all(response.status_code == 201 for response in responses)
+        assert UserAnswer.objects.count() == saved_before
+        assert get_answer_buffer().pending_count() == 200
+
+        flushed_at = timezone.now()
+        get_answer_buffer().shutdown()
+        assert get_answer_buffer().pending_count() == 0
+
+    saved = UserAnswer.objects.order_by('-id')[:200]
+    assert UserAnswer.objects.count() == saved_before + 200
+    assert all(started <= answer.submitted_at <= flushed_at for answer in saved)
+
+
+def test_write_behind_sets_aside_rejected_answers():
+    """写后缓冲中指向已删除题目的记录被拆出并转存，不阻塞同一批中的其他记录"""
+    question_set = create_question_set(10)
+    question_ids = list(question_set.questions.values_list('id', flat=True))
+    answer_keys.locate(question_ids)
+    saved_before = UserAnswer.objects.count()
+    with tempfile.TemporaryDirectory() as directory:
+        rejected_file = os.path.join(directory, 'rejected_answers.jsonl')
+        with override_settings(ANSWER_WRITE_BEHIND=True, ANSWER_BUFFER_MAX_SIZE=10 ** 6,
+                               ANSWER_BUFFER_FLUSH_INTERVAL=3600, ANSWER_BUFFER_REJECTED_FILE=rejected_file):
+            for index in range(100):
+                assert submit_one(question_ids[index % 10], ['A']).status_code == 201
+            # 题目在记录写入前被删除（例如合并重复集合），其10条记录无法写入
+            question_set.questions.filter(id=question_ids[3]).delete()
+            get_answer_buffer().shutdown()
+            assert get_answer_buffer().pending_count() == 0
+
+        with open(rejected_file, encoding='utf-8') as rejected:
+            rejected_rows = [json.loads(line) for line in rejected]
+    assert UserAnswer.objects.count() == saved_before + 90
+    assert len(rejected_rows) == 10
+    assert {row['question_id'] for row in rejected_rows} == {question_ids[3]}
+
+
+def test_exam_attempt_round_trip():
+    """整套答卷一次提交：返回总分和逐题结果，读取考试记录只需一次查询"""
+    question_set = create_question_set(30)
+    questions = list(question_set.questions.order_by('question_number'))
+    answers = [
+        {'question_id': question.id, 'user_answers': question.correct_answers if index % 4 else ['E']}
+        for index, question in enumerate(questions[:25])
+    ]
+    factory = APIRequestFactory()
+    saved_before = UserAnswer.objects.count()
+    with CaptureQueriesContext(connection) as queries:
+        response = ExamAttemptListView.as_view()(
+            factory.post(f'/api/question-sets/{question_set.id}/attempts/', {'answers': answers}, format='json'),
+            pk=question_set.id
+        )
+    assert response.status_code == 201, response.data
+    print(f"提交查询数: {len(queries)}")
+    expected_score = sum(1 for index in range(25) if index % 4)
+    assert (response.data['score'], response.data['total']) == (expected_score, 30)
+    assert [result['question_number'] for result in response.data['results']] == list(range(1, 31))
+    assert response.data['results'][1]['correct_answers'] == questions[1].correct_answers
+    assert response.data['results'][29]['user_answers'] == [] and not response.data['results'][29]['is_correct']
+    assert UserAnswer.objects.count() == saved_before
+
+    with CaptureQueriesContext(connection) as queries:
+        detail = ExamAttemptDetailView.as_view()(
+            factory.get(f'/api/attempts/{response.data["id"]}/'), pk=response.data['id']
+        )
+    assert len(queries) == 1
+    assert detail.data['score'] == expected_score
+    assert [
+        {field: result[field] for field in ('question_id', 'user_answers', 'is_correct')}
+        for result in detail.data['results'][:25]
+    ] == [
+        {'question_id': question.id, 'user_answers': answer['user_answers'],
+         'is_correct': answer['user_answers'] == question.correct_answers}
+        for question, answer in zip(questions, answers)
+    ]
+
+    # 其他集合的题目或重复作答返回400，不写入记录
+    attempts_before = ExamAttempt.objects.count()
+    other = create_question_set(1).questions.get()
+    for invalid in ([{'question_id': other.id, 'user_answers': ['A']}], answers[:1] * 2):
+        response = ExamAttemptListView.as_view()(
+            factory.post(f'/api/question-sets/{question_set.id}/attempts/', {'answers': invalid}, format='json'),
+            pk=question_set.id
+        )
+        assert response.status_code == 400
+    assert ExamAttempt.objects.count() == attempts_before
+
+    # 考试记录列表按提交时间倒序游标分页
+    for _ in range(4):
+        grade_exam(question_set, answers[:3])
+    listed, cursor = [], None
+    while True:
+        params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+        page = ExamAttemptListView.as_view()(factory.get('/', params), pk=question_set.id).data
+        assert len(page['results']) <= 2
+        listed += [attempt['id'] for attempt in page['results']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert listed == list(question_set.attempts.order_by('-submitted_at', '-id').values_list('id', flat=True))
+    assert len(listed) == 5
+
+
+def test_partial_credit_policy_and_rescore():
+    """部分得分策略：少选按比例得分、错选0分；修改策略后批量重算历史记录"""
+    question_set = create_question_set(40)
+    multiple = [question for question in question_set.questions.order_by('question_number')
+                if len(question.correct_answers) > 1]
+    assert len(multiple) >= 3
+    sheets = [
+        (multiple[0], multiple[0].correct_answers[:1]),  # 少选
+        (multiple[1], multiple[1].correct_answers),  # 全对
+        (multiple[2], multiple[2].correct_answers + [next(o for o in 'ABCD' if o not in multiple[2].correct_answers)]),
+    ]
+    answers = [{'question_id': question.id, 'user_answers': options} for question, options in sheets]
+    strict_results = submit(answers).data['results']
+    assert [result['points'] for result in strict_results] == [0, 1, 0]
+    attempt = grade_exam(question_set, answers)
+    assert attempt.score == 1
+
+    response = QuestionSetDetailView.as_view()(
+        APIRequestFactory().patch(f'/api/question-sets/{question_set.id}/', {'scoring_policy': 'partial'}, format='json'),
+        pk=question_set.id
+    )
+    assert response.data['scoring_policy'] == 'partial'
+    expected = [1 / len(multiple[0].correct_answers), 1, 0]
+    partial_results = submit(answers).data['results']
+    assert [result['points'] for result in partial_results] == expected
+    assert [result['is_correct'] for result in partial_results] == [False, True, False]
+
+    # 历史记录按新策略分块重算
+    call_command('rescore_answers', '--question-set', str(question_set.id), '--chunk-size', '2', stdout=StringIO())
+    rescored = UserAnswer.objects.filter(question__question_set=question_set).order_by('id')
+    assert [answer.points for answer in rescored] == expected * 2
+    attempt.refresh_from_db()
+    assert (attempt.scoring_policy, attempt.score) == ('partial', sum(expected))
+
+    response = QuestionSetDetailView.as_view()(
+        APIRequestFactory().patch(f'/api/question-sets/{question_set.id}/', {'scoring_policy': 'lenient'}, format='json'),
+        pk=question_set.id
+    )
+    assert response.status_code == 400
+
+    # 别名集合与单题判分一样使用指向集合的策略，不能单独修改
+    alias = QuestionSet.objects.create(title='判分测试（别名）', alias_of=question_set, scoring_policy='strict')
+    alias_attempt = grade_exam(alias, answers)
+    assert (alias_attempt.scoring_policy, alias_attempt.score) == ('partial', sum(expected))
+    response = QuestionSetDetailView.as_view()(
+        APIRequestFactory().patch(f'/api/question-sets/{alias.id}/', {'scoring_policy': 'strict'}, format='json'),
+        pk=alias.id
+    )
+    assert response.status_code == 400
+    assert QuestionSetDetailView.as_view()(APIRequestFactory().get('/'), pk=alias.id).data['scoring_policy'] == 'partial'
+
+    # 没有正确选项的题目：得分与是否答对一致
+    for policy in ('strict', 'partial'):
+        assert score_points(policy, [0, 0], [0, option_mask(['A'])]).tolist() == [1, 0]
+
+
+def test_grade_answer_sheets_command():
+    """离线批量判卷：CSV和JSONL答卷用进程池判分，报告与逐题判分一致，可选写入答题记录"""
+    question_set = create_question_set(12)
+    key = get_answer_key(question_set.id)
+    rng = np.random.default_rng(1)
+    sheets = rng.integers(0, 16, size=(300, len(key)), dtype=np.uint16)
+    sheets[::2] = key.masks  # 一半答卷全对
+    letters = [''.join(option for bit, option in enumerate('ABCD') if mask >> bit & 1) for mask in range(16)]
+    expected = score_sheets(key, sheets).tolist()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_path = os.path.join(temp_dir, 'sheets.csv')
+        with open(csv_path, 'w', encoding='utf-8') as sheet_file:
+            sheet_file.write('student,' + ','.join(map(str, key.question_numbers.tolist())) + '\n')
+            for index, sheet in enumerate(sheets.tolist()):
+                sheet_file.write(f's{index},' + ','.join(letters[mask] for mask in sheet) + '\n')
+        jsonl_path = os.path.join(temp_dir, 'sheets.jsonl')
+        with open(jsonl_path, 'w', encoding='utf-8') as sheet_file:
+            for index, sheet in enumerate(sheets.tolist()):
+                answers = {str(number): list(letters[mask]) for number, mask in zip(key.question_numbers.tolist(), sheet)}
+                sheet_file.write(json.dumps({'student': f's{index}', 'answers': answers}) + '\n')
+            sheet_file.write('{"student": "broken", "answers": {"99": "A"}}\n')
+
+        saved_before = UserAnswer.objects.count()
+        output = StringIO()
+        report_path = os.path.join(temp_dir, 'report.jsonl')
+        call_command('grade_answer_sheets', str(question_set.id), csv_path, '--output', report_path,
+                     '--workers', '2', '--chunk-size', '64', '--save', stdout=output)
+        print(output.getvalue().strip())
+        with open(report_path, encoding='utf-8') as report_file:
+            report = [json.loads(line) for line in report_file]
+        assert [row['student'] for row in report] == [f's{index}' for index in range(300)]
+        assert [row['correct'] for row in report] == expected
+        assert UserAnswer.objects.count() == saved_before + int(np.count_nonzero(sheets))
+
+        report_path = os.path.join(temp_dir, 'report.csv')
+        call_command('grade_answer_sheets', str(question_set.id), jsonl_path, '--output', report_path,
+                     '--workers', '1', '--chunk-size', '64', stdout=StringIO())
+        with open(report_path, encoding='utf-8') as report_file:
+            report = list(csv.DictReader(report_file))
+        assert [int(row['correct']) for row in report[:300]] == expected
+        assert report[300]['line'] == '301' and '99' in report[300]['error']
+
+
+def test_question_statistics():
+    """题目统计随答题记录和考试记录在同一事务中累加，与从历史记录重新计算的结果一致，读取查询数固定"""
+    question_set = create_question_set(6)
+    questions = list(question_set.questions.order_by('question_number'))
+    first = questions[0]
+    wrong = next(option for option in 'ABCD' if option not in first.correct_answers)
+    submit([{'question_id': first.id, 'user_answers': first.correct_answers},
+            {'question_id': first.id, 'user_answers': [wrong]}])
+    for answered in range(1, 7):  # 第k份答卷答对前k题
+        grade_exam(question_set, [
+            {'question_id': question.id, 'user_answers': question.correct_answers} for question in questions[:answered]
+        ])
+
+    def fetch():
+        request = APIRequestFactory().get(f'/api/question-sets/{question_set.id}/statistics/')
+        with CaptureQueriesContext(connection) as queries:
+            response = QuestionSetStatisticsView.as_view()(request, pk=question_set.id)
+        return response.data['questions'], len(queries)
+
+    statistics, query_count = fetch()
+    first_stats = statistics[0]
+    assert (first_stats['attempts'], first_stats['correct_count'], first_stats['exam_attempts']) == (8, 7, 6)
+    assert first_stats['option_counts'][wrong] == 1
+    assert all(first_stats['option_counts'][option] == 7 for option in first.correct_answers)
+    assert first_stats['discrimination'] is None  # 所有考试都答对了第1题
+    assert statistics[3]['difficulty'] == 0.5 and statistics[3]['discrimination'] > 0.5
+
+    # 历史记录增加后读取统计的查询数不变；重新计算的结果与增量累加一致
+    submit([{'question_id': question.id, 'user_answers': ['A']} for question in questions] * 20)
+    statistics, more_query_count = fetch()
+    assert more_query_count == query_count == 2
+    call_command('rebuild_question_stats', '--question-set', str(question_set.id), stdout=StringIO())
+    assert fetch()[0] == statistics
+
+
+def test_leaderboard_and_score_distribution():
+    """成绩榜和得分分布随考试记录在同一事务中更新，读取查询数与考试次数无关，重新生成的结果一致"""
+    question_set = create_question_set(5)
+    questions = list(question_set.questions.order_by('question_number'))
+
+    def take_exam(student, answered):  # 答对前 answered 题
+        return grade_exam(question_set, [
+            {'question_id': question.id, 'user_answers': question.correct_answers} for question in questions[:answered]
+        ], student)
+
+    for student, answered in [('甲', 3), ('乙', 5), ('丙', 1), ('丁', 5), ('戊', 3)]:
+        take_exam(student, answered)
+
+    def fetch(view, **params):
+        request = APIRequestFactory().get(f'/api/question-sets/{question_set.id}/', params)
+        with CaptureQueriesContext(connection) as queries:
+            response = view.as_view()(request, pk=question_set.id)
+        return response, len(queries)
+
+    leaderboard, leaderboard_queries = fetch(LeaderboardView, limit=3)
+    assert [(row['rank'], row['student'], row['score']) for row in leaderboard.data['results']] == [
+        (1, '乙', 5.0), (2, '丁', 5.0), (3, '甲', 3.0)
+    ]
+    histogram, histogram_queries = fetch(ScoreHistogramView)
+    assert histogram.data['attempts'] == 5 and histogram.data['mean'] == 3.4
+    assert [bucket['count'] for bucket in histogram.data['buckets']] == [0, 1, 0, 2, 0, 2]
+    percentile, percentile_queries = fetch(ScorePercentileView, score=3)
+    assert percentile.data['percentile'] == 40.0  # 1次低于3分，2次同为3分
+    assert fetch(ScorePercentileView)[0].status_code == 400
+
+    # 考试次数增加后读取的查询数不变；从考试记录重新生成的结果与增量更新一致
+    for index in range(30):
+        take_exam(f'考生{index}', index % 6)
+    assert fetch(LeaderboardView, limit=3)[1] == leaderboard_queries == 2
+    assert fetch(ScoreHistogramView)[1] == histogram_queries == 2
+    assert fetch(ScorePercentileView, score=3)[1] == percentile_queries == 2
+
+    # 通过别名集合提交的考试计入原集合的成绩榜和分布，别名集合返回同样的数据
+    alias = QuestionSet.objects.create(title='判分测试（别名）', alias_of=question_set)
+    grade_exam(alias, [{'question_id': questions[0].id, 'user_answers': questions[0].correct_answers}], '己')
+    before = (fetch(LeaderboardView, limit=100)[0].data, fetch(ScoreHistogramView)[0].data)
+    alias_request = APIRequestFactory().get(f'/api/question-sets/{alias.id}/leaderboard/', {'limit': 100})
+    assert LeaderboardView.as_view()(alias_request, pk=alias.id).data['results'] == before[0]['results']
+    assert before[1]['attempts'] == 36
+
+    call_command('rebuild_leaderboard', '--question-set', str(alias.id), stdout=StringIO())
+    assert (fetch(LeaderboardView, limit=100)[0].data, fetch(ScoreHistogramView)[0].data) == before
+    assert len(before[0]['results']) == 36
+
+
+def test_answer_compaction_keeps_statistics():
+    """超过保留期的答题记录压缩为每日汇总并归档：题目统计、重新计算和重新判分的结果不变"""
+    question_set = create_question_set(6)
+    questions = list(question_set.questions.order_by('question_number'))
+    answers = [
+        {'question_id': question.id, 'user_answers': options}
+        for question in questions
+        for options in (question.correct_answers, question.correct_answers[:1], ['D'], ['A', 'B'])
+    ]
+    submit(answers)
+    answer_ids = list(UserAnswer.objects.filter(question__question_set=question_set).order_by('id').values_list('id', flat=True))
+    old_ids = answer_ids[::2]
+    UserAnswer.objects.filter(id__in=old_ids).update(submitted_at=timezone.now() - timedelta(days=40))
+
+    def fetch():
+        request = APIRequestFactory().get(f'/api/question-sets/{question_set.id}/statistics/')
+        return QuestionSetStatisticsView.as_view()(request, pk=question_set.id).data['questions']
+
+    before = fetch()
+    with tempfile.TemporaryDirectory() as archive_dir, override_settings(ANSWER_ARCHIVE_DIR=archive_dir):
+        call_command('compact_answers', '--days', '30', '--chunk-size', '5', stdout=StringIO())
+        archives = os.listdir(archive_dir)
+        with gzip.open(os.path.join(archive_dir, archives[0]), 'rt', encoding='utf-8') as archive:
+            archived = [json.loads(line) for line in archive]
+
+    assert len(archives) == 1 and sorted(row['id'] for row in archived) == old_ids
+    remaining = UserAnswer.objects.filter(question__question_set=question_set)
+    assert sorted(remaining.values_list('id', flat=True)) == answer_ids[1::2]
+    summaries = DailyQuestionSummary.objects.filter(question__question_set=question_set)
+    assert sum(summaries.values_list('attempts', flat=True)) == len(old_ids)
+    assert fetch() == before
+    call_command('rebuild_question_stats', '--question-set', str(question_set.id), stdout=StringIO())
+    assert fetch() == before
+
+    # 改为部分得分后，压缩前后的记录按同一规则重新计分
+    call_command('rescore_answers', '--question-set', str(question_set.id), '--policy', 'partial', stdout=StringIO())
+    key = get_answer_key(question_set.id)
+    positions = [key.positions[answer['question_id']] for answer in answers]
+    expected = score_points('partial', key.masks[positions], encode_answers(answer['user_answers'] for answer in answers))
+    total = sum(remaining.values_list('points', flat=True)) + sum(summaries.values_list('points_sum', flat=True))
+    assert abs(total - float(expected.sum())) < 1e-9
+    assert sum(row['correct_count'] for row in fetch()) == int(np.count_nonzero(
+        encode_answers(answer['user_answers'] for answer in answers) == key.masks[positions]
+    ))
+
+
+SHUTDOWN_SCRIPT = '''
+import os, sys
+sys.path.insert(0, {backend_dir!r})
+os.environ['DJANGO_SETTINGS_MODULE'] = 'pmp_platform.settings'
+os.environ['ANSWER_WRITE_BEHIND'] = 'true'
+from django.conf import settings
+from django.core.management import call_command
+settings.DATABASES['default']['NAME'] = {database!r}
+settings.ANSWER_BUFFER_MAX_SIZE = 10 ** 6
+settings.ANSWER_BUFFER_FLUSH_INTERVAL = 3600
+import django
+django.setup()
+from django.core.management import call_command
+call_command('migrate', verbosity=0)
+from questions.grading import grade_batch
+from questions.management.commands._synthetic import build_parsed_questions
+from questions.models import UserAnswer
+from questions.persistence import save_question_set
+question_set = save_question_set('退出测试', 'questions/exit.pdf', 'answers/exit.pdf', build_parsed_questions(20))
+question_ids = list(question_set.questions.values_list('id', flat=True))
+for _ in range(10):
+    grade_batch([{{'question_id': question_id, 'user_answers': ['A']}} for question_id in question_ids])
+print(UserAnswer.objects.count())
+'''
+
+
+def test_write_behind_flushes_at_interpreter_exit():
+    """进程正常退出时（atexit）缓冲区中的答题记录全部写入数据库"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        database = os.path.join(temp_dir, 'shutdown.sqlite3')
+        script = SHUTDOWN_SCRIPT.format(backend_dir=str(settings.BASE_DIR), database=database)
+        output = subprocess.run(
+            [sys.executable, '-c', script], capture_output=True, text=True, check=True
+        ).stdout
+        with sqlite3.connect(database) as conn:
+            saved = conn.execute('SELECT COUNT(*) FROM questions_useranswer').fetchone()[0]
+
+    print(f"退出前已写入: {output.strip()}, 退出后: {saved}")
+    assert output.strip().splitlines()[-1] == '0'
+    assert saved == 200
+
+
+if __name__ == '__main__':
+    test_batch_grading_query_count()
+    test_batch_grading_reports_missing_questions()
+    test_vectorized_grading_matches_set_comparison()
+    test_answer_key_invalidated_when_question_changes()
+    test_write_behind_keeps_every_answer()
+    test_write_behind_sets_aside_rejected_answers()
+    test_exam_attempt_round_trip()
+    test_partial_credit_policy_and_rescore()
+    test_grade_answer_sheets_command()
+    test_question_statistics()
+    test_leaderboard_and_score_distribution()
+    test_answer_compaction_keeps_statistics()
+    test_write_behind_flushes_at_interpreter_exit()
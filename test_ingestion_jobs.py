@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+后台导入任务测试脚本：心跳超时的任务在重启后重新排队并被worker池领取
+"""
+import os
+import sys
+import django
+from datetime import timedelta
+
+# 设置Django环境
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pmp_platform.settings')
+django.setup()
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+
+from questions.ingestion import IngestionWorkerPool, claim_job, recover_unfinished_jobs
+from questions.management.commands._synthetic import build_synthetic_pdf
+from questions.models import IngestionJob
+from test_gemini_streaming import QUESTIONS, stub_gemini
+
+
+def create_running_job(title, heartbeat_age, attempts=1):
+    """创建一个运行中的任务，心跳停在 heartbeat_age 秒之前"""
+    pdf = build_synthetic_pdf(1, 12)
+    return IngestionJob.objects.create(
+        title=title,
+        questions_file=SimpleUploadedFile('questions.pdf', pdf, content_type='application/pdf'),
+        answers_file=SimpleUploadedFile('answers.pdf', pdf, content_type='application/pdf'),
+        status='running', attempts=attempts,
+        heartbeat_at=timezone.now() - timedelta(seconds=heartbeat_age)
+    )
+
+
+def test_stale_job_is_requeued_and_claimed_once():
+    """心跳超时的任务重新排队且只能被领取一次；心跳正常的不动，超过重试次数的标记失败"""
+    lease = settings.INGESTION_JOB_LEASE_SECONDS
+    stale = create_running_job('心跳超时', lease + 1)
+    alive = create_running_job('仍在运行', 1)
+    exhausted = create_running_job('多次中断', lease + 1, attempts=settings.INGESTION_MAX_ATTEMPTS)
+
+    pending = recover_unfinished_jobs()
+    for job in (stale, alive, exhausted):
+        job.refresh_from_db()
+    print(f"重新排队: {pending}")
+    assert stale.pk in pending and stale.status == 'pending'
+    assert alive.pk not in pending and alive.status == 'running'
+    assert exhausted.pk not in pending and exhausted.status == 'failed'
+    assert not exhausted.questions_file
+
+    claimed = claim_job(stale.pk)
+    assert claimed is not None and claimed.status == 'running' and claimed.attempts == 2
+    assert claim_job(stale.pk) is None
+
+
+def test_worker_pool_restart_resumes_stale_job():
+    """进程重启后新的worker池接管心跳超时的任务并完成导入"""
+    job = create_running_job('重启后接管', settings.INGESTION_JOB_LEASE_SECONDS + 1)
+    pool = IngestionWorkerPool(1)
+    with stub_gemini():
+        pool.start()
+        pool.shutdown(wait=True)
+
+    job.refresh_from_db()
+    print(f"任务状态: {job.status}, 执行次数: {job.attempts}")
+    assert job.status == 'succeeded', job.error
+    assert job.attempts == 2
+    assert job.question_set.questions.count() == len(QUESTIONS)
+
+
+if __name__ == '__main__':
+    test_stale_job_is_requeued_and_claimed_once()
+    test_worker_pool_restart_resumes_stale_job()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""
+JSON恢复测试脚本：从格式错误或被截断的Gemini响应中取出完整的题目对象
+"""
+import os
+import sys
+import django
+
+# 设置Django环境
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pmp_platform.settings')
+django.setup()
+
+from questions.json_recovery import recover_json_objects
+
+
+def test_recovers_valid_objects_from_malformed_response():
+    """单个对象格式错误或响应被截断时，保留其余完整的题目对象"""
+    response = (
+        '```json\n['
+        '{"question_number": 1, "question_text": "含{括号}的题干", "options": {"A": "甲"}},'
+        '{"question_number": 2, "question_text": "未转义"引号"},'
+        '{question_number: 3, "question_text": "键名缺少引号",},'
+        '{"question_number": 4, "question_text": "被截'
+    )
+    questions, rejected = recover_json_objects(response)
+    print(f"保留: {[q['question_number'] for q in questions]}, 跳过: {rejected}")
+    assert [q['question_number'] for q in questions] == [1, 3]
+    assert questions[0]['options'] == {'A': '甲'}
+    assert len(rejected) == 2
+
+
+def test_unpacks_wrapped_question_list():
+    """{"questions": [...]} 包裹的题目列表逐个取出，尾随逗号修复后保留"""
+    response = '{"questions": [{"question_number": 1, "question_text": "甲"}, {"question_number": 2, "question_text": "乙",}]}'
+    questions, rejected = recover_json_objects(response)
+    assert [q['question_number'] for q in questions] == [1, 2]
+    assert rejected == []
+
+
+if __name__ == '__main__':
+    test_recovers_valid_objects_from_malformed_response()
+    test_unpacks_wrapped_question_list()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+PDF逐页提取测试脚本：单页回退PyPDF2，进程池按页区间提取后保持原始页序，按文件内容缓存提取结果
+"""
+import io
+import os
+import sys
+import tempfile
+import django
+from unittest import mock
+
+# 设置Django环境
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pmp_platform.settings')
+django.setup()
+
+import PyPDF2
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from pdfplumber.page import Page
+
+from questions import pdf_extraction
+from questions.management.commands._synthetic import build_synthetic_pdf
+
+
+def test_single_page_falls_back_to_pypdf2():
+    """pdfplumber只在第2页失败时，仅该页使用PyPDF2的结果，其余页不受影响"""
+    pdf = build_synthetic_pdf(3, 2)
+    plumber_pages = list(pdf_extraction.iter_pdf_pages(io.BytesIO(pdf)))
+    pypdf2_pages = [page.extract_text() for page in PyPDF2.PdfReader(io.BytesIO(pdf)).pages]
+    # 两个库对同一页的输出略有差别（PyPDF2保留行尾换行），可以区分每页来自哪个库
+    assert plumber_pages != pypdf2_pages
+
+    original = Page.extract_text
+
+    def flaky_extract_text(page, *args, **kwargs):
+        if page.page_number == 2:
+            raise ValueError('模拟的页面解析失败')
+        return original(page, *args, **kwargs)
+
+    with mock.patch.object(Page, 'extract_text', flaky_extract_text):
+        pages = list(pdf_extraction.iter_pdf_pages(io.BytesIO(pdf)))
+
+    print(f"各页来源: {['PyPDF2' if page == pypdf2_pages[index] else 'pdfplumber' for index, page in enumerate(pages)]}")
+    assert pages == [plumber_pages[0], pypdf2_pages[1], plumber_pages[2]]
+
+
+def test_parallel_extraction_keeps_page_order():
+    """页数足够时分成多个页区间交给进程池，拼接结果与串行提取逐页一致"""
+    pdf = build_synthetic_pdf(13, 6)
+    serial_pages = list(pdf_extraction._iter_page_range(pdf, 0, 13))
+
+    with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf_file:
+        pdf_file.write(pdf)
+        pdf_file.flush()
+        with override_settings(PDF_EXTRACT_WORKERS=2, PDF_EXTRACT_MIN_PARALLEL_PAGES=2,
+                               PDF_EXTRACT_MIN_PAGES_PER_TASK=1):
+            ranges = pdf_extraction._page_ranges(13, 2)
+            pdf_extraction._reset_process_pool()
+            try:
+                parallel_pages = list(pdf_extraction.iter_pdf_pages(pdf_file.name))
+                assert pdf_extraction._process_pool is not None, '应使用进程池提取'
+            finally:
+                pdf_extraction._reset_process_pool()
+
+    print(f"页区间: {ranges}")
+    assert len(ranges) > 2
+    assert parallel_pages == serial_pages
+    assert [page.split('.', 1)[0] for page in parallel_pages] == [str(number) for number in range(1, 14)]
+
+
+def test_text_cache_is_keyed_by_content():
+    """相同内容的文件（文件名不同）第二次提取直接命中缓存，不再解析PDF；内容不同则重新提取"""
+    pdf = build_synthetic_pdf(2, 6)
+    with tempfile.TemporaryDirectory() as directory, override_settings(PDF_TEXT_CACHE_DIR=directory):
+        first = pdf_extraction.extract_text(SimpleUploadedFile('a.pdf', pdf))
+        with mock.patch.object(pdf_extraction, 'iter_pdf_pages', side_effect=AssertionError('应命中缓存')):
+            again = pdf_extraction.extract_text(SimpleUploadedFile('b.pdf', pdf))
+        other = pdf_extraction.extract_text(SimpleUploadedFile('a.pdf', build_synthetic_pdf(3, 6)))
+        stats = pdf_extraction.get_text_cache().stats()
+
+    print(f"缓存统计: {stats}")
+    assert again == first
+    assert other != first
+    assert stats['hits'] == 1 and stats['misses'] == 2 and stats['entries'] == 2
+    assert stats['bytes_saved'] == len(pdf)
+
+
+if __name__ == '__main__':
+    test_single_page_falls_back_to_pypdf2()
+    test_parallel_extraction_keeps_page_order()
+    test_text_cache_is_keyed_by_content()
@@ -66,5 +66,36 @@ def test_pdf_parser():
         print(f"解析: {answer['explanation']}")
         print("-" * 30)
 
+def test_continuation_lines():
+    """题干和解析的跨行内容被拼接，选项之后、解析之前的内容被忽略"""
+    parser = PDFParser()
+    questions = parser.parse_questions("""
+    3. 某项目进度落后，
+    发起人要求压缩工期，项目经理应当：
+    A. 赶工
+    B. 快速跟进
+    页眉内容
+    答案：A
+    解析：赶工通过增加资源压缩工期，
+    但会增加成本。
+    """)
+    assert len(questions) == 1
+    question = questions[0]
+    print(f"题干: {question['question_text']}")
+    print(f"解析: {question['explanation']}")
+    assert question['question_text'] == '某项目进度落后， 发起人要求压缩工期，项目经理应当：'
+    assert question['options'] == {'A': '赶工', 'B': '快速跟进'}
+    assert question['correct_answers'] == ['A']
+    assert question['explanation'] == '赶工通过增加资源压缩工期， 但会增加成本。'
+
+    # 题目文件和答案文件共用同一套词法规则
+    from questions.gemini_parser import GeminiPDFParser
+    gemini_parser = GeminiPDFParser(use_cache=False)
+    assert gemini_parser.parse_with_regex("1. 题目\nA. 甲\n答案：AB\n")[0]['question_type'] == 'multiple'
+    assert parser.parse_answers("5、答案：C\n解析：略\n") == {
+        5: {'question_number': 5, 'correct_answers': ['C'], 'explanation': '略'}
+    }
+
 if __name__ == '__main__':
-    test_pdf_parser() 
\ No newline at end of file
+    test_pdf_parser()
+    test_continuation_lines() 
\ No newline at end of file
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+查询计划测试：主要接口的查询都走索引（EXPLAIN QUERY PLAN 中没有全表扫描和临时排序），列表的查询数固定
+"""
+import os
+import sys
+import django
+
+# 设置Django环境
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pmp_platform.settings')
+django.setup()
+
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from questions.grading import grade_batch, grade_exam
+from questions.management.commands._synthetic import build_parsed_questions
+from questions.models import Question, QuestionSet
+from questions.persistence import save_question_set
+from questions import views
+
+
+def query_plans(call):
+    """执行 call，返回其中每条 SELECT 的（SQL，查询计划各步骤）"""
+    with CaptureQueriesContext(connection) as queries:
+        call()
+    plans = []
+    with connection.cursor() as cursor:
+        for query in queries.captured_queries:
+            if query['sql'].lstrip().upper().startswith('SELECT'):
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append((query['sql'], [row[3] for row in cursor.fetchall()]))
+    return plans
+
+
+def assert_indexed(name, call):
+    plans = query_plans(call)
+    assert plans, f'{name} 没有执行查询'
+    for sql, steps in plans:
+        for step in steps:
+            assert not step.startswith('SCAN') and 'TEMP B-TREE' not in step, f'{name}: {step}\n{sql}'
+    print(f"{name}: {len(plans)} 条查询均使用索引")
+
+
+def test_hot_endpoints_use_indexes():
+    """题目集合详情、答案键、统计、考试记录、成绩榜和作答历史的查询都走索引"""
+    question_set = save_question_set('查询计划测试', 'questions/plan.pdf', 'answers/plan.pdf', build_parsed_questions(30))
+    questions = list(question_set.questions.all())
+    answers = [{'question_id': question.id, 'user_answers': question.correct_answers} for question in questions]
+    grade_batch(answers)
+    attempt = grade_exam(question_set, answers[:10], '甲')
+    factory = APIRequestFactory()
+    pk = question_set.id
+
+    def get(view, path, **kwargs):
+        response = view(factory.get(path), **kwargs)
+        assert response.status_code == 200, response.data
+        return response
+
+    assert_indexed('题目集合详情', lambda: get(views.QuestionSetDetailView.as_view(), '/', pk=pk))
+    assert_indexed('题目统计', lambda: get(views.QuestionSetStatisticsView.as_view(), '/', pk=pk))
+    assert_indexed('考试记录列表', lambda: get(views.ExamAttemptListView.as_view(), '/', pk=pk))
+    grade_exam(question_set, answers[:5], '乙')
+    attempts_page = get(views.ExamAttemptListView.as_view(), '/?limit=1', pk=pk)
+    assert_indexed('考试记录列表翻页', lambda: get(
+        views.ExamAttemptListView.as_view(), f"/?limit=1&cursor={attempts_page.data['next_cursor']}", pk=pk
+    ))
+    assert_indexed('考试记录详情', lambda: get(views.ExamAttemptDetailView.as_view(), '/', pk=attempt.id))
+    assert_indexed('成绩榜', lambda: get(views.LeaderboardView.as_view(), '/', pk=pk))
+    assert_indexed('得分分布', lambda: get(views.ScoreHistogramView.as_view(), '/', pk=pk))
+    assert_indexed('作答历史', lambda: get(views.get_question_answers, '/', question_id=questions[0].id))
+    assert_indexed('题目详情', lambda: get(views.get_question_detail, '/', question_id=questions[0].id))
+    assert_indexed('批量判分', lambda: grade_batch(answers))
+    first_page = get(views.QuestionSetListView.as_view(), '/?view=summary&limit=1')
+    assert_indexed('题目集合列表翻页', lambda: get(
+        views.QuestionSetListView.as_view(), f"/?view=summary&limit=1&cursor={first_page.data['next_cursor']}"
+    ))
+
+
+def test_question_set_listing_query_count():
+    """题目集合列表的查询数与集合数量无关；摘要分页按创建时间倒序不重不漏"""
+    factory = APIRequestFactory()
+    view = views.QuestionSetListView.as_view()
+
+    def count_queries(path):
+        with CaptureQueriesContext(connection) as queries:
+            response = view(factory.get(path))
+        assert response.status_code == 200, response.data
+        return len(queries.captured_queries)
+
+    def add_question_sets(count):
+        for index in range(count):
+            question_set = save_question_set(f'列表测试{index}', 'questions/list.pdf', 'answers/list.pdf',
+                                             build_parsed_questions(3 + index % 3, seed=index))
+            QuestionSet.objects.create(title=f'列表测试别名{index}', alias_of=question_set)
+
+    add_question_sets(2)
+    counts = (count_queries('/?view=summary&limit=100'), count_queries('/'))
+    add_question_sets(8)
+    assert (count_queries('/?view=summary&limit=100'), count_queries('/')) == counts
+    assert counts[0] == 1, counts
+    print(f"摘要列表 {counts[0]} 条查询，完整列表 {counts[1]} 条查询")
+
+    listed, cursor = [], None
+    while True:
+        path = '/?view=summary&limit=3' + (f'&cursor={cursor}' if cursor else '')
+        response = view(factory.get(path))
+        listed.extend(response.data['results'])
+        cursor = response.data['next_cursor']
+        if cursor is None:
+            break
+    expected = QuestionSet.objects.order_by('-created_at', '-id')
+    assert [item['id'] for item in listed] == list(expected.values_list('id', flat=True))
+    for item in listed:
+        question_set = expected.get(id=item['id'])
+        questions = question_set.canonical.questions
+        assert item['question_count'] == questions.count()
+        assert item['multiple_count'] == questions.filter(question_type='multiple').count()
+        assert item['single_count'] == questions.filter(question_type='single').count()
+
+    response = view(factory.get('/?view=summary&cursor=bad'))
+    assert response.status_code == 400
+
+
+def test_question_numbers_unique_within_set():
+    """同一集合中题号唯一；保存解析结果时重复的题号保留信息更完整的版本"""
+    parsed = build_parsed_questions(3)
+    parsed.append({**parsed[1], 'explanation': parsed[1]['explanation'] + '补充解析。'})
+    question_set = save_question_set('题号唯一测试', 'questions/unique.pdf', 'answers/unique.pdf', parsed)
+    assert list(question_set.questions.values_list('question_number', flat=True)) == [1, 2, 3]
+    assert question_set.questions.get(question_number=2).explanation.endswith('补充解析。')
+
+    question = question_set.questions.first()
+    try:
+        with transaction.atomic():
+            Question.objects.create(
+                question_set=question_set, question_number=question.question_number, question_text='重复',
+                options=question.options, question_type=question.question_type,
+                correct_answers=question.correct_answers
+            )
+    except IntegrityError:
+        pass
+    else:
+        raise AssertionError('重复的题号应当被唯一约束拒绝')
+
+
+if __name__ == '__main__':
+    test_hot_endpoints_use_indexes()
+    test_question_numbers_unique_within_set()
+    test_question_set_listing_query_count()
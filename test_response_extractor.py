@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+纯文本响应提取测试脚本：索引化提取与原 build_json_from_text 实现的结果一致
+"""
+import os
+import sys
+import django
+
+# 设置Django环境
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pmp_platform.settings')
+django.setup()
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from questions.gemini_parser import GeminiPDFParser
+from questions.management.commands._synthetic import build_response_text, build_synthetic_pdf
+from questions.management.commands.benchmark_response_extractor import legacy_build_json_from_text
+from questions.pdf_extraction import extract_text
+from questions.response_extractor import build_questions_from_text
+
+
+def test_matches_legacy_on_fixture_pdf():
+    """从合成PDF提取的文本上，新旧实现逐题一致（选项行在各题之间重复出现）"""
+    text = extract_text(SimpleUploadedFile('fixture.pdf', build_synthetic_pdf(6, 40)), use_cache=False)
+    legacy = legacy_build_json_from_text(text)
+    current = GeminiPDFParser(use_cache=False).build_json_from_text(text)
+
+    print(f"PDF文本 {len(text)} 字符，提取 {len(current)} 道题")
+    assert len(current) == 6 * 7
+    assert all(question['options'] for question in current)
+    assert current == legacy
+
+
+def test_matches_legacy_on_response_text():
+    """答案写在选项之前的纯文本响应：题干、选项、答案和题型都与原实现一致"""
+    text = build_response_text(300, seed=7)
+    legacy = legacy_build_json_from_text(text)
+    current = build_questions_from_text(text)
+
+    assert len(current) == 300
+    assert any(question['question_type'] == 'multiple' for question in current)
+    assert all(question['correct_answers'] for question in current)
+    assert current == legacy
+
+
+if __name__ == '__main__':
+    test_matches_legacy_on_fixture_pdf()
+    test_matches_legacy_on_response_text()
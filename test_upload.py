@@ -4,19 +4,35 @@
 """
 import os
 import sys
+import gc
+import hashlib
 import django
 import tempfile
+import tracemalloc
 
 # 设置Django环境
 sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pmp_platform.settings')
 django.setup()
 
-from django.test import TestCase
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.core.files.uploadedfile import SimpleUploadedFile
-from questions.views import FileUploadView
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.management import call_command
+from questions.views import FileUploadView, QuestionSetDetailView
+from questions.grading import attempt_results, grade_exam
+from questions.models import ExamAttempt, IngestionJob, Question, QuestionSet, ScoreHistogram, UserAnswer
+from questions.persistence import save_question_set
+from questions.uploads import get_upload_temp_dir
+from questions.management.commands._synthetic import build_parsed_questions, build_synthetic_pdf, write_synthetic_pdf
 from rest_framework.test import APIRequestFactory
 from rest_framework import status
+from test_gemini_streaming import stub_gemini
+
+LARGE_PDF_PADDING = 200 * 1024 * 1024
+MEMORY_CEILING = 32 * 1024 * 1024
 
 def create_test_pdf():
     """创建测试PDF文件"""
@@ -53,11 +69,13 @@ def test_upload_api():
     try:
         # 调用视图
         response = view(request)
+        request.close()  # 关闭上传的临时文件（正常请求由WSGI处理器关闭）
         print(f"响应状态码: {response.status_code}")
         print(f"响应内容: {response.data}")
         
-        if response.status_code == status.HTTP_201_CREATED:
-            print("✅ 上传成功！")
+        if response.status_code == status.HTTP_202_ACCEPTED:
+            print(f"✅ 上传成功！导入任务: {response.data['job_id']}")
+            print(f"任务状态: {response.data['job']['status']}")
         else:
             print("❌ 上传失败！")
             
@@ -66,5 +84,199 @@ def test_upload_api():
         import traceback
         print(f"错误堆栈: {traceback.format_exc()}")
 
+def build_multipart_request(body, boundary):
+    """用磁盘上的multipart请求体构造请求，测试本身不把上传内容读入内存"""
+    length = body.tell()
+    body.seek(0)
+    return WSGIRequest({
+        'REQUEST_METHOD': 'POST',
+        'PATH_INFO': '/api/upload/',
+        'CONTENT_TYPE': f'multipart/form-data; boundary={boundary}',
+        'CONTENT_LENGTH': str(length),
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'wsgi.input': body,
+        'wsgi.url_scheme': 'http',
+    })
+
+
+def test_large_upload_memory_ceiling():
+    """200MB的PDF上传、保存、提取和导入全程Python内存峰值保持平稳
+
+    上传内容直接写入媒体目录下的临时文件，保存时移动（媒体文件与临时文件是同一个文件），
+    提取时以内存映射读取。
+    """
+    boundary = 'PMPUploadBoundary'
+    with tempfile.TemporaryFile() as body:
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="title"\r\n\r\n大文件导入\r\n'
+            f'--{boundary}\r\nContent-Disposition: form-data; name="questions_file"; filename="questions.pdf"\r\n'
+            f'Content-Type: application/pdf\r\n\r\n'.encode('utf-8')
+        )
+        pdf_start = body.tell()
+        pdf_size = write_synthetic_pdf(body, 1, 12, padding_bytes=LARGE_PDF_PADDING)
+        body.seek(pdf_start)
+        expected_sha256 = hashlib.sha256(body.read(pdf_size)).hexdigest()
+        body.write(
+            f'\r\n--{boundary}\r\nContent-Disposition: form-data; name="answers_file"; filename="answers.pdf"\r\n'
+            f'Content-Type: application/pdf\r\n\r\n'.encode('utf-8')
+        )
+        write_synthetic_pdf(body, 1, 12)
+        body.write(f'\r\n--{boundary}--\r\n'.encode('utf-8'))
+        request = build_multipart_request(body, boundary)
+
+        with stub_gemini():
+            gc.collect()
+            tracemalloc.start()
+            try:
+                response = FileUploadView.as_view()(request)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+    print(f"上传 {pdf_size / 1024 / 1024:.0f}MB PDF，Python内存峰值: {peak / 1024 / 1024:.1f}MB")
+    assert response.status_code == status.HTTP_202_ACCEPTED, response.data
+    job = IngestionJob.objects.get(pk=response.data['job_id'])
+    assert job.status == 'succeeded', job.error
+    assert job.questions_sha256 == expected_sha256
+    assert job.questions_file.size == pdf_size
+    assert peak < MEMORY_CEILING
+
+    # 媒体目录中的文件就是上传时写入的临时文件（同一个inode），临时目录中没有残留
+    uploaded = response.renderer_context['request'].FILES['questions_file']
+    assert os.fstat(uploaded.file.fileno()).st_ino == os.stat(job.questions_file.path).st_ino
+    request.close()
+    assert os.listdir(get_upload_temp_dir()) == []
+
+
+def upload_pdf_pair(title, questions_pdf, answers_pdf):
+    request = APIRequestFactory().post('/api/upload/', {
+        'title': title,
+        'questions_file': SimpleUploadedFile('questions.pdf', questions_pdf, content_type='application/pdf'),
+        'answers_file': SimpleUploadedFile('answers.pdf', answers_pdf, content_type='application/pdf'),
+    }, format='multipart')
+    response = FileUploadView.as_view()(request)
+    request.close()
+    return response
+
+
+def test_duplicate_upload_reuses_question_set():
+    """重复上传相同内容：同名返回原集合，不同名创建别名集合，均不解析、不保存文件和题目"""
+    questions_pdf = build_synthetic_pdf(2, 12)
+    answers_pdf = build_synthetic_pdf(1, 18)
+    with stub_gemini() as server:
+        first = upload_pdf_pair('重复上传', questions_pdf, answers_pdf)
+        requests_made = len(server.paths)
+        question_set = QuestionSet.objects.get(pk=first.data['job']['question_set'])
+        questions_count = Question.objects.count()
+        media_files = sorted(os.listdir(os.path.dirname(question_set.questions_file.path)))
+
+        again = upload_pdf_pair('重复上传', questions_pdf, answers_pdf)
+        renamed = upload_pdf_pair('重复上传（副本）', questions_pdf, answers_pdf)
+        assert len(server.paths) == requests_made
+
+    assert first.status_code == status.HTTP_202_ACCEPTED
+    assert question_set.content_fingerprint
+    assert again.status_code == status.HTTP_200_OK
+    assert again.data['duplicate_of'] == question_set.id
+    assert again.data['job']['question_set'] == question_set.id
+    assert again.data['job']['status'] == 'succeeded'
+
+    alias = QuestionSet.objects.get(pk=renamed.data['job']['question_set'])
+    assert alias.alias_of_id == question_set.id
+    assert alias.title == '重复上传（副本）'
+    assert Question.objects.count() == questions_count
+    assert sorted(os.listdir(os.path.dirname(question_set.questions_file.path))) == media_files
+
+    detail = QuestionSetDetailView.as_view()(APIRequestFactory().get(f'/api/question-sets/{alias.id}/'), pk=alias.id)
+    assert [question['id'] for question in detail.data['questions']] == list(
+        question_set.questions.values_list('id', flat=True)
+    )
+
+
+def test_merge_duplicate_question_sets():
+    """合并已有的重复集合：答题记录和考试记录改指向保留集合中的同号题目，重复集合变为别名"""
+    questions_pdf = build_synthetic_pdf(3, 7)
+    answers_pdf = build_synthetic_pdf(3, 8)
+    parsed = [
+        {'question_number': number, 'question_text': f'第{number}题', 'options': {'A': '是', 'B': '否'},
+         'question_type': 'single', 'correct_answers': ['A'], 'explanation': ''}
+        for number in (1, 2)
+    ]
+    question_sets = [
+        save_question_set(
+            title,
+            SimpleUploadedFile('questions.pdf', questions_pdf),
+            SimpleUploadedFile('answers.pdf', answers_pdf),
+            parsed
+        )
+        for title in ('合并前', '合并前（重复）', '导入中')
+    ]
+    canonical, duplicate, importing = question_sets
+    # 内容相同但仍在导入中的集合：不补算指纹，也不合并
+    IngestionJob.objects.create(
+        title=importing.title, questions_file=importing.questions_file.name,
+        answers_file=importing.answers_file.name, question_set=importing, status='running'
+    )
+    answer = UserAnswer.objects.create(
+        question=duplicate.questions.get(question_number=2), user_answers=['A'], is_correct=True
+    )
+    attempt = grade_exam(duplicate, [{'question_id': answer.question_id, 'user_answers': ['A']}])
+    duplicate_file = duplicate.questions_file.path
+
+    call_command('merge_duplicate_question_sets')
+
+    duplicate.refresh_from_db()
+    answer.refresh_from_db()
+    assert duplicate.alias_of_id == canonical.id
+    assert duplicate.content_fingerprint == QuestionSet.objects.get(pk=canonical.pk).content_fingerprint != ''
+    assert not duplicate.questions.exists()
+    assert answer.question == canonical.questions.get(question_number=2)
+    assert [result['question_id'] for result in attempt_results(ExamAttempt.objects.get(pk=attempt.pk))] == list(
+        canonical.questions.order_by('question_number').values_list('id', flat=True)
+    )
+    # 重复集合上的考试作答计入的统计累加到保留集合的同号题目
+    stats = canonical.questions.get(question_number=2).stats
+    assert (stats.attempts, stats.correct_count, stats.exam_attempts) == (1, 1, 1)
+    # 重复集合的成绩榜和得分分布并入保留的集合
+    assert list(canonical.score_entries.values_list('attempt_id', flat=True)) == [attempt.id]
+    assert canonical.score_histogram.attempts == 1
+    assert not ScoreHistogram.objects.filter(question_set=duplicate).exists()
+    assert not os.path.exists(duplicate_file)
+    assert os.path.exists(canonical.questions_file.path)
+    importing.refresh_from_db()
+    assert importing.content_fingerprint == ''
+    assert importing.alias_of_id is None
+    assert importing.questions.count() == 2
+    assert os.path.exists(importing.questions_file.path)
+
+
+def test_failed_save_rolls_back_question_set():
+    """批量插入进行到一半失败时整体回滚：已插入的批次和题目集合都不保留"""
+    parsed = build_parsed_questions(7)
+    parsed[5]['question_text'] = None  # 第3批插入时违反非空约束
+    sets_before = QuestionSet.objects.count()
+    questions_before = Question.objects.count()
+
+    with override_settings(QUESTION_BULK_BATCH_SIZE=2), CaptureQueriesContext(connection) as queries:
+        try:
+            save_question_set('保存失败', 'questions/rollback.pdf', 'answers/rollback.pdf', parsed)
+        except IntegrityError:
+            pass
+        else:
+            raise AssertionError('应当抛出IntegrityError')
+
+    inserts = [query['sql'] for query in queries if query['sql'].startswith('INSERT INTO "questions_question"')]
+    print(f"失败前执行的题目插入语句: {len(inserts)}")
+    assert len(inserts) == 3
+    assert QuestionSet.objects.count() == sets_before
+    assert not QuestionSet.objects.filter(title='保存失败').exists()
+    assert Question.objects.count() == questions_before
+
+
 if __name__ == '__main__':
-    test_upload_api() 
\ No newline at end of file
+    test_upload_api()
+    test_large_upload_memory_ceiling()
+    test_duplicate_upload_reuses_question_set()
+    test_merge_duplicate_question_sets() 
+    test_failed_save_rolls_back_question_set()